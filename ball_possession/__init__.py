@@ -1 +1 @@
-from .ball_possession import BallPossession
\ No newline at end of file
+from .ball_possession import BallPossession, get_dense_coordinates
\ No newline at end of file
@@ -1,7 +1,34 @@
 import numpy as np
-from utils import get_center_of_bbox, TeamAssigner
+from itertools import chain
+from utils import get_center_of_bbox, TeamAssigner, PossessionSegments
+from frame_compositor import HudPanel
 import cv2
 
+# Frame-enkénti {track_id: (x, y)} szótárak és (x, y) / None labdakoordináták sűrű tömbökké
+# alakítása: player_ids (F, P) -1 kitöltéssel, player_xy (F, P, 2) és ball_xy (F, 2) NaN kitöltéssel.
+# A szótárak egyetlen lapított menetben olvasódnak ki, a frame-en belüli sorrend megmarad
+def get_dense_coordinates(player_coordinates_list, ball_coordinates_list):
+    frame_count = len(player_coordinates_list)
+    counts = np.fromiter(map(len, player_coordinates_list), dtype=np.int64, count=frame_count)
+    max_players = int(counts.max()) if frame_count else 0
+    total = int(counts.sum())
+
+    # Sorok és oszlopok: az i. elem a frame-jén belüli sorszámú oszlopba kerül
+    rows = np.repeat(np.arange(frame_count), counts)
+    cols = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    player_ids = np.full((frame_count, max_players), -1, dtype=np.int64)
+    player_xy = np.full((frame_count, max_players, 2), np.nan)
+    player_ids[rows, cols] = np.fromiter(chain.from_iterable(player_coordinates_list), dtype=np.int64, count=total)
+    player_xy[rows, cols] = np.fromiter(chain.from_iterable(chain.from_iterable(coords.values() for coords in player_coordinates_list)),
+                                        dtype=np.float64, count=2 * total).reshape(-1, 2)
+
+    ball_xy = np.full((frame_count, 2), np.nan)
+    ball_frames = [frame_num for frame_num, coords in enumerate(ball_coordinates_list[:frame_count]) if coords is not None]
+    if ball_frames:
+        ball_xy[ball_frames] = [ball_coordinates_list[frame_num] for frame_num in ball_frames]
+    return player_ids, player_xy, ball_xy
+
 class BallPossession:
     def __init__(self):
         # Labdabirtoklás számlálók inicializálása
@@ -13,10 +40,18 @@ class BallPossession:
         self.distance_threshold = 1.9 # méterben
         self.streak_threshold = 2 # frame-ben
         self.closest_player_streaks = {} # legközelebbi játékos streakjei
+
+        # Frame-enkénti labdabirtoklási arányok (team1 %, team2 %)
+        self.possession_per_frame = []
+
+        # Áttetsző háttérpanel a jobb felső sarokban
+        self.possession_panel = HudPanel(300, 101)
     
     def player_on_the_ball(self, pitch_coordinates, ball_coordinates):
         
-        # Labda koordinátáinak kiszedése
+        # Labda koordinátáinak kiszedése (amíg nincs érvényes homográfia, nincs labdakoordináta)
+        if ball_coordinates is None:
+            return None
         ball_x, ball_y = ball_coordinates
 
         # Szükséges változók
@@ -57,45 +92,96 @@ class BallPossession:
 
         return None
     
-    def measure_and_draw_possession(self, frames, closest_player_ids, draw_possession_overlay=True):
-        # Végigmegyünk minden frame-en
-        for frame_num, frame in enumerate(frames):
-            annotated_frame = frame.copy()
-
-            # Szűrt listából kiszedjük az aktuális legközelebbi játékost
-            if frame_num in closest_player_ids:
-                player_id, team_id = closest_player_ids[frame_num]
-
-                # Csak akkor dolgozunk vele, ha nem None
-                if player_id is not None and team_id is not None:
-                    # Számlálók frissítése a csapat azonosító alapján
-                    if team_id == 1:
-                        self.team1_possession += 1
-                    elif team_id == 2:
-                        self.team2_possession += 1
-
-                    self.total_possession_frames += 1
-
-            # Labdabirtoklás megjelenítése minden frame-en
-            if draw_possession_overlay:
-                overlay = annotated_frame.copy()
-                h, w, _ = frame.shape
-                cv2.rectangle(overlay, (w - 300, 0), (w, 100), (255, 255, 255), -1)
-                alpha = 0.6
-                cv2.addWeighted(overlay, alpha, annotated_frame, 1 - alpha, 0, annotated_frame)
-
-                # Százalékok számítása
-                if self.total_possession_frames > 0:
-                    team1_pct = 100 * self.team1_possession / self.total_possession_frames
-                    team2_pct = 100 * self.team2_possession / self.total_possession_frames
-                else:
-                    team1_pct = team2_pct = 0
-
-                # Százalékos kiírás megjelenítése a jobb felső sarokban
-                cv2.putText(annotated_frame, f"Team1: {team1_pct:.1f} %", (w - 290, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
-                cv2.putText(annotated_frame, f"Team2: {team2_pct:.1f} %", (w - 290, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
-
-                # Frissítjük a frame-et
-                frames[frame_num] = annotated_frame
-
-        return frames
\ No newline at end of file
+    # Labdához legközelebbi (birtokló) játékos a teljes mérkőzésre, vektorizáltan. Bemenet: sűrű
+    # tömbök, player_ids (F, P) -1 kitöltéssel, player_xy (F, P, 2) és ball_xy (F, 2) NaN-nal a
+    # hiányzó értékeken. A player_on_the_ball frame-enkénti hívásaival azonos eredményt ad (a streakek
+    # állapotát is folytatja és frissíti); kimenet: (F,) track id tömb, -1 ha nincs birtokló
+    def players_on_the_ball(self, player_ids, player_xy, ball_xy):
+        player_ids = np.asarray(player_ids, dtype=np.int64)
+        player_xy = np.asarray(player_xy, dtype=np.float64)
+        ball_xy = np.asarray(ball_xy, dtype=np.float64).reshape(-1, 2)
+        frame_count = len(ball_xy)
+        closest_players = np.full(frame_count, -1, dtype=np.int64)
+        if frame_count == 0 or player_ids.shape[1] == 0:
+            return closest_players
+
+        # Távolságok egyetlen broadcastolt művelettel; a kitöltés, a labda (track_id 1) és a hiányzó
+        # koordináták végtelen távolságra kerülnek
+        distances = np.hypot(player_xy[..., 0] - ball_xy[:, None, 0], player_xy[..., 1] - ball_xy[:, None, 1])
+        distances[(player_ids < 0) | (player_ids == 1) | np.isnan(distances)] = np.inf
+        nearest = np.argmin(distances, axis=1)
+        min_distances = distances[np.arange(frame_count), nearest]
+
+        # Események: azok a frame-ek, ahol van labda és legközelebbi játékos
+        event_frames = np.flatnonzero(np.isfinite(min_distances) & ~np.isnan(ball_xy[:, 0]))
+        if len(event_frames) == 0:
+            return closest_players
+        event_players = player_ids[event_frames, nearest[event_frames]]
+        within = min_distances[event_frames] <= self.distance_threshold
+
+        # Streakek játékosonként: az események játékos, azon belül frame szerint rendezve; a határon
+        # kívüli esemény törli a játékos streakjét, így a következő eseménye új szakaszt kezd
+        order = np.lexsort((event_frames, event_players))
+        sorted_players, sorted_within = event_players[order], within[order]
+        new_player = np.concatenate([[True], sorted_players[1:] != sorted_players[:-1]])
+        new_segment = new_player | np.concatenate([[False], ~sorted_within[:-1]])
+        within_counts = np.cumsum(sorted_within)
+        segment_starts = np.flatnonzero(new_segment)
+        segment_index = np.cumsum(new_segment) - 1
+        base_counts = (within_counts - sorted_within)[segment_starts]
+
+        # A korábbi hívásokból megmaradt streakek a játékos első szakaszát folytatják
+        initial_streaks = np.array([self.closest_player_streaks.get(int(player_id), 0) for player_id in sorted_players[segment_starts]])
+        initial_streaks[~new_player[segment_starts]] = 0
+        streaks = within_counts - base_counts[segment_index] + initial_streaks[segment_index]
+
+        owner = sorted_within & (streaks >= self.streak_threshold)
+        closest_players[event_frames[order[owner]]] = sorted_players[owner]
+
+        # Streak állapot frissítése a játékosok utolsó eseménye alapján
+        last_events = np.flatnonzero(np.concatenate([new_player[1:], [True]]))
+        for player_id, is_within, streak in zip(sorted_players[last_events].tolist(), sorted_within[last_events].tolist(), streaks[last_events].tolist()):
+            if is_within:
+                self.closest_player_streaks[player_id] = streak
+            else:
+                self.closest_player_streaks.pop(player_id, None)
+        return closest_players
+
+    # Labdabirtoklási arányok előszámítása minden frame-re (a rajzoló réteg ebből dolgozik)
+    def measure_possession(self, closest_player_ids, total_frames):
+        segments = PossessionSegments.from_closest_player_ids(closest_player_ids, total_frames)
+        return self.measure_possession_segments(segments, total_frames)
+
+    # Kumulált birtoklási arányok a birtoklási szakasz indexből
+    def measure_possession_segments(self, segments, total_frames):
+        team1_frames, team2_frames, total_possession_frames = segments.get_cumulative_possession(total_frames)
+        team1_frames = self.team1_possession + team1_frames
+        team2_frames = self.team2_possession + team2_frames
+        total_possession_frames = self.total_possession_frames + total_possession_frames
+
+        # Százalékok számítása (birtoklás nélkül 0)
+        has_possession = total_possession_frames > 0
+        safe_total = np.maximum(total_possession_frames, 1)
+        team1_pct = np.where(has_possession, 100 * team1_frames / safe_total, 0.0)
+        team2_pct = np.where(has_possession, 100 * team2_frames / safe_total, 0.0)
+        self.possession_per_frame = list(zip(team1_pct.tolist(), team2_pct.tolist()))
+
+        if len(total_possession_frames):
+            self.team1_possession = int(team1_frames[-1])
+            self.team2_possession = int(team2_frames[-1])
+            self.total_possession_frames = int(total_possession_frames[-1])
+        return self.possession_per_frame
+
+    # Labdabirtoklás megjelenítése a jobb felső sarokban (réteg)
+    def draw_possession(self, frame, frame_num):
+        if frame_num < len(self.possession_per_frame):
+            team1_pct, team2_pct = self.possession_per_frame[frame_num]
+        else:
+            team1_pct, team2_pct = self.possession_per_frame[-1] if self.possession_per_frame else (0, 0)
+
+        h, w, _ = frame.shape
+        self.possession_panel.render(frame, w - 300, 0)
+
+        cv2.putText(frame, f"Team1: {team1_pct:.1f} %", (w - 290, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+        cv2.putText(frame, f"Team2: {team2_pct:.1f} %", (w - 290, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+        return frame
@@ -0,0 +1,58 @@
+import argparse
+import time
+import cv2
+from utils import VideoFrameSource
+
+# Dekódolási idő mérése: külön dekódolás a detektáláshoz és a kulcspontokhoz (régi)
+# vs. egyetlen közös dekódolási menet, amely mindkét lépést eteti (új)
+# Futtatás a projekt gyökeréből: python -m benchmarks.decode_benchmark input_videos/08fd33_4.mp4
+
+# Régi mód: a detektálás a streamelt forrást, a kulcspont lépés saját VideoCapture-t dekódol
+def two_pass_decode(video_path, max_frames):
+    start = time.perf_counter()
+
+    for frame_num, frame in enumerate(VideoFrameSource(video_path)):
+        if frame_num + 1 >= max_frames:
+            break
+
+    cap = cv2.VideoCapture(video_path)
+    frame_num = 0
+    while frame_num < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_num += 1
+    cap.release()
+
+    return time.perf_counter() - start
+
+# Új mód: egy dekódolás, a frame-et mindkét fogyasztó ugyanabban a ciklusban kapja meg
+def single_pass_decode(video_path, max_frames):
+    start = time.perf_counter()
+
+    detector_frames = 0
+    keypoint_frames = 0
+    for frame_num, frame in enumerate(VideoFrameSource(video_path)):
+        detector_frames += 1
+        keypoint_frames += 1
+        if frame_num + 1 >= max_frames:
+            break
+
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Dekódolási idő összehasonlítása (két menet vs. egy közös menet)")
+    parser.add_argument("video_path")
+    parser.add_argument("--max-frames", type=int, default=750)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    two_pass = min(two_pass_decode(args.video_path, args.max_frames) for _ in range(args.repeats))
+    single_pass = min(single_pass_decode(args.video_path, args.max_frames) for _ in range(args.repeats))
+
+    print(f"Két dekódolási menet:   {two_pass:.3f} s")
+    print(f"Egy közös menet:        {single_pass:.3f} s")
+    print(f"Megtakarított idő:      {two_pass - single_pass:.3f} s ({100 * (1 - single_pass / two_pass):.1f} %)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import time
+from itertools import islice
+from utils import VideoFrameSource, get_auto_batch_size
+from tracker import Tracker
+
+# Kötegelt objektumdetektálás sebességének mérése különböző batch méretekkel
+# Futtatás a projekt gyökeréből:
+# python -m benchmarks.detection_batch_benchmark input_videos/08fd33_4.mp4 --model models/best.pt
+
+def measure_fps(tracker, frames, batch_size):
+    start = time.perf_counter()
+    processed = sum(1 for _ in tracker.detect_frames(frames, batch_size=batch_size))
+    return processed / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Objektumdetektálás frame/s batch méretenként")
+    parser.add_argument("video_path")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--max-frames", type=int, default=160)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    source = VideoFrameSource(args.video_path)
+    frames = list(islice(source, args.max_frames))
+    tracker = Tracker(model_path=args.model, video_fps=source.fps)
+
+    # Bemelegítés (modell betöltése, első futás költsége)
+    sum(1 for _ in tracker.detect_frames(frames[:4], batch_size=4))
+
+    print(f"Automatikusan választott batch méret: {get_auto_batch_size(source.width, source.height)}")
+    baseline = None
+    for batch_size in args.batch_sizes:
+        fps = measure_fps(tracker, frames, batch_size)
+        baseline = baseline or fps
+        print(f"batch={batch_size:>2}: {fps:6.2f} frame/s ({fps / baseline:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import tempfile
+import time
+import cv2
+import numpy as np
+from utils import VideoFrameSource, encode_video_frames
+from frame_compositor import FrameCompositor, ParallelRenderer, LabelRenderer
+
+# Kimeneti videó renderelése és kódolása különböző folyamatszámokkal (frame/s a folyamatok
+# függvényében). A rétegek a valódi overlay-ekhez hasonló terhelést adnak: ellipszisek és
+# feliratok játékosonként, valamint egy áttetsző panel
+# Futtatás a projekt gyökeréből:
+# python -m benchmarks.parallel_render_benchmark input_videos/08fd33_4.mp4 --workers 1 2 4 8
+
+def make_compositor(players, width, height):
+    rng = np.random.default_rng(0)
+    positions = rng.integers((0, 0), (width, height), size=(players, 2))
+    label_renderer = LabelRenderer()
+
+    def draw_players(frame, frame_num):
+        for index, (x, y) in enumerate(positions):
+            x = int(x + 10 * np.sin(frame_num / 25 + index)) % width
+            cv2.ellipse(frame, (x, int(y)), (35, 12), 0.0, -45, 235, (0, 0, 255), 2, cv2.LINE_4)
+            label_renderer.put_text(frame, f"{(frame_num // 25 + index) % 35:.1f} km/h", (x - 40, int(y) + 20),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, [((0, 0, 0), 2), ((255, 255, 255), 1)], cv2.LINE_AA)
+
+    def draw_panel(frame, frame_num):
+        roi = frame[height - 150:height - 20, width - 500:width - 20]
+        cv2.addWeighted(roi, 0.5, np.full_like(roi, 255), 0.5, 0, dst=roi)
+        cv2.putText(frame, f"Frame {frame_num}", (width - 480, height - 80), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+
+    compositor = FrameCompositor()
+    compositor.add_layer("játékosok", draw_players)
+    compositor.add_layer("panel", draw_panel)
+    return compositor
+
+def main():
+    parser = argparse.ArgumentParser(description="Párhuzamos renderelés sebessége a folyamatszám függvényében")
+    parser.add_argument("video")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--chunk-size", type=int, default=4)
+    args = parser.parse_args()
+
+    frames = VideoFrameSource(args.video)
+    print(f"{args.video}: {len(frames)} frame, {frames.width}x{frames.height}, {args.players} játékos")
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_path = os.path.join(output_dir, "output.mp4")
+        baseline_fps = None
+        for workers in args.workers:
+            compositor = make_compositor(args.players, frames.width, frames.height)
+            renderer = ParallelRenderer(compositor, frames, len(frames), workers=workers, chunk_size=args.chunk_size)
+            start = time.perf_counter()
+            for _ in encode_video_frames(renderer.render(), output_path, frames.fps, frames.width, frames.height):
+                pass
+            fps = renderer.rendered_frames / (time.perf_counter() - start)
+            baseline_fps = baseline_fps or fps
+            print(f"{workers:>2} folyamat: {fps:6.1f} frame/s ({fps / baseline_fps:.2f}x) - {renderer.format_report()}")
+
+    print(f"Elérhető CPU magok: {os.cpu_count()}")
+
+if __name__ == "__main__":
+    main()
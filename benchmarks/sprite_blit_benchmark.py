@@ -0,0 +1,54 @@
+import argparse
+import time
+import numpy as np
+import cv2
+from frame_compositor import Sprite
+
+# Lesen lévő játékosok zászlójának rajzolása hosszú lesszakaszon: a korábbi, pixelenkénti
+# Python ciklus és a vektorizált (előre szorzott alfás) sprite ráhelyezés összehasonlítása
+# Futtatás a projekt gyökeréből:
+# python -m benchmarks.sprite_blit_benchmark --frames 250 --players 3
+
+# Korábbi megoldás: csatornánként, soronként és oszloponként másolt pixelek
+def draw_flag_legacy(frame, flag_image, center_x, top_y):
+    fh, fw = flag_image.shape[:2]
+    for c in range(3):
+        for i in range(fh):
+            for j in range(fw):
+                if flag_image[i, j, 3] > 0:
+                    y, x = top_y + i, center_x - fw // 2 + j
+                    if 0 <= y < frame.shape[0] and 0 <= x < frame.shape[1]:
+                        frame[y, x, c] = flag_image[i, j, c]
+
+def main():
+    parser = argparse.ArgumentParser(description="Zászló sprite ráhelyezés sebessége")
+    parser.add_argument("--flag", default="offside_detection/offside_flag.png")
+    parser.add_argument("--frames", type=int, default=250)
+    parser.add_argument("--players", type=int, default=3)
+    args = parser.parse_args()
+
+    flag_image = cv2.imread(args.flag, cv2.IMREAD_UNCHANGED)
+    sprite = Sprite.from_file(args.flag)
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    positions = rng.integers((0, 0), (1920, 1080), size=(args.frames, args.players, 2))
+
+    start = time.perf_counter()
+    for frame_positions in positions:
+        for center_x, top_y in frame_positions:
+            draw_flag_legacy(frame, flag_image, int(center_x), int(top_y))
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for frame_positions in positions:
+        for center_x, top_y in frame_positions:
+            sprite.blit(frame, int(center_x) - sprite.width // 2, int(top_y))
+    sprite_time = time.perf_counter() - start
+
+    blits = args.frames * args.players
+    print(f"{args.frames} frame, frame-enként {args.players} zászló")
+    print(f"Pixelenkénti ciklus: {1000 * legacy_time / blits:.3f} ms/zászló")
+    print(f"Sprite ráhelyezés:   {1000 * sprite_time / blits:.3f} ms/zászló ({legacy_time / sprite_time:.0f}x)")
+
+if __name__ == "__main__":
+    main()
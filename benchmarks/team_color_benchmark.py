@@ -0,0 +1,65 @@
+import argparse
+import time
+from itertools import islice
+import numpy as np
+from utils import VideoFrameSource
+from utils.team_assigner_utils import TeamAssigner
+from tracker import Tracker
+
+# Mezszín kinyerés költsége kivágásonként: korábbi (kivágásonkénti sklearn KMeans)
+# és kötegelt (vektorizált Lab k-means) megoldás, valamint a csapatbesorolások egyezése
+# Futtatás a projekt gyökeréből:
+# python -m benchmarks.team_color_benchmark input_videos/08fd33_4.mp4 --model models/best.pt
+
+def main():
+    parser = argparse.ArgumentParser(description="Mezszín kinyerés ideje kivágásonként")
+    parser.add_argument("video_path")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--max-frames", type=int, default=20)
+    args = parser.parse_args()
+
+    source = VideoFrameSource(args.video_path)
+    frames = list(islice(source, args.max_frames))
+    tracker = Tracker(model_path=args.model, video_fps=source.fps)
+    team_assigner = TeamAssigner()
+
+    # Játékos bboxok frame-enként a detektorból
+    samples = []
+    for frame, detections, names in tracker.detect_frames(frames, batch_size=4):
+        player_mask = np.array([names[int(class_id)] == "player" for class_id in detections.class_id], dtype=bool)
+        samples.append((frame, detections.xyxy[player_mask].tolist()))
+    crop_count = sum(len(bboxes) for _, bboxes in samples)
+    if crop_count == 0:
+        print("Nem található játékos a vizsgált frame-eken")
+        return
+
+    # Korábbi megoldás: kivágásonkénti KMeans
+    start = time.perf_counter()
+    legacy_colors = [team_assigner.get_player_color(team_assigner.get_upper_body_image(frame, bbox))
+                     for frame, bboxes in samples for bbox in bboxes]
+    legacy_time = time.perf_counter() - start
+
+    # Kötegelt megoldás: frame-enként egyetlen vektorizált színkinyerés
+    start = time.perf_counter()
+    batched_colors = []
+    for frame, bboxes in samples:
+        crops, valid = team_assigner.get_upper_body_batch(frame, bboxes)
+        colors = np.zeros((len(bboxes), 3))
+        colors[valid] = team_assigner.get_player_colors(crops[valid])
+        batched_colors.append(colors)
+    batched_colors = np.concatenate(batched_colors)
+    batched_time = time.perf_counter() - start
+
+    # Csapatbesorolások egyezése ugyanazokkal a prototípusokkal
+    team1_color, team2_color = team_assigner.fit_team_prototypes(batched_colors)
+    legacy_teams = team_assigner.get_players_to_team(np.array(legacy_colors), team1_color, team2_color)
+    batched_teams = team_assigner.get_players_to_team(batched_colors, team1_color, team2_color)
+    agreement = np.mean(legacy_teams == batched_teams)
+
+    print(f"Kivágások száma: {crop_count}")
+    print(f"KMeans kivágásonként: {1000 * legacy_time / crop_count:.3f} ms/kivágás")
+    print(f"Kötegelt színkinyerés: {1000 * batched_time / crop_count:.3f} ms/kivágás ({legacy_time / batched_time:.1f}x)")
+    print(f"Csapatbesorolás egyezése: {100 * agreement:.1f} %")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+from .frame_compositor import FrameCompositor
+from .sprite import Sprite
+from .hud_panel import HudPanel
+from .label_cache import LabelCache, LabelRenderer
+from .parallel_renderer import ParallelRenderer
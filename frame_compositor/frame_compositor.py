@@ -0,0 +1,46 @@
+import time
+
+# Réteg alapú kompozitor: minden overlay egy réteg, amely az előre kiszámított frame-enkénti
+# állapotból rajzol, helyben, közvetlenül a dekódolt frame-re. Így a kimeneti frame-enként
+# egyetlen foglalás (a dekódolt kép) marad, köztes másolatok nélkül. A rétegek sorrendje a
+# regisztráció sorrendje, a show_* beállítások csak ki-be kapcsolják őket
+class FrameCompositor:
+    def __init__(self):
+        self.layers = [] # (név, rajzoló függvény) párok; a függvény: draw(frame, frame_num)
+        self.enabled = {}
+        self.layer_times = {} # rétegenkénti összesített rajzolási idő [s]
+        self.frame_count = 0
+
+    def add_layer(self, name, draw, enabled=True):
+        self.layers.append((name, draw))
+        self.enabled[name] = enabled
+        self.layer_times[name] = 0.0
+
+    def set_layer_enabled(self, name, enabled):
+        self.enabled[name] = enabled
+
+    # Az összes bekapcsolt réteg kirajzolása egy frame-re (helyben)
+    def compose(self, frame, frame_num):
+        for name, draw in self.layers:
+            if not self.enabled[name]:
+                continue
+            start = time.perf_counter()
+            draw(frame, frame_num)
+            self.layer_times[name] += time.perf_counter() - start
+        self.frame_count += 1
+        return frame
+
+    # Kompozitálás lépésként a feldolgozó láncban (generátor)
+    def render(self, frames):
+        for frame_num, frame in enumerate(frames):
+            yield self.compose(frame, frame_num)
+
+    # Rétegenkénti átlagos rajzolási idő
+    def format_report(self):
+        lines = []
+        for name, _ in self.layers:
+            if not self.enabled[name]:
+                continue
+            average_ms = 1000 * self.layer_times[name] / self.frame_count if self.frame_count else 0.0
+            lines.append(f"{name:>18}: {average_ms:.2f} ms/frame")
+        return "\n".join(lines)
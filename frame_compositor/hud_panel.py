@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+from .sprite import Sprite
+
+# Áttetsző HUD panel: a háttér keverése csak a panel területén (ROI) történik, a statikus
+# tartalom (színminták, feliratok) pedig egyszer, előre renderelt sprite-ként kerül rá.
+# Így a frame-enkénti költség a panel méretével arányos, nem a teljes frame-ével
+class HudPanel:
+    def __init__(self, width, height, background_color=(255, 255, 255), alpha=0.6):
+        self.width = width
+        self.height = height
+        self.alpha = alpha
+
+        # Előre kitöltött háttér a keveréshez
+        self.background = np.full((height, width, 3), background_color, dtype=np.uint8)
+
+        # Statikus tartalom: rajzoló függvények (panelen belüli koordinátákkal) és a belőlük
+        # renderelt sprite
+        self.static_draws = []
+        self.sprite = None
+
+    # Statikus elem hozzáadása: draw(canvas) a panel méretű vásznon rajzol
+    def add_static(self, draw):
+        self.static_draws.append(draw)
+        self.sprite = None
+
+    # Sprite renderelése az összes statikus elemből
+    def build_sprite(self):
+        def draw(canvas):
+            for static_draw in self.static_draws:
+                static_draw(canvas)
+        self.sprite = Sprite.from_drawing(draw, self.width, self.height)
+
+    # Panel kirajzolása a frame-re (helyben), a bal felső sarka (x, y) pozícióban
+    def render(self, frame, x, y):
+        h, w = frame.shape[:2]
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(w, x + self.width), min(h, y + self.height)
+        if x1 >= x2 or y1 >= y2:
+            return frame
+
+        # Háttér keverése csak a panel területén
+        roi = frame[y1:y2, x1:x2]
+        panel_slice = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+        cv2.addWeighted(self.background[panel_slice], self.alpha, roi, 1 - self.alpha, 0, roi)
+
+        # Statikus sprite ráhelyezése
+        if self.static_draws:
+            if self.sprite is None:
+                self.build_sprite()
+            self.sprite.blit(frame, x, y)
+        return frame
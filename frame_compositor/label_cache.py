@@ -0,0 +1,79 @@
+import cv2
+from .sprite import Sprite
+
+# Számjegyek -> 0 a szövegszélesség gyorsítótár kulcsához (LabelRenderer.get_text_width)
+DIGITS_TO_ZERO = str.maketrans("123456789", "000000000")
+
+# Sprite gyorsítótár kulcs (szöveg + stílus) alapján, találati statisztikával
+class LabelCache:
+    def __init__(self):
+        self.sprites = {}
+        self.hits = 0
+        self.misses = 0
+
+    # Sprite lekérése; ha még nincs a gyorsítótárban, a build() függvény készíti el
+    def get(self, key, build):
+        entry = self.sprites.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = build()
+            self.sprites[key] = entry
+        else:
+            self.hits += 1
+        return entry
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def format_stats(self):
+        return (f"Felirat gyorsítótár: {len(self.sprites)} sprite, {self.hits} találat, "
+                f"{self.misses} hiány ({100 * self.hit_rate:.1f} % találati arány)")
+
+# Játékosonkénti feliratok rajzolása. Az azonosító címkék (állandó szövegek) gyorsítótárazott
+# sprite-ok; a frame-enként változó szövegek (koordináták, sebesség, távolság) a cv2.putText-tel
+# közvetlenül rajzolódnak, mert ezekre a gyorsítótár szinte soha nem találna
+class LabelRenderer:
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else LabelCache()
+        self.text_widths = {} # (számjegy minta, betűtípus, skála, vastagság) -> szélesség pixelben
+
+    # Szöveg szélessége pixelben (a getTextSize szerint). A Hershey fontokban minden számjegy
+    # azonos szélességű, ezért a szélesség csak a szöveg "mintájától" függ (számjegyek -> 0),
+    # így a változó számértékű feliratokra is találat a gyorsítótár
+    def get_text_width(self, text, font, scale, thickness):
+        key = (text.translate(DIGITS_TO_ZERO), font, scale, thickness)
+        width = self.text_widths.get(key)
+        if width is None:
+            width = self.text_widths[key] = cv2.getTextSize(key[0], font, scale, thickness)[0][0]
+        return width
+
+    # Szöveg rajzolása a frame-re (helyben). A layers (szín, vastagság) párjai sorban
+    # rajzolódnak (pl. körvonal, majd kitöltés)
+    def put_text(self, frame, text, org, font, scale, layers, line_type=cv2.LINE_8):
+        for color, thickness in layers:
+            cv2.putText(frame, text, org, font, scale, color, thickness, line_type)
+        return frame
+
+    # Track azonosító címke (fehér téglalap fekete számmal) a játékos alatt; a teljes címke
+    # egyetlen sprite, a szöveg alapján gyorsítótárazva
+    def draw_id_badge(self, frame, text, x_center, y_bottom, font=cv2.FONT_HERSHEY_SIMPLEX, font_scale=0.5, thickness=1):
+        def build():
+            (text_w, text_h), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+            margin = thickness + 3
+            # A sprite koordinátái a (x_center, y_bottom) horgonyponthoz képest eltolva
+            left, top = -(text_w // 2) - margin, -text_h - 10 - margin
+            width = text_w // 2 + 2 + margin - left + 1
+            height = -10 + baseline + margin - top + 1
+
+            def draw(canvas):
+                cv2.rectangle(canvas, (-(text_w // 2) - left, -text_h - 10 - top), (text_w // 2 + 2 - left, -10 - top),
+                              color=(255, 255, 255), thickness=cv2.FILLED)
+                cv2.putText(canvas, text, (-(text_w // 2) - left, -10 - top), font, font_scale, (0, 0, 0), thickness)
+
+            return Sprite.from_drawing(draw, width, height), left, top
+
+        sprite, left, top = self.cache.get(("badge", text, font, font_scale, thickness), build)
+        sprite.blit(frame, x_center + left, y_bottom + top)
+        return frame
@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+# Átlátszó kép (ikon, felirat, panel tartalom) gyors ráhelyezése a frame-re: a színek előre
+# szorzottak az átlátszósággal (premultiplied alpha), így a keverés egyetlen NumPy művelet
+# a frame-ből kilógó részek levágásával
+class Sprite:
+    def __init__(self, premultiplied, alpha):
+        self.premultiplied = premultiplied.astype(np.float32)  # (h, w, 3): szín * alpha
+        self.inverse_alpha = (1.0 - alpha.reshape(alpha.shape[0], alpha.shape[1], 1)).astype(np.float32)
+        self.height, self.width = self.premultiplied.shape[:2]
+
+    # Sprite BGRA képből (pl. IMREAD_UNCHANGED-del betöltött PNG); alfa csatorna nélkül átlátszatlan
+    @classmethod
+    def from_image(cls, image):
+        if image.shape[2] == 3:
+            alpha = np.ones(image.shape[:2], dtype=np.float32)
+        else:
+            alpha = image[:, :, 3].astype(np.float32) / 255.0
+        return cls(image[:, :, :3].astype(np.float32) * alpha[:, :, None], alpha)
+
+    # Sprite tetszőleges cv2 rajzolásból: a draw(canvas) fekete és fehér vásznon is lefut, a kettő
+    # különbségéből adódik az (élsimított) fedettség, a fekete vászon pedig az előre szorzott szín
+    @classmethod
+    def from_drawing(cls, draw, width, height):
+        on_black = np.zeros((height, width, 3), dtype=np.uint8)
+        on_white = np.full((height, width, 3), 255, dtype=np.uint8)
+        draw(on_black)
+        draw(on_white)
+        coverage = 1.0 - (on_white.astype(np.float32) - on_black.astype(np.float32)).mean(axis=2) / 255.0
+        return cls(on_black, np.clip(coverage, 0.0, 1.0))
+
+    @classmethod
+    def from_file(cls, path):
+        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise FileNotFoundError(f"Nem található a kép: {path}")
+        return cls.from_image(image)
+
+    # Sprite ráhelyezése a frame-re (helyben), a bal felső sarka (x, y) pozícióban
+    def blit(self, frame, x, y):
+        h, w = frame.shape[:2]
+        x1, y1 = max(0, x), max(0, y)
+        x2, y2 = min(w, x + self.width), min(h, y + self.height)
+        if x1 >= x2 or y1 >= y2:
+            return frame
+
+        roi = frame[y1:y2, x1:x2]
+        sprite_slice = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+        blended = self.premultiplied[sprite_slice] + roi * self.inverse_alpha[sprite_slice]
+        roi[:] = np.clip(blended + 0.5, 0, 255).astype(np.uint8)
+        return frame
@@ -1,7 +1,7 @@
 import os
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
+from .binned_heatmap import BinnedHeatmap
 
 # Focipálya kirajzolása
 def draw_football_pitch(ax):
@@ -63,19 +63,11 @@ def generate_ball_heatmap(ball_coordinates: list[tuple[float, float]], output_pa
         print("Nincs érvényes labdakoordináta a hőtérkép generálásához!")
         return
 
-    coords = np.array(filtered_coords)
-    x = coords[:, 0]
-    y = coords[:, 1]
-
-    # Ábra létrehozása
-    fig, ax = plt.subplots(figsize=(12, 8))
-    draw_football_pitch(ax)
-    sns.kdeplot(x=x, y=y, fill=True, cmap="hot", bw_adjust=0.5, thresh=0.05, alpha=0.7)
-    ax.set_title("Labda hőtérképe", fontsize=14)
-    ax.set_xlabel("Pálya hossza (m)")
-    ax.set_ylabel("Pálya szélessége (m)")
-
-    # Mentés fájlba
-    plt.savefig(output_path, dpi=150)
-    plt.close()
+    # Rácsos hőtérkép: egyetlen sorozat, a minták számától független költséggel
+    heatmap = BinnedHeatmap(draw_football_pitch)
+    binned = heatmap.bin_positions(np.zeros(len(filtered_coords), dtype=np.int64), filtered_coords, 1)
+    try:
+        heatmap.save(heatmap.smooth(binned[0]), [output_path], "Labda hőtérképe")
+    finally:
+        heatmap.close()
     print(f"Labda hőtérkép mentve: {output_path}")
\ No newline at end of file
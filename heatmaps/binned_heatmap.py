@@ -0,0 +1,122 @@
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import BoundaryNorm, ListedColormap
+
+# Rácsos hőtérkép motor: a pályakoordináták fix méteres cellákba kerülnek (egyetlen bincount az
+# összes sorozatra), a sűrűség FFT-s Gauss-konvolúcióval készül, a megjelenítés pedig egy
+# imshow réteg egy egyszer megrajzolt pálya háttér fölött. A költség a rács méretétől függ, nem
+# a minták számától. A kinézet a seaborn kdeplot(fill=True, cmap, bw_adjust, thresh) ábráit
+# követi: Scott-féle sávszélesség (a rácsból becsült kovarianciával), iso-arányos szintek, sávonkénti
+# színek, a thresh alatti tömeg átlátszó
+class BinnedHeatmap:
+    def __init__(self, draw_pitch, pitch_length=105, pitch_width=68, cell_size=0.25, bw_adjust=0.5, thresh=0.05, levels=10, cmap="hot", alpha=0.7):
+        self.draw_pitch = draw_pitch
+        self.pitch_length = pitch_length
+        self.pitch_width = pitch_width
+        self.cell_size = cell_size
+        self.bw_adjust = bw_adjust
+        self.thresh = thresh
+        self.levels = levels
+        self.cmap = plt.get_cmap(cmap)
+        self.alpha = alpha
+
+        self.nx = int(np.ceil(pitch_length / cell_size))
+        self.ny = int(np.ceil(pitch_width / cell_size))
+        self.x_centers = (np.arange(self.nx) + 0.5) * cell_size
+        self.y_centers = (np.arange(self.ny) + 0.5) * cell_size
+
+        # Gyorsítótárazott ábra: a pálya egyszer rajzolódik, mentésenként csak a réteg változik
+        self.fig = None
+        self.ax = None
+        self.image = None
+
+    # Minták cellákba sorolása: series_index (N,) a sorozat sorszáma (0..series_count-1), xy (N, 2)
+    # méterben. Kimenet: (series_count, ny, nx) mintaszámok; a pályán kívüli pontok a szélső cellákba kerülnek
+    def bin_positions(self, series_index, xy, series_count):
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        series_index = np.asarray(series_index, dtype=np.int64)
+        valid = np.isfinite(xy).all(axis=1)
+        series_index, xy = series_index[valid], xy[valid]
+
+        cx = np.clip((xy[:, 0] / self.cell_size).astype(np.int64), 0, self.nx - 1)
+        cy = np.clip((xy[:, 1] / self.cell_size).astype(np.int64), 0, self.ny - 1)
+        cells = (series_index * self.ny + cy) * self.nx + cx
+        counts = np.bincount(cells, minlength=series_count * self.ny * self.nx)
+        return counts.reshape(series_count, self.ny, self.nx).astype(np.float64)
+
+    # Sűrűség egy sorozat mintaszámaiból: a minták kovarianciája a rácsból becsülve, Scott-szabály
+    # (n^(-1/6)) a bw_adjust szorzóval, majd FFT-s konvolúció a (ferde) Gauss-kernellel, ahogy a
+    # gaussian_kde is a teljes kovarianciát használja
+    def smooth(self, counts):
+        total = counts.sum()
+        if total == 0:
+            return counts
+        grid_x, grid_y = np.meshgrid(self.x_centers, self.y_centers)
+        mean_x, mean_y = np.average(grid_x, weights=counts), np.average(grid_y, weights=counts)
+        dx, dy = grid_x - mean_x, grid_y - mean_y
+        covariance = np.array([[np.average(dx * dx, weights=counts), np.average(dx * dy, weights=counts)],
+                               [np.average(dx * dy, weights=counts), np.average(dy * dy, weights=counts)]])
+        covariance *= (self.bw_adjust * total ** (-1 / 6)) ** 2
+        # Legalább egy cellányi simítás tengelyenként (egyetlen pozíciónál is)
+        covariance += np.eye(2) * max(0.0, self.cell_size ** 2 - min(np.diag(covariance)))
+
+        # Kernel a ±4 szórásnyi környezetre, cellaközéppontokon kiértékelve
+        radius_x = int(np.ceil(4 * np.sqrt(covariance[0, 0]) / self.cell_size))
+        radius_y = int(np.ceil(4 * np.sqrt(covariance[1, 1]) / self.cell_size))
+        offset_x, offset_y = np.meshgrid(np.arange(-radius_x, radius_x + 1) * self.cell_size,
+                                         np.arange(-radius_y, radius_y + 1) * self.cell_size)
+        offsets = np.stack([offset_x, offset_y], axis=-1)
+        kernel = np.exp(-0.5 * np.einsum("...i,ij,...j->...", offsets, np.linalg.inv(covariance), offsets))
+
+        # Lineáris (nem körkörös) konvolúció FFT-vel, nullával kitöltve
+        shape = (self.ny + kernel.shape[0] - 1, self.nx + kernel.shape[1] - 1)
+        density = np.fft.irfft2(np.fft.rfft2(counts, shape) * np.fft.rfft2(kernel, shape), shape)
+        density = density[radius_y:radius_y + self.ny, radius_x:radius_x + self.nx]
+        density = np.maximum(density, 0)
+        return density / density.sum()
+
+    # Iso-arányos szintek: az i. szint alatti cellák a tömeg levels[i] részét hagyják ki (seaborn)
+    def get_levels(self, density):
+        isoprop = np.linspace(self.thresh, 1, self.levels)
+        sorted_values = np.sort(density.ravel())[::-1]
+        normalized_values = np.cumsum(sorted_values) / sorted_values.sum()
+        idx = np.searchsorted(normalized_values, 1 - isoprop)
+        return np.unique(np.take(sorted_values, idx, mode="clip"))
+
+    def _get_figure(self):
+        if self.fig is None:
+            self.fig, self.ax = plt.subplots(figsize=(12, 8))
+            self.draw_pitch(self.ax)
+            self.image = self.ax.imshow(np.zeros((self.ny, self.nx)), origin="lower", interpolation="bilinear",
+                                        extent=(0, self.nx * self.cell_size, 0, self.ny * self.cell_size), alpha=self.alpha)
+            self.ax.set_xlim(0, self.pitch_length)
+            self.ax.set_ylim(0, self.pitch_width)
+        return self.fig, self.ax
+
+    # Hőtérkép mentése egy vagy több fájlba; a sűrűség a smooth() kimenete
+    def save(self, density, output_paths, title, title_color="black", fontweight="normal", dpi=150):
+        fig, ax = self._get_figure()
+        levels = self.get_levels(density) if density.sum() > 0 else np.array([])
+        if len(levels) >= 2:
+            # Sávonkénti színek a sáv közepének értéke alapján, ahogy a contourf színez; a legalsó
+            # szint alatti cellák átlátszók (maszk helyett, így a széleken is sima az interpoláció)
+            midpoints = (levels[:-1] + levels[1:]) / 2
+            cmap = ListedColormap(self.cmap((midpoints - levels[0]) / (levels[-1] - levels[0])))
+            cmap.set_under((0, 0, 0, 0))
+            self.image.set_cmap(cmap)
+            self.image.set_norm(BoundaryNorm(levels, cmap.N))
+            self.image.set_data(np.minimum(density, levels[-1]))
+            self.image.set_visible(True)
+        else:
+            self.image.set_visible(False)
+        ax.set_title(title, fontsize=14, color=title_color, fontweight=fontweight)
+
+        for output_path in output_paths:
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            fig.savefig(output_path, dpi=dpi)
+
+    def close(self):
+        if self.fig is not None:
+            plt.close(self.fig)
+            self.fig = None
\ No newline at end of file
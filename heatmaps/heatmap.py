@@ -1,7 +1,9 @@
 import os
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
+from itertools import chain
+from utils import PresenceIndex
+from .binned_heatmap import BinnedHeatmap
 
 # 2D focipálya rajzolása
 def draw_football_pitch(ax):
@@ -65,7 +67,8 @@ def generate_player_heatmaps(player_coordinates: list[dict],
                              track_id_to_team: dict[int, int], 
                              output_dir: str,
                              tracker=None, 
-                             min_ratio=0.5):
+                             min_ratio=0.5,
+                             presence_index=None):
     # Kimeneti könyvtár létrehozása, ha nem létezik
     os.makedirs(output_dir, exist_ok=True)
 
@@ -77,31 +80,27 @@ def generate_player_heatmaps(player_coordinates: list[dict],
     os.makedirs(team_dirs[1], exist_ok=True)
     os.makedirs(team_dirs[2], exist_ok=True)
 
-    # Játékos pozícióinak tárolása
-    player_presence = {}
-    player_positions = {}
-
-    total_frames = len(player_coordinates)
-
-    # Játékos ID-k gyűjtése és pozíciók tárolása
-    for frame_data in player_coordinates:
-        for player_id, coord in frame_data.items():
-            if player_id not in player_presence:
-                player_presence[player_id] = 0
-                player_positions[player_id] = []
-            player_presence[player_id] += 1
-            player_positions[player_id].append(coord)
-
-    # Csak azok a játékosok, akik legalább a frame-ek 50%-ában jelen vannak
-    for player_id, count in player_presence.items():
-        if count >= total_frames * min_ratio:
-            coords = np.array(player_positions[player_id])
-            x, y = coords[:, 0], coords[:, 1]
-
-            # Hőtérkép generálása
-            fig, ax = plt.subplots(figsize=(12, 8))
-            draw_football_pitch(ax)  # Pálya háttér
-            sns.kdeplot(x=x, y=y, fill=True, cmap="hot", bw_adjust=0.5, thresh=0.05, alpha=0.7)
+    # Csak azok a játékosok, akik legalább a frame-ek 50%-ában jelen vannak (a jelenléti index
+    # a koordinátákból épül, ha az elemzés nem adta át)
+    if presence_index is None:
+        presence_index = PresenceIndex.from_frames(player_coordinates)
+    player_ids = presence_index.get_players_with_minimum_presence(min_ratio)
+    if not player_ids:
+        return
+
+    # Az összes pozíció egyetlen lapított menetben, majd minden kiválasztott játékos egy bincounttal
+    counts = np.fromiter(map(len, player_coordinates), dtype=np.int64, count=len(player_coordinates))
+    total = int(counts.sum())
+    track_ids = np.fromiter(chain.from_iterable(player_coordinates), dtype=np.int64, count=total)
+    positions = np.fromiter(chain.from_iterable(chain.from_iterable(frame_data.values() for frame_data in player_coordinates)),
+                            dtype=np.float64, count=2 * total).reshape(-1, 2)
+    sorted_ids = np.sort(player_ids)
+    selected = np.isin(track_ids, sorted_ids)
+
+    heatmap = BinnedHeatmap(draw_football_pitch)
+    binned = heatmap.bin_positions(np.searchsorted(sorted_ids, track_ids[selected]), positions[selected], len(sorted_ids))
+    try:
+        for player_id in player_ids:
             # Csapat mezszínének meghatározása és RGB normalizálás
             team_id = track_id_to_team.get(player_id)
             if team_id == 1:
@@ -113,20 +112,14 @@ def generate_player_heatmaps(player_coordinates: list[dict],
 
             # RGB [0-1] formátum
             team_color_normalized = tuple(team_color / 255.0)
-            # Hőtérképek címei megfelelő színnel
-            ax.set_title(f"Hőtérkép - Játékos {player_id}", fontsize=14, color=team_color_normalized, fontweight='bold')
 
-            # Tengelyek címei
-            ax.set_xlabel("Pálya hossza (m)")
-            ax.set_ylabel("Pálya szélessége (m)")
-
-            # Hőtérképek csoportosítása csapatok szerint
-            team_id = track_id_to_team.get(player_id)
+            # Hőtérképek csoportosítása csapatok szerint, és mentés a közös könyvtárba is
+            output_paths = []
             if team_id in (1, 2):
-                output_path = os.path.join(team_dirs[team_id], f"heatmap_{player_id}.png")
-                plt.savefig(output_path, dpi=150)
+                output_paths.append(os.path.join(team_dirs[team_id], f"heatmap_{player_id}.png"))
+            output_paths.append(os.path.join(output_dir, f"heatmap_{player_id}.png"))
 
-            # Mentés fájlba
-            output_path = os.path.join(output_dir, f"heatmap_{player_id}.png")
-            plt.savefig(output_path, dpi=150)
-            plt.close()
\ No newline at end of file
+            density = heatmap.smooth(binned[np.searchsorted(sorted_ids, player_id)])
+            heatmap.save(density, output_paths, f"Hőtérkép - Játékos {player_id}", title_color=team_color_normalized, fontweight="bold")
+    finally:
+        heatmap.close()
\ No newline at end of file
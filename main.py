@@ -1,6 +1,6 @@
-from utils import load_video, generate_output_video, get_majority_team_sides, closest_player_ids_filter
+from utils import VideoFrameSource, generate_output_video, get_majority_team_sides, closest_player_ids_filter
 from tracker import Tracker
-from pitch_config import process_keypoint_annotations
+from pitch_config import KeypointDetector
 from ultralytics import YOLO
 from heatmaps import generate_player_heatmaps, generate_ball_heatmap
 from ball_possession import BallPossession
@@ -8,6 +8,7 @@ from passing_measurement import PassCounter
 from player_positions_per_frame import plot_players_per_half_graph
 from player_activity import generate_player_activity_summary
 from offside_detection import OffsideDetector
+from frame_compositor import FrameCompositor
 import numpy as np
 import os
 import pickle
@@ -26,8 +27,9 @@ model_path = "models\\best.pt"
 # Keypoint detektáló modell elérési útvonala
 keypoint_model_path = "models\\best_keypoints.pt"
 
-# Videó betöltése
-frames, fps, width, height = load_video(video_path)
+# Videó megnyitása streamelt forrásként
+frames = VideoFrameSource(video_path)
+fps, width, height = frames.fps, frames.width, frames.height
 
 # Modell betöltése
 tracker = Tracker(model_path=model_path, video_fps=fps)
@@ -67,18 +69,17 @@ if os.path.exists(stub_path):
 else:
     print("Stub fájl nem található, új generálás indul...")
 
-    # Objektumdetektálás
-    tracks = tracker.detect_video(frames, read_from_stub=False, stub_path=None)
-    print("Játékosok, játékvezetők és labda detektálva!")
+    # Objektumdetektálás és kulcspont detektálás egyetlen dekódolási menetben
+    keypoint_detector = KeypointDetector(keypoint_model_path, width, height)
+    tracks = tracker.detect_video(frames, read_from_stub=False, stub_path=None, keypoint_detector=keypoint_detector)
+    print("Játékosok, játékvezetők, labda és kulcspontok detektálva!")
 
-    # Kulcspontok és játékoskoordináták számítása
-    keypoint_data = process_keypoint_annotations(
-        video_path,
-        keypoint_model_path,
+    # Játékoskoordináták és labdakoordináták számítása
+    keypoint_data = keypoint_detector.project_tracks(
         players_tracks=tracks["players"],
         ball_tracks=tracks["ball"]
     )
-    print("Kulcspontok detektálva, játékoskoordináták és labdakoordináták kiszámítva!")
+    print("Játékoskoordináták és labdakoordináták kiszámítva!")
 
     # Mentés stub fájlba
     stub_data = {
@@ -93,51 +94,50 @@ else:
         pickle.dump(stub_data, f)
     print("Stub fájl mentve:", stub_path)
 
-# Annotálás a videón
-annotated_frames = tracker.annotations(
-    frames,
+# Csapatok és játékosmérések meghatározása
+tracker.assign_teams(frames, tracks)
+tracker.measure_players(
     tracks,
-    keypoints_list=keypoint_data.get("keypoints", []),
-    player_coordinates_list=keypoint_data.get("player_coordinates", []),
-    ball_coordinates_list=keypoint_data.get("ball_coordinates", [])
+    keypoint_data.get("player_coordinates", []),
+    keypoint_data.get("ball_coordinates", [])
 )
-print("Annotálás befejeződött!")
+
+# Annotálás a videón: rétegek egyetlen kompozitorban, a kimeneti videó írásakor rajzolva
+compositor = FrameCompositor()
+compositor.add_layer("játékosok", lambda frame, frame_num: tracker.draw_players(frame, frame_num, tracks))
+compositor.add_layer("játékvezetők", lambda frame, frame_num: tracker.draw_referees(frame, frame_num, tracks))
+compositor.add_layer("labda", lambda frame, frame_num: tracker.draw_ball(frame, frame_num, tracks))
+compositor.add_layer("kulcspontok", lambda frame, frame_num: tracker.draw_keypoints(frame, frame_num, keypoint_data.get("keypoints", [])))
+compositor.add_layer("feliratok", lambda frame, frame_num: tracker.draw_player_texts(frame, frame_num, tracks, keypoint_data.get("player_coordinates", [])))
+print("Annotálás előkészítve!")
 
 # Csapatok térfél-hozzárendelésének meghatározása
 field_sides = get_majority_team_sides(
     player_coordinates=keypoint_data["player_coordinates"],
-    players_tracks=tracks["players"],
-    first_frame=frames[0],
-    team1_color=tracker.team1_color,
-    team2_color=tracker.team2_color,
-    team_assigner=tracker.teamAssigner
+    player_to_team=tracker.track_id_to_team
 )
 print("Csapatok térfél-hozzárendelése befejeződött!")
 
 # Kapusok annotálása a videón
-annotated_frames = tracker.goalkeeper_annotations(
-    annotated_frames,
-    tracks,
-    frames,
-    keypoint_data.get("player_coordinates", []),
-    field_sides
-)
-print("Kapusok annotálása befejeződött!")
+tracker.assign_goalkeeper_teams(tracks, keypoint_data.get("player_coordinates", []), field_sides)
+compositor.add_layer("kapusok", lambda frame, frame_num: tracker.draw_goalkeepers(frame, frame_num, tracks))
+print("Kapusok annotálása előkészítve!")
 
 # Legközelebbi játékosok szűrése és annotálása
 closest_player_ids_filtered = closest_player_ids_filter(tracker.closest_player_ids)
-annotated_frames = tracker.draw_closest_players_triangles(annotated_frames, closest_player_ids_filtered, tracks)
+compositor.add_layer("birtokló", lambda frame, frame_num: tracker.draw_closest_player(frame, frame_num, closest_player_ids_filtered, tracks))
 print("A labdához legközelebbi játékosok szűrése és annotálása befejeződött!")
 
 # Labdabirtoklás számítása és megjelenítése
 possession = BallPossession()
-annotated_frames = possession.measure_and_draw_possession(annotated_frames, closest_player_ids_filtered)
+possession.measure_possession(closest_player_ids_filtered, total_frames=len(tracks["players"]))
+compositor.add_layer("labdabirtoklás", possession.draw_possession)
 print("Labdabirtoklás számítása és megjelenítése befejeződött!")
 
 # Passzok számítása és annotálása
 pass_counter = PassCounter()
-pass_counter.process_passes_per_frame(closest_player_ids_filtered, total_frames=len(frames))
-annotated_frames = pass_counter.draw_pass_statistics(annotated_frames)
+pass_counter.process_passes_per_frame(closest_player_ids_filtered, total_frames=len(tracks["players"]))
+compositor.add_layer("passzok", pass_counter.draw_pass_statistics)
 print("Passzok számítása és annotálása befejeződött!")
 
 # Lesen álló játékosok detektálása és zászló megjelenítése
@@ -150,7 +150,7 @@ offside_detector = OffsideDetector(
     flag_path="offside_detection/offside_flag.png"
 )
 offsides_per_frame = offside_detector.detect_offsides_per_frame()
-annotated_frames = offside_detector.draw_offside_flags(annotated_frames, offsides_per_frame, tracks)
+compositor.add_layer("lesek", lambda frame, frame_num: offside_detector.draw_offside_flags(frame, frame_num, offsides_per_frame, tracks))
 offside_detector.plot_top5_offsides(
     fps=fps,
     team1_color_rgb=tuple(np.array(tracker.team1_color) / 255.0),
@@ -159,7 +159,7 @@ offside_detector.plot_top5_offsides(
 print("Lesen álló játékosok detektálása és megjelenítése befejeződött!")
 
 # Színes négyzetek annotálása
-annotated_frames = tracker.coloured_squares_annotations(annotated_frames)
+compositor.add_layer("csapatszínek", tracker.draw_team_colors_topbar)
 print("Csapatok színével ellátott négyzetek annotálása befejeződött!")
 
 # Játékos pozíciók térfélenkénti grafikonjának generálása
@@ -187,7 +187,7 @@ generate_ball_heatmap(keypoint_data.get("ball_coordinates", []))
 print("Hőtérképek elmentve a heatmaps mappába!")
 
 # Output videó generálása
-generate_output_video(annotated_frames, output_video_path, fps, width, height)
+generate_output_video(compositor.render(frames), output_video_path, fps, width, height)
 print("Kimeneti videó mentve:", output_video_path)
 
 #print("Kapus ID-k:", tracker.goalkeeper_ids)
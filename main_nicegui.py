@@ -1,6 +1,6 @@
 from nicegui import ui, events, app
 from pathlib import Path
-from main_restructured import run_analysis_pipeline
+from main_restructured import run_analysis_pipeline, rerender_annotated_video
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import shutil
@@ -594,8 +594,10 @@ def analysis_config_page():
         container_to_hide.set_visibility(False)
         # Töltőképernyő megnyitása
         loader_dialog.open()
-        # Elemzés futtatása a háttérben a helyi frissítő függvénnyel
-        await run_in_thread(lambda: run_analysis_pipeline(video_path, update_status, config))
+        # Elemzés futtatása a háttérben a helyi frissítő függvénnyel; újrarenderelésnél
+        # csak az annotált videó készül el újra a mentett elemzésből
+        pipeline = rerender_annotated_video if config.get("rerender_only") else run_analysis_pipeline
+        await run_in_thread(lambda: pipeline(video_path, update_status, config))
         # Töltőképernyő bezárása
         loader_dialog.close()
         ui.notify("Elemzés befejeződött!")
@@ -650,8 +652,10 @@ def analysis_config_page():
                             show_pass_statistics_cb = ui.checkbox("Passz statisztikák overlay", value=True)
                             show_closest_player_triangle_cb = ui.checkbox("Legközelebbi játékos a labdához annotálása", value=True)
                             show_offside_flags_cb = ui.checkbox("Lesek annotálása", value=True)
+                            offside_passes_only_cb = ui.checkbox("Les vizsgálata csak passzoknál", value=True)
                             show_keypoints_cb = ui.checkbox("Kulcspontok annotálása", value=False)
                             show_player_coordinates_cb = ui.checkbox("Játékosok koordinátáinak annotálása", value=False)
+                            rerender_only_cb = ui.checkbox("Csak újrarenderelés (mentett elemzésből)", value=False)
 
                         # Jobb oldali oszlop, statisztikák és grafikonok opciói
                         with ui.column().classes("gap-2").style("flex: 1; min-width: 0;"):
@@ -683,6 +687,7 @@ def analysis_config_page():
                                 "show_pass_statistics": show_pass_statistics_cb.value,
                                 "show_closest_player_triangle": show_closest_player_triangle_cb.value,
                                 "show_offside_flags": show_offside_flags_cb.value,
+                                "offside_mode": "passes" if offside_passes_only_cb.value else "frames",
                                 "show_keypoints": show_keypoints_cb.value,
                                 "show_player_coordinates": show_player_coordinates_cb.value,
                                 # Statisztikák és grafikonok
@@ -690,7 +695,9 @@ def analysis_config_page():
                                 "show_players_per_half_graph": show_players_per_half_graph_cb.value,
                                 "show_offside_stats": show_offside_stats_cb.value,
                                 "show_player_heatmaps": show_player_heatmaps_cb.value,
-                                "show_ball_heatmap": show_ball_heatmap_cb.value
+                                "show_ball_heatmap": show_ball_heatmap_cb.value,
+                                # Mentett elemzés újrafelhasználása
+                                "rerender_only": rerender_only_cb.value
                             })
                         ).classes("w-48 text-lg mt-2")
                 # Elemzés konfigurációs beállítások
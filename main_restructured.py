@@ -1,18 +1,44 @@
+import gc
 import os
 import pickle
 import numpy as np
-from utils import load_video, generate_output_video, get_majority_team_sides, closest_player_ids_filter, count_ball_possessions_per_player, save_video_thumbnail, get_players_with_minimum_presence, get_valid_player_colors, save_all_jersey_images
-from tracker import Tracker
-from pitch_config import process_keypoint_annotations
+from utils import VideoFrameSource, StagePipeline, encode_video_frames, save_video_thumbnail, get_valid_player_colors, save_all_jersey_images
+from tracker import Tracker, TrackStore
+from pitch_config import KeypointDetector
 from heatmaps import generate_player_heatmaps, generate_ball_heatmap
-from ball_possession import BallPossession
-from passing_measurement import PassCounter
 from player_positions_per_frame import plot_players_per_half_graph
 from player_activity import generate_player_activity_summary
-from offside_detection import OffsideDetector
 from player_statistics import generate_basic_player_statistics
+from frame_compositor import FrameCompositor, ParallelRenderer
+from match_analytics import MatchAnalytics
+
+# Detektálási stub betöltése: (tracks, keypoint_data), vagy (None, None), ha nincs érvényes stub
+def load_stub(stub_path, tracker, update):
+    if not os.path.exists(stub_path):
+        return None, None
+    try:
+        with open(stub_path, "rb") as f:
+            stub_data = pickle.load(f)
+        if all(k in stub_data for k in ("tracks", "goalkeeper_ids", "keypoints", "player_coordinates", "ball_coordinates")):
+            tracker.goalkeeper_ids = stub_data.get("goalkeeper_ids", set())
+            keypoint_data = {
+                "keypoints": stub_data["keypoints"],
+                "player_coordinates": stub_data["player_coordinates"],
+                "ball_coordinates": stub_data["ball_coordinates"]
+            }
+            update("Stub fájl sikeresen betöltve!")
+            return stub_data["tracks"], keypoint_data
+    except:
+        update("Hiba történt a stub fájl betöltésekor, újraszámítás szükséges.")
+    return None, None
 
 # Fő elemzési pipeline
+# Teljesítmény riportok (lánc, cache és renderelési statisztikák) a státusz callbacken keresztül,
+# csak ha a "performance_report" beállítás be van kapcsolva
+def report_performance(config, update, msg):
+    if config.get("performance_report", False):
+        update(msg)
+
 def run_analysis_pipeline(video_path: str, status_callback=None, config=None):
     if config is None:
         config = {}
@@ -22,6 +48,7 @@ def run_analysis_pipeline(video_path: str, status_callback=None, config=None):
     output_video_dir = f"output_videos/annotated_{video_stem}"
     output_video_path = f"{output_video_dir}/annotated_{video_stem}.mp4"
     stub_path = f"stubs/{video_stem}.pkl"
+    analysis_path = f"stubs/{video_stem}_analysis.pkl"
     heatmap_dir = os.path.join(output_video_dir, "heatmaps")
     model_path = "models/best.pt"
     keypoint_model_path = "models/best_keypoints.pt"
@@ -32,44 +59,54 @@ def run_analysis_pipeline(video_path: str, status_callback=None, config=None):
         if status_callback:
             status_callback(msg)
 
-    # Videó betöltése
-    frames, fps, width, height = load_video(video_path)
+    # Végrehajtási mód: "sequential" (alapértelmezett) vagy "concurrent", ahol a dekódolás,
+    # a detektálás, a renderelés és a kódolás külön szálakon, korlátos sorokkal összekötve fut.
+    # A render_workers > 1 beállítás a kimeneti videót rövid darabokban (render_chunk_size), több folyamaton rendereli.
+    # A stats_only mód csak a statisztikákat és a grafikonokat készíti el, kimeneti videó nélkül
+    # A performance_report a lánc-, cache- és renderelési statisztikákat a státusz callbacknek adja
+    concurrent = config.get("pipeline_mode", "sequential") == "concurrent"
+    stats_only = config.get("stats_only", False)
+    queue_size = config.get("pipeline_queue_size", 8)
+
+    # Videó megnyitása streamelt forrásként (a frame-ek nem kerülnek egyszerre a memóriába)
+    frames = VideoFrameSource(video_path)
+    fps, width, height = frames.fps, frames.width, frames.height
     tracker = Tracker(model_path=model_path, video_fps=fps)
 
     # Stub betöltése vagy új generálása
     update("Stub fájl betöltése...")
-    tracks = None
-    keypoint_data = None
-    if os.path.exists(stub_path):
-        try:
-            with open(stub_path, "rb") as f:
-                stub_data = pickle.load(f)
-            if all(k in stub_data for k in ("tracks", "goalkeeper_ids", "keypoints", "player_coordinates", "ball_coordinates")):
-                tracks = stub_data["tracks"]
-                tracker.goalkeeper_ids = stub_data.get("goalkeeper_ids", set())
-                keypoint_data = {
-                    "keypoints": stub_data["keypoints"],
-                    "player_coordinates": stub_data["player_coordinates"],
-                    "ball_coordinates": stub_data["ball_coordinates"]
-                }
-                update("Stub fájl sikeresen betöltve!")
-        except:
-            update("Hiba történt a stub fájl betöltésekor, újraszámítás szükséges.")
+    tracks, keypoint_data = load_stub(stub_path, tracker, update)
 
     # Új feldolgozás, ha nincs stub
     update("Stub fájl létrehozása...")
     if tracks is None or keypoint_data is None:
-        # Objektumdetektálás
+        # Objektumdetektálás és kulcspont detektálás egyetlen dekódolási menetben
+        # Kulcspont modell kötegelve; kulcsképkocka módban csak minden k-adik frame-en
+        # vagy nagy kameramozgásnál fut, a köztes homográfiák interpolálva
+        keypoint_detector = KeypointDetector(keypoint_model_path, 
+                                             width, 
+                                             height,
+                                             batch_size=config.get("keypoint_batch_size"),
+                                             # Mozgásküszöb megadásakor alapból tisztán mozgásvezérelt mód
+                                             keyframe_interval=config.get("keypoint_interval", 1 if config.get("keypoint_motion_threshold") is None else None),
+                                             motion_threshold=config.get("keypoint_motion_threshold"),
+                                             homography_tolerance=config.get("homography_tolerance", 2.0))
+        detection_pipeline = StagePipeline(queue_size=queue_size, concurrent=concurrent)
         tracks = tracker.detect_video(frames, 
                                       read_from_stub=False, 
                                       stub_path=None, 
-                                      status_callback=update)
-        # Kulcspontok és koordináták kiszámítása
-        keypoint_data = process_keypoint_annotations(video_path, 
-                                                     keypoint_model_path, 
-                                                     tracks["players"], 
-                                                     tracks["ball"], 
-                                                     status_callback=update)
+                                      status_callback=update,
+                                      keypoint_detector=keypoint_detector,
+                                      pipeline=detection_pipeline,
+                                      batch_size=config.get("detection_batch_size"))
+        if concurrent:
+            report_performance(config, update, "Detektálási lánc:\n" + detection_pipeline.format_report())
+        # Játékos- és labdakoordináták kiszámítása (az interpolált labdapozíciókkal)
+        keypoint_data = keypoint_detector.project_tracks(tracks["players"], tracks["ball"])
+        report_performance(config, update, keypoint_detector.format_keyframe_stats())
+        report_performance(config, update, keypoint_detector.homography_cache.format_stats())
+        # A kulcspont modell felszabadítása: a további lépések (és a renderelő folyamatok) már nem használják
+        del keypoint_detector
         # Stub mentése
         os.makedirs(os.path.dirname(stub_path), exist_ok=True)
         with open(stub_path, "wb") as f:
@@ -81,83 +118,26 @@ def run_analysis_pipeline(video_path: str, status_callback=None, config=None):
                 "ball_coordinates": keypoint_data["ball_coordinates"]
             }, f)
 
-    # Annotálás
-    update("Annotálás folyamatban...")
-    annotated_frames = tracker.annotations(
-            frames, 
-            tracks,
-            keypoints_list=keypoint_data["keypoints"],
-            player_coordinates_list=keypoint_data["player_coordinates"],
-            ball_coordinates_list=keypoint_data["ball_coordinates"],
-            draw_player_ellipses = config.get("show_player_ellipses", True),
-            draw_player_ids = config.get("show_player_ids", True),
-            draw_referee_ellipses = config.get("show_referees", True),
-            draw_ball_triangle = config.get("show_ball_triangle", True),
-            draw_speed_distance = config.get("show_speed_distance", True),
-            draw_keypoints = config.get("show_keypoints", True),
-            draw_player_coordinates = config.get("show_player_coordinates", True)
-    )
+    # Oszlopos track tároló a tömb alapú elemzésekhez (jelenlét, térfél szavazás); a szótárlisták mellé
+    # épül, a rajzolás és a stub továbbra is azokat használja
+    track_store = TrackStore.from_tracks(tracks, 
+                                         keypoint_data["player_coordinates"], 
+                                         keypoint_data["ball_coordinates"])
 
-    # Térfél meghatározása
-    update("Térfelek meghatározása...")
-    field_sides = get_majority_team_sides(
-        player_coordinates=keypoint_data["player_coordinates"],
-        players_tracks=tracks["players"],
-        first_frame=frames[0],
-        team1_color=tracker.team1_color,
-        team2_color=tracker.team2_color,
-        team_assigner=tracker.teamAssigner
-    )
+    # Tiszta elemzési menet: csapatok, sebességek, birtoklás, passzok és lesek, rajzolás nélkül
+    analytics = MatchAnalytics(tracker, 
+                               tracks, 
+                               track_store, 
+                               keypoint_data["player_coordinates"], 
+                               keypoint_data["ball_coordinates"],
+                               offside_mode=config.get("offside_mode", "passes"),
+                               stub_path=stub_path).run(frames, update)
+    # Az elemzés teljes állapota a stub mellé, az újrarendereléshez (rerender_annotated_video)
+    analytics.save(analysis_path)
+    field_sides = analytics.field_sides
+    offside_detector = analytics.offside_detector
 
-    # Kapusok annotálása
-    update("Kapusok annotációja...")
-    annotated_frames = tracker.goalkeeper_annotations(annotated_frames, 
-                                                      tracks, frames, 
-                                                      keypoint_data["player_coordinates"], 
-                                                      field_sides,
-                                                      draw_goalkeeper_ellipses = config.get("show_player_ellipses", True),
-                                                      draw_goalkeeper_ids = config.get("show_player_ids", True)
-                                                      )
-    closest_player_ids_filtered = closest_player_ids_filter(tracker.closest_player_ids)
-    ball_possession_counter = count_ball_possessions_per_player(closest_player_ids_filtered)
-
-    # Labdát birtokló játékosok annotálása
-    update("Labdát birtokló játékosok annotálása...")
-    draw_closest_player_triangle = config.get("show_closest_player_triangle", True)
-    if draw_closest_player_triangle:
-        annotated_frames = tracker.draw_closest_players_triangles(annotated_frames, closest_player_ids_filtered, tracks)
-
-    # Labdabirtoklás kiszámítása
-    update("Labdabirtoklás számítása és annotálása...")
-    possession = BallPossession()
-    annotated_frames = possession.measure_and_draw_possession(annotated_frames, 
-                                                              closest_player_ids_filtered,
-                                                              draw_possession_overlay = config.get("show_possession_overlay", True)
-                                                              )
-
-    # Passzok számlálása
-    update("Passzok számítása és annotálása...")
-    pass_counter = PassCounter()
-    pass_counter.process_passes_per_frame(closest_player_ids_filtered, len(frames))
-    draw_pass_statistics = config.get("show_pass_statistics")
-    if draw_pass_statistics:
-        annotated_frames = pass_counter.draw_pass_statistics(annotated_frames)
-    individual_pass_stats = pass_counter.get_player_passes()
-
-    # Lesen álló játékosok detektálása
-    update("Lesek detektálása és annotálása...")
-    offside_detector = OffsideDetector(
-        player_coordinates=keypoint_data["player_coordinates"],
-        ball_coordinates=keypoint_data["ball_coordinates"],
-        closest_player_ids_filtered=closest_player_ids_filtered,
-        track_id_to_team=tracker.track_id_to_team,
-        field_sides=field_sides,
-        flag_path="offside_detection/offside_flag.png"
-    )
-    offsides_per_frame = offside_detector.detect_offsides_per_frame()
-    draw_offside_flags = config.get("show_offside_flags", True)
-    if draw_offside_flags:
-        annotated_frames = offside_detector.draw_offside_flags(annotated_frames, offsides_per_frame, tracks)
+    # Top 5 lesen álló játékos grafikon
     statistics_dir = os.path.join(output_video_dir, "statistics")
     draw_offside_stats = config.get("show_offside_stats", True)
     if draw_offside_stats:
@@ -167,13 +147,6 @@ def run_analysis_pipeline(video_path: str, status_callback=None, config=None):
             team1_color_rgb=tuple(np.array(tracker.team1_color) / 255.0),
             team2_color_rgb=tuple(np.array(tracker.team2_color) / 255.0)
         )
-    offside_frame_counts = dict(offside_detector.offsides_stats)
-
-    # Csapat színek megjelenítése
-    update("Csapatok jelölése és színezése...")
-    annotated_frames = tracker.coloured_squares_annotations(annotated_frames, 
-                                                            draw_team_colors_topbar = config.get("show_team_colors_topbar", True)
-                                                            )
 
     # Játékosok száma térfelenként a megadott időintervallumokban grafikon elkészítése
     update("Grafikonok és statisztikák készítése...")
@@ -198,7 +171,8 @@ def run_analysis_pipeline(video_path: str, status_callback=None, config=None):
             player_coordinates_list=keypoint_data["player_coordinates"],
             speed_estimator=tracker.speed_estimator,
             tracker=tracker,
-            output_dir=statistics_dir
+            output_dir=statistics_dir,
+            presence_index=analytics.coordinate_presence
         )
 
     # Játékosok és labda hőtérképek generálása
@@ -207,7 +181,8 @@ def run_analysis_pipeline(video_path: str, status_callback=None, config=None):
         generate_player_heatmaps(keypoint_data["player_coordinates"], 
                                 track_id_to_team=tracker.track_id_to_team, 
                                 output_dir = heatmap_dir,
-                                tracker=tracker)
+                                tracker=tracker,
+                                presence_index=analytics.coordinate_presence)
     
     ball_dir = os.path.join(heatmap_dir, "ball_heatmap")
     draw_ball_heatmap = config.get("show_ball_heatmap")
@@ -217,7 +192,7 @@ def run_analysis_pipeline(video_path: str, status_callback=None, config=None):
         
     # Játékosok egyéni statisztikáinak elkészítése
     update("Színes mezkártyák rajzolása és mentése...")
-    valid_players = get_players_with_minimum_presence(tracks["players"], minimum_ratio=0.5)
+    valid_players = analytics.track_presence.get_players_with_minimum_presence(minimum_ratio=0.5)
     valid_player_colors = get_valid_player_colors(
         valid_players,
         tracker.track_id_to_team,
@@ -234,17 +209,131 @@ def run_analysis_pipeline(video_path: str, status_callback=None, config=None):
         players_tracks=tracks["players"],
         track_id_to_team=tracker.track_id_to_team,
         speed_estimator=tracker.speed_estimator,
-        individual_passes=individual_pass_stats,
-        ball_possession_count=ball_possession_counter,
-        offside_frame_counts=offside_frame_counts,
+        individual_passes=analytics.individual_pass_stats,
+        ball_possession_count=analytics.ball_possession_counter,
+        offside_frame_counts=analytics.offside_frame_counts,
         fps=fps,
         output_dir=os.path.join(output_video_dir, "statistics"),
-        minimum_ratio=0.5
+        minimum_ratio=0.5,
+        presence_index=analytics.track_presence
     )
 
-    # Kimeneti videó mentése + előnézeti kép generálása
-    update("Kimeneti videó generálása és thumbnail készítése...")
-    generate_output_video(annotated_frames, output_video_path, fps, width, height)
+    # Csak statisztikák: nincs annotálás, videókódolás és thumbnail
+    if stats_only:
+        update("Statisztikák elkészültek (videó nélkül)")
+        return None
+
+    return render_annotated_video(video_path, output_video_path, frames, tracker, tracks, keypoint_data, analytics, config, update)
+
+# Annotált kimeneti videó renderelése az elemzés eredményeiből: csak kompozitálás és kódolás
+def render_annotated_video(video_path, output_video_path, frames, tracker, tracks, keypoint_data, analytics, config, update):
+    concurrent = config.get("pipeline_mode", "sequential") == "concurrent"
+    queue_size = config.get("pipeline_queue_size", 8)
+    fps, width, height = frames.fps, frames.width, frames.height
+
+    # Annotálás: minden overlay egy réteg, a kompozitor egyetlen menetben, helyben rajzolja
+    # őket a dekódolt frame-re; a show_* beállítások csak ki-be kapcsolják a rétegeket
+    update("Annotálás és kimeneti videó generálása...")
+    compositor = FrameCompositor()
+    compositor.add_layer("játékosok", lambda frame, frame_num: tracker.draw_players(frame, frame_num, tracks,
+                                                                                    draw_player_ellipses=config.get("show_player_ellipses", True),
+                                                                                    draw_player_ids=config.get("show_player_ids", True)),
+                         enabled=config.get("show_player_ellipses", True) or config.get("show_player_ids", True))
+    compositor.add_layer("játékvezetők", lambda frame, frame_num: tracker.draw_referees(frame, frame_num, tracks),
+                         enabled=config.get("show_referees", True))
+    compositor.add_layer("labda", lambda frame, frame_num: tracker.draw_ball(frame, frame_num, tracks),
+                         enabled=config.get("show_ball_triangle", True))
+    compositor.add_layer("kulcspontok", lambda frame, frame_num: tracker.draw_keypoints(frame, frame_num, keypoint_data["keypoints"]),
+                         enabled=config.get("show_keypoints", True))
+    compositor.add_layer("feliratok", lambda frame, frame_num: tracker.draw_player_texts(frame, frame_num, tracks, keypoint_data["player_coordinates"],
+                                                                                         draw_speed_distance=config.get("show_speed_distance", True),
+                                                                                         draw_player_coordinates=config.get("show_player_coordinates", True)),
+                         enabled=config.get("show_speed_distance", True) or config.get("show_player_coordinates", True))
+    compositor.add_layer("kapusok", lambda frame, frame_num: tracker.draw_goalkeepers(frame, frame_num, tracks,
+                                                                                      draw_goalkeeper_ellipses=config.get("show_player_ellipses", True),
+                                                                                      draw_goalkeeper_ids=config.get("show_player_ids", True)),
+                         enabled=config.get("show_player_ellipses", True) or config.get("show_player_ids", True))
+    compositor.add_layer("birtokló", lambda frame, frame_num: tracker.draw_closest_player(frame, frame_num, analytics.closest_player_ids_filtered, tracks),
+                         enabled=config.get("show_closest_player_triangle", True))
+    compositor.add_layer("labdabirtoklás", analytics.possession.draw_possession,
+                         enabled=config.get("show_possession_overlay", True))
+    compositor.add_layer("passzok", analytics.pass_counter.draw_pass_statistics,
+                         enabled=bool(config.get("show_pass_statistics")))
+    compositor.add_layer("lesek", lambda frame, frame_num: analytics.offside_detector.draw_offside_flags(frame, frame_num, analytics.offsides_per_frame, tracks),
+                         enabled=config.get("show_offside_flags", True))
+    compositor.add_layer("csapatszínek", tracker.draw_team_colors_topbar,
+                         enabled=config.get("show_team_colors_topbar", True))
+
+    render_workers = config.get("render_workers", 1)
+    if render_workers > 1:
+        # A detektáló modellre a rendereléshez nincs szükség: a fork előtt felszabadul, hogy a
+        # munkafolyamatok ne örököljék
+        tracker.model = None
+        gc.collect()
+        # Párhuzamos renderelés rövid darabokban, korlátos ablakkal; a kódolás a rendereléssel átfedésben fut
+        renderer = ParallelRenderer(compositor, frames, analytics.total_frames, 
+                                    workers=render_workers, 
+                                    chunk_size=config.get("render_chunk_size", 4))
+        for _ in encode_video_frames(renderer.render(), output_video_path, fps, width, height):
+            pass
+        report_performance(config, update, renderer.format_report())
+    else:
+        # Dekódolás -> kompozitálás -> kódolás lánc
+        render_pipeline = StagePipeline(queue_size=queue_size, concurrent=concurrent)
+        render_pipeline.add_stage("kompozitálás", compositor.render)
+        render_pipeline.add_stage("kódolás", lambda annotated_frames: encode_video_frames(annotated_frames, output_video_path, fps, width, height))
+        for _ in render_pipeline.run(frames):
+            pass
+        if concurrent:
+            report_performance(config, update, "Renderelési lánc:\n" + render_pipeline.format_report())
+        report_performance(config, update, tracker.label_renderer.cache.format_stats())
+    report_performance(config, update, "Rétegek rajzolási ideje:\n" + compositor.format_report())
+
+    # Előnézeti kép generálása
+    update("Thumbnail készítése...")
     save_video_thumbnail(video_path, output_video_path)
 
-    return output_video_path
\ No newline at end of file
+    return output_video_path
+
+# Újrarenderelés mentett elemzésből: a stubból és a mentett elemzési állapotból csak a rétegek
+# rajzolása és a kódolás fut (pl. az overlay beállítások módosítása után). Ha nincs érvényes
+# mentés, a teljes elemzés fut le
+def rerender_annotated_video(video_path: str, status_callback=None, config=None):
+    if config is None:
+        config = {}
+    filename = os.path.basename(video_path)
+    video_stem = os.path.splitext(filename)[0]
+    output_video_dir = f"output_videos/annotated_{video_stem}"
+    output_video_path = f"{output_video_dir}/annotated_{video_stem}.mp4"
+    stub_path = f"stubs/{video_stem}.pkl"
+    analysis_path = f"stubs/{video_stem}_analysis.pkl"
+    model_path = "models/best.pt"
+    os.makedirs(output_video_dir, exist_ok=True)
+
+    def update(msg):
+        if status_callback:
+            status_callback(msg)
+
+    frames = VideoFrameSource(video_path)
+    tracker = Tracker(model_path=model_path, video_fps=frames.fps)
+
+    update("Mentett elemzés betöltése...")
+    tracks, keypoint_data = load_stub(stub_path, tracker, update)
+    analytics = None
+    if tracks is not None:
+        track_store = TrackStore.from_tracks(tracks, 
+                                             keypoint_data["player_coordinates"], 
+                                             keypoint_data["ball_coordinates"])
+        analytics = MatchAnalytics.load(analysis_path, 
+                                        tracker, 
+                                        tracks, 
+                                        track_store, 
+                                        keypoint_data["player_coordinates"], 
+                                        keypoint_data["ball_coordinates"],
+                                        offside_mode=config.get("offside_mode", "passes"),
+                                        stub_path=stub_path)
+    if analytics is None:
+        update("Nincs mentett elemzés, teljes elemzés indítása...")
+        return run_analysis_pipeline(video_path, status_callback, config)
+
+    return render_annotated_video(video_path, output_video_path, frames, tracker, tracks, keypoint_data, analytics, config, update)
@@ -0,0 +1 @@
+from .match_analytics import MatchAnalytics
\ No newline at end of file
@@ -0,0 +1,202 @@
+import os
+import pickle
+import numpy as np
+from utils import TeamSideVoter, PossessionSegments, PresenceIndex
+from tracker import PLAYER
+from ball_possession import BallPossession, get_dense_coordinates
+from passing_measurement import PassCounter
+from offside_detection import OffsideDetector
+
+# A stub ujjlenyomata (módosítási idő, méret): a mentett elemzés csak ugyanahhoz a stubhoz töltődik vissza
+def get_stub_fingerprint(stub_path):
+    if stub_path is None or not os.path.exists(stub_path):
+        return None
+    stat = os.stat(stub_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Tiszta elemzési menet: a csapatok, sebességek és távolságok, a labdabirtoklás, a passzok és
+# a lesek kiszámítása a trackekből és a pályakoordinátákból, rajzolás nélkül. A frame-ekből csak
+# a mezszínekhez szükséges (első megjelenési) frame-ek dekódolódnak. Az eredmény a statisztikák
+# és a grafikonok bemenete, a rajzoló rétegek pedig csak olvassák. A teljes állapot a stub mellé
+# menthető (save), és onnan újraszámítás nélkül visszatölthető (load) egy újrarendereléshez.
+# Az offside_mode "passes" esetén a les csak a csapaton belüli passzok pillanatában vizsgálódik,
+# "frames" esetén minden birtokolt frame-en. A mentés az offside_mode-ot és a stub ujjlenyomatát
+# is tárolja, a load() eltérés esetén nem tölt vissza
+class MatchAnalytics:
+    def __init__(self, tracker, tracks, track_store, player_coordinates, ball_coordinates, flag_path="offside_detection/offside_flag.png", offside_mode="passes", stub_path=None):
+        self.tracker = tracker
+        self.tracks = tracks
+        self.track_store = track_store
+        self.player_coordinates = player_coordinates
+        self.ball_coordinates = ball_coordinates
+        self.total_frames = track_store.frame_count
+        self.flag_path = flag_path
+        self.offside_mode = offside_mode
+        self.stub_path = stub_path
+
+        # Közös jelenléti indexek a játékosonkénti statisztikákhoz és grafikonokhoz, a track tároló
+        # oszlopaiból: a trackek szerinti (detektálás) és a pályakoordináták szerinti jelenlét
+        player_rows = track_store.classes == PLAYER
+        self.track_presence = PresenceIndex.from_rows(track_store.frames[player_rows],
+                                                      track_store.track_ids[player_rows],
+                                                      len(tracks["players"]))
+        coordinate_rows = player_rows & np.isfinite(track_store.pitch_xy).all(axis=1)
+        self.coordinate_presence = PresenceIndex.from_rows(track_store.frames[coordinate_rows],
+                                                           track_store.track_ids[coordinate_rows],
+                                                           len(player_coordinates))
+
+        # Az elemzés eredményei (a run() tölti ki)
+        self.field_sides = {}
+        self.possession_segments = None
+        self.closest_player_ids_filtered = {}
+        self.ball_possession_counter = {}
+        self.pass_counter = None
+        self.individual_pass_stats = {}
+        self.offside_detector = None
+        self.offsides_per_frame = {}
+        self.offside_frame_counts = {}
+        self.possession = None
+
+    def run(self, frames, update=None):
+        def status(msg):
+            if update:
+                update(msg)
+
+        # Csapatok, sebességek és labdához legközelebbi játékosok meghatározása
+        status("Csapatok és játékosmérések meghatározása...")
+        self.tracker.assign_teams(frames, self.tracks)
+        # Sűrű koordinátatömbök egyszer felépítve; a játékosmérés és a lesdetektálás is ezeken fut
+        dense_coordinates = get_dense_coordinates(self.player_coordinates, self.ball_coordinates)
+        self.tracker.measure_players(self.tracks, self.player_coordinates, self.ball_coordinates, dense_coordinates)
+
+        # Térfél meghatározása a tracker csapat-hozzárendelése alapján, a track tároló oszlopaiból
+        status("Térfelek meghatározása...")
+        side_voter = TeamSideVoter(self.tracker.track_id_to_team)
+        player_rows = self.track_store.classes == PLAYER
+        side_voter.update_arrays(self.track_store.frames[player_rows],
+                                 self.track_store.track_ids[player_rows],
+                                 self.track_store.pitch_xy[player_rows, 0])
+        self.field_sides = side_voter.get_sides()
+
+        # Kapusok csapatának meghatározása
+        status("Kapusok csapatának meghatározása...")
+        self.tracker.assign_goalkeeper_teams(self.tracks, self.player_coordinates, self.field_sides)
+        # Birtoklási szakasz index egyszer felépítve; a szűrés, az érintések, a passzok és a
+        # birtoklási arányok ezen futó lekérdezések
+        self.possession_segments = PossessionSegments.from_closest_player_ids(self.tracker.closest_player_ids, self.total_frames).filtered()
+        self.closest_player_ids_filtered = self.possession_segments.to_closest_player_ids()
+        self.ball_possession_counter = self.possession_segments.get_touch_counts()
+
+        # Passzok számlálása
+        status("Passzok számítása...")
+        self.pass_counter = PassCounter()
+        self.pass_counter.process_pass_segments(self.possession_segments, self.total_frames)
+        self.individual_pass_stats = self.pass_counter.get_player_passes()
+
+        # Lesen álló játékosok detektálása
+        status("Lesek detektálása...")
+        self.offside_detector = OffsideDetector(
+            player_coordinates=self.player_coordinates,
+            ball_coordinates=self.ball_coordinates,
+            closest_player_ids_filtered=self.closest_player_ids_filtered,
+            track_id_to_team=self.tracker.track_id_to_team,
+            field_sides=self.field_sides,
+            flag_path=self.flag_path
+        )
+        if self.offside_mode == "passes":
+            self.offsides_per_frame = self.offside_detector.detect_offside_passes(self.possession_segments, dense_coordinates)
+        else:
+            self.offsides_per_frame = self.offside_detector.detect_offsides_per_frame(dense_coordinates)
+        self.offside_frame_counts = dict(self.offside_detector.offsides_stats)
+
+        # Frame-enkénti labdabirtoklási arányok
+        self.possession = BallPossession()
+        self.possession.measure_possession_segments(self.possession_segments, self.total_frames)
+        return self
+
+    # Az elemzés állapota egyszerű (pickle-elhető) adatokként
+    def get_state(self):
+        return {
+            "frame_count": self.total_frames,
+            "offside_mode": self.offside_mode,
+            "stub_fingerprint": get_stub_fingerprint(self.stub_path),
+            "team1_color": self.tracker.team1_color,
+            "team2_color": self.tracker.team2_color,
+            "track_id_to_team": self.tracker.track_id_to_team,
+            "closest_player_ids": self.tracker.closest_player_ids,
+            "goalkeeper_teams": self.tracker.goalkeeper_teams,
+            "speed_data": self.tracker.speed_estimator.player_data,
+            "field_sides": self.field_sides,
+            "closest_player_ids_filtered": self.closest_player_ids_filtered,
+            "ball_possession_counter": dict(self.ball_possession_counter),
+            "pass_stats_per_frame": self.pass_counter.stats_per_frame,
+            "player_passes": self.individual_pass_stats,
+            "offsides_per_frame": self.offsides_per_frame,
+            "offside_events": self.offside_detector.offside_events,
+            "offside_passes": self.offside_detector.offside_passes,
+            "offside_frame_counts": self.offside_frame_counts,
+            "possession_per_frame": self.possession.possession_per_frame
+        }
+
+    # Állapot visszaállítása: a tracker és az elemzők ugyanazt az állapotot kapják, mint a run() után
+    def set_state(self, state):
+        self.tracker.team1_color = state["team1_color"]
+        self.tracker.team2_color = state["team2_color"]
+        self.tracker.track_id_to_team = state["track_id_to_team"]
+        self.tracker.closest_player_ids = state["closest_player_ids"]
+        self.tracker.goalkeeper_teams = state["goalkeeper_teams"]
+        self.tracker.speed_estimator.player_data = state["speed_data"]
+        self.field_sides = state["field_sides"]
+        self.closest_player_ids_filtered = state["closest_player_ids_filtered"]
+        self.possession_segments = PossessionSegments.from_closest_player_ids(self.closest_player_ids_filtered, self.total_frames)
+        self.ball_possession_counter = state["ball_possession_counter"]
+
+        self.pass_counter = PassCounter()
+        self.pass_counter.stats_per_frame = state["pass_stats_per_frame"]
+        if self.pass_counter.stats_per_frame:
+            (self.pass_counter.team1_accurate, self.pass_counter.team1_inaccurate,
+             self.pass_counter.team2_accurate, self.pass_counter.team2_inaccurate) = self.pass_counter.stats_per_frame[-1]
+        self.pass_counter.player_passes.update(state["player_passes"])
+        self.individual_pass_stats = state["player_passes"]
+
+        self.offside_detector = OffsideDetector(
+            player_coordinates=self.player_coordinates,
+            ball_coordinates=self.ball_coordinates,
+            closest_player_ids_filtered=self.closest_player_ids_filtered,
+            track_id_to_team=self.tracker.track_id_to_team,
+            field_sides=self.field_sides,
+            flag_path=self.flag_path
+        )
+        self.offside_detector.offside_events = state["offside_events"]
+        self.offside_detector.offside_passes = state["offside_passes"]
+        self.offside_detector.offsides_stats.update(state["offside_frame_counts"])
+        self.offsides_per_frame = state["offsides_per_frame"]
+        self.offside_frame_counts = state["offside_frame_counts"]
+
+        self.possession = BallPossession()
+        self.possession.possession_per_frame = state["possession_per_frame"]
+        return self
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self.get_state(), f)
+
+    # Mentett elemzés betöltése; None, ha nincs mentés, vagy az nem ehhez a stubhoz, illetve
+    # nem ehhez az offside_mode-hoz tartozik
+    @classmethod
+    def load(cls, path, tracker, tracks, track_store, player_coordinates, ball_coordinates, flag_path="offside_detection/offside_flag.png", offside_mode="passes", stub_path=None):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except Exception:
+            print(f"Hiba történt a mentett elemzés betöltésekor: {path}")
+            return None
+        if state.get("frame_count") != track_store.frame_count or any(key not in state for key in ("goalkeeper_teams", "offside_events", "offside_passes")):
+            return None
+        if state.get("offside_mode") != offside_mode or state.get("stub_fingerprint") != get_stub_fingerprint(stub_path):
+            return None
+        analytics = cls(tracker, tracks, track_store, player_coordinates, ball_coordinates, flag_path, offside_mode, stub_path)
+        return analytics.set_state(state)
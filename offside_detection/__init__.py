@@ -1 +1 @@
-from .offside_detection import OffsideDetector
\ No newline at end of file
+from .offside_detection import OffsideDetector, OFFSIDE_EVENT_DTYPE, OFFSIDE_PASS_DTYPE
\ No newline at end of file
@@ -1,8 +1,18 @@
-import cv2
 import os
 import matplotlib.pyplot as plt
+from matplotlib.ticker import MaxNLocator
 import numpy as np
 from collections import defaultdict
+from frame_compositor import Sprite
+from ball_possession import get_dense_coordinates
+
+# Lesesemény: frame, lesen álló játékos, a támadó (labdabirtokos) csapat
+OFFSIDE_EVENT_DTYPE = np.dtype([("frame", np.int64), ("player_id", np.int64), ("team_id", np.int64)])
+
+# Lesen végződő passz: a passz pillanata, az átvétel frame-je, passzoló, fogadó, csapat és a
+# fogadó távolsága a védővonal előtt méterben
+OFFSIDE_PASS_DTYPE = np.dtype([("frame", np.int64), ("reception_frame", np.int64), ("passer_id", np.int64),
+                               ("receiver_id", np.int64), ("team_id", np.int64), ("margin", np.float64)])
 
 class OffsideDetector:
     def __init__(self, 
@@ -20,99 +30,178 @@ class OffsideDetector:
         self.track_id_to_team = track_id_to_team
         self.field_sides = field_sides
 
-        # Zászló betöltése
-        self.flag_image = cv2.imread(flag_path, cv2.IMREAD_UNCHANGED)
-        if self.flag_image is None:
-            raise FileNotFoundError(f"Nem található a zászlókép: {flag_path}")
+        # Zászló betöltése egyszer, előre szorzott alfa csatornás sprite-ként
+        self.flag_sprite = Sprite.from_file(flag_path)
 
-        # Lesen lévő játékosok listája
-        self.offsides_log = []
+        # Lesesemények (frame, játékos, csapat) strukturált tömbje, frame szerint rendezve
+        self.offside_events = np.empty(0, dtype=OFFSIDE_EVENT_DTYPE)
+        # Lesen végződő passzok (eseményvezérelt mód); None, ha a frame-enkénti mód futott
+        self.offside_passes = None
         self.offsides_stats = defaultdict(int)  # játékosID -> lesen töltött frame-ek száma
 
-    def detect_offsides_per_frame(self):
-        # Minden frame-en végigmegyünk
+    # Lesek detektálása a teljes mérkőzésre. A dense_coordinates a get_dense_coordinates kimenete
+    # (player_ids, player_xy, ball_xy); ha nincs megadva, a koordinátalistákból készül
+    def detect_offsides_per_frame(self, dense_coordinates=None):
+        if dense_coordinates is None:
+            dense_coordinates = get_dense_coordinates(self.player_coordinates, self.ball_coordinates)
+        player_ids, player_xy, ball_xy = dense_coordinates
+        frame_count = len(player_ids)
+
+        # Labdabirtokos és csapata frame-enként (-1: nincs)
+        owner_ids = np.full(frame_count, -1, dtype=np.int64)
+        owner_teams = np.full(frame_count, -1, dtype=np.int64)
+        for frame_num, (owner_id, owner_team) in self.closest_player_ids_filtered.items():
+            if 0 <= frame_num < frame_count and owner_team is not None:
+                owner_ids[frame_num] = -1 if owner_id is None else owner_id
+                owner_teams[frame_num] = owner_team
+
+        self.offside_events = self.detect_offsides(player_ids, player_xy, ball_xy, owner_ids, owner_teams)
+
+        # Lesen töltött frame-ek játékosonként, az első lesen állás sorrendjében
+        event_players, first_index, counts = np.unique(self.offside_events["player_id"], return_index=True, return_counts=True)
+        order = np.argsort(first_index, kind="stable")
+        for pid, count in zip(event_players[order].tolist(), counts[order].tolist()):
+            self.offsides_stats[pid] += count
+
+        return self.get_offsides_per_frame()
+
+    # Vektorizált lesvizsgálat sűrű tömbökön: frame-enként az ellenfél leghátsó játékosának vonala
+    # maszkolt max/min redukcióval, majd a birtokos csapattársainak egyetlen összehasonlítása a
+    # vonallal és a labdával (hiányzó labdánál csak a vonallal). Kimenet: OFFSIDE_EVENT_DTYPE tömb,
+    # frame-en belül a koordinátaszótárak sorrendjében
+    def detect_offsides(self, player_ids, player_xy, ball_xy, owner_ids, owner_teams):
+        margins, ahead_of_ball = self.get_offside_margins(player_ids, player_xy, ball_xy, owner_ids, owner_teams)
+        frames, columns = np.nonzero((margins > 0) & ahead_of_ball)
+        events = np.empty(len(frames), dtype=OFFSIDE_EVENT_DTYPE)
+        events["frame"] = frames
+        events["player_id"] = player_ids[frames, columns]
+        events["team_id"] = owner_teams[frames]
+        return events
+
+    # A birtokos csapattársainak (a birtokos nélkül) távolsága az ellenfél leghátsó játékosának
+    # vonalától méterben, támadási irányban pozitív; NaN, ha a játékos nem csapattárs, vagy a
+    # frame-en nincs birtokos vagy ellenfél. A második kimenet: a játékos a labda előtt van-e
+    # (hiányzó labdánál mindig igaz)
+    def get_offside_margins(self, player_ids, player_xy, ball_xy, owner_ids, owner_teams):
+        # Játékosok csapata (-1: ismeretlen) azonosító szerinti keresőtáblából; a -1 kitöltés a
+        # tábla utolsó (ismeretlen) elemére mutat
+        max_id = int(player_ids.max(initial=-1))
+        team_lookup = np.full(max_id + 2, -1, dtype=np.int64)
+        for pid, team in self.track_id_to_team.items():
+            if team is not None and 0 <= pid <= max_id:
+                team_lookup[pid] = team
+        player_teams = team_lookup[player_ids]
+
+        has_owner = owner_teams >= 0
+        opponent_teams = np.where(owner_teams == 1, 2, 1)
+        left_teams = [team for team, side in self.field_sides.items() if side == "left"]
+        # Támadási irány: +1 balról jobbra (bal térfél), -1 jobbról balra; a tükrözés után
+        # mindkét irányban a nagyobb x számít előrébb
+        direction = np.where(np.isin(owner_teams, left_teams), 1.0, -1.0)
+        xs = player_xy[:, :, 0] * direction[:, None]
+        ball_xs = ball_xy[:, 0] * direction
+
+        # Ellenfél leghátsó játékosának vonala (frame-enként)
+        opponents = player_teams == opponent_teams[:, None]
+        has_opponent = opponents.any(axis=1)
+        defender_line = np.where(opponents, xs, -np.inf).max(axis=1, initial=-np.inf)
+
+        # Birtokos csapattársai (a birtokos nélkül) a vizsgálható frame-eken
+        teammates = (player_teams == owner_teams[:, None]) & (player_ids != owner_ids[:, None]) & (has_owner & has_opponent)[:, None]
+        margins = np.where(teammates, xs - defender_line[:, None], np.nan)
+        ahead_of_ball = np.isnan(ball_xs)[:, None] | (xs > ball_xs[:, None])
+        return margins, ahead_of_ball
+
+    # Eseményvezérelt lesvizsgálat: a vonal csak a passzok pillanatában számít, ahol a birtokos
+    # csapaton belül vált (segments: PossessionSegments). A passz pillanata a passzoló utolsó
+    # birtoklási frame-je; a fogadó lesen van, ha ekkor a vonal és a labda előtt áll. Kimenet:
+    # {frame: ([játékosok], csapat)} a zászlókhoz, amelyek a passztól az átvételig látszanak
+    def detect_offside_passes(self, segments, dense_coordinates=None):
+        if dense_coordinates is None:
+            dense_coordinates = get_dense_coordinates(self.player_coordinates, self.ball_coordinates)
+        player_ids, player_xy, ball_xy = dense_coordinates
+        frame_count = len(player_ids)
+
+        # Csapaton belüli birtokosváltások a csapattal rendelkező szakaszok egymásutánjában
+        with_team = segments.team_ids >= 0
+        starts, ends = segments.starts[with_team], segments.ends[with_team]
+        players, teams = segments.player_ids[with_team], segments.team_ids[with_team]
+        is_pass = (players[1:] != players[:-1]) & (teams[1:] == teams[:-1])
+        pass_frames = ends[:-1][is_pass] - 1
+        in_range = pass_frames < frame_count
+        pass_frames = pass_frames[in_range]
+        reception_frames = starts[1:][is_pass][in_range]
+        passers = players[:-1][is_pass][in_range]
+        receivers = players[1:][is_pass][in_range]
+        pass_teams = teams[1:][is_pass][in_range]
+
+        # A vonal csak a passzok frame-jein számolódik, a fogadó oszlopára szűrve
+        margins, ahead_of_ball = self.get_offside_margins(player_ids[pass_frames], player_xy[pass_frames], ball_xy[pass_frames], passers, pass_teams)
+        offside = (player_ids[pass_frames] == receivers[:, None]) & (margins > 0) & ahead_of_ball
+        rows, columns = np.nonzero(offside)
+
+        events = np.empty(len(rows), dtype=OFFSIDE_PASS_DTYPE)
+        events["frame"] = pass_frames[rows]
+        events["reception_frame"] = reception_frames[rows]
+        events["passer_id"] = passers[rows]
+        events["receiver_id"] = receivers[rows]
+        events["team_id"] = pass_teams[rows]
+        events["margin"] = margins[rows, columns]
+        self.offside_passes = events
+
+        # Zászlók és lesen töltött frame-ek: a passz pillanatától az átvételig
         offsides_per_frame = {}
-
-        for frame_num, player_coords in enumerate(self.player_coordinates):
-            # Labdabirtokos lekérése
-            ball_owner_id, ball_owner_team = self.closest_player_ids_filtered.get(frame_num, (None, None))
-            if ball_owner_team is None:
-                continue  # nincs birtokos, nincs les
-
-            # Ellenfél csapata
-            opponent_team = 2 if ball_owner_team == 1 else 1
-
-            # Ellenfél játékosainak x koordinátái
-            opponent_xs = [coord[0] for pid, coord in player_coords.items() if self.track_id_to_team.get(pid) == opponent_team]
-            if len(opponent_xs) < 1:
-                continue  # nincs ellenfél játékos a frame-ben
-
-            # Ellenfél leghátrébb levő játékosa
-            if self.field_sides[ball_owner_team] == "left":
-                last_defender_x = max(opponent_xs)
-            else:
-                last_defender_x = min(opponent_xs)
-
-            # Labda x koordinátája
-            ball_x = self.ball_coordinates[frame_num][0] if frame_num < len(self.ball_coordinates) else None
-
-            # Lesen lévők keresése
-            offsides = []
-            for pid, (x, _) in player_coords.items():
-                if self.track_id_to_team.get(pid) != ball_owner_team:
-                    continue
-                if pid == ball_owner_id:
-                    continue
-
-                if self.field_sides[ball_owner_team] == "left":
-                    if x > last_defender_x and (ball_x is None or x > ball_x):
-                        offsides.append(pid)
-                else:
-                    if x < last_defender_x and (ball_x is None or x < ball_x):
-                        offsides.append(pid)
-
-            if offsides:
-                offsides_per_frame[frame_num] = (offsides, ball_owner_team)
-                self.offsides_log.append(f"Frame: {frame_num} Lesen lévő játékos(ok): {','.join(map(str, offsides))} Csapat: {ball_owner_team}")
-                for pid in offsides:
-                    self.offsides_stats[pid] += 1
-
+        for frame, reception_frame, receiver, team in zip(events["frame"].tolist(), events["reception_frame"].tolist(),
+                                                          events["receiver_id"].tolist(), events["team_id"].tolist()):
+            for frame_num in range(frame, min(reception_frame, frame_count - 1) + 1):
+                offsides_per_frame.setdefault(frame_num, ([], team))[0].append(receiver)
+                self.offsides_stats[receiver] += 1
         return offsides_per_frame
 
-    def draw_offside_flags(self, frames, offsides_per_frame, tracks):
-        # Bejárjuk a frame-eket
-        for frame_num, frame in enumerate(frames):
-            if frame_num not in offsides_per_frame:
+    # Frame-enkénti lesek az eseménytömbből: {frame: ([játékosok], birtokos csapata)}
+    def get_offsides_per_frame(self):
+        frames = self.offside_events["frame"]
+        starts = np.flatnonzero(np.concatenate([[True], frames[1:] != frames[:-1]])) if len(frames) else np.array([], dtype=np.int64)
+        ends = np.append(starts[1:], len(frames))
+        frame_list = frames.tolist()
+        players = self.offside_events["player_id"].tolist()
+        teams = self.offside_events["team_id"].tolist()
+        return {frame_list[start]: (players[start:end], teams[start]) for start, end in zip(starts.tolist(), ends.tolist())}
+
+    # Lesen lévő játékosok fölé zászló rajzolása (réteg)
+    def draw_offside_flags(self, frame, frame_num, offsides_per_frame, tracks):
+        if frame_num not in offsides_per_frame:
+            return frame
+
+        lesen_levok, _ = offsides_per_frame[frame_num]
+        for pid in lesen_levok:
+            player_data = tracks["players"][frame_num].get(pid)
+            if not player_data:
                 continue
+            x1, y1, x2, y2 = map(int, player_data["bbox"])
+            center_x = (x1 + x2) // 2
+            top_y = y1 - 55
 
-            lesen_levok, _ = offsides_per_frame[frame_num]
-            for pid in lesen_levok:
-                player_data = tracks["players"][frame_num].get(pid)
-                if not player_data:
-                    continue
-                x1, y1, x2, y2 = map(int, player_data["bbox"])
-                center_x = (x1 + x2) // 2
-                top_y = y1 - 55
-
-                fh, fw = self.flag_image.shape[:2]
+            # Zászló a játékos fölé középre igazítva (a frame széleinél levágva)
+            self.flag_sprite.blit(frame, center_x - self.flag_sprite.width // 2, top_y)
 
-                for c in range(3):
-                    for i in range(fh):
-                        for j in range(fw):
-                            if self.flag_image[i, j, 3] > 0:
-                                y, x = top_y + i, center_x - fw // 2 + j
-                                if 0 <= y < frame.shape[0] and 0 <= x < frame.shape[1]:
-                                    frame[y, x, c] = self.flag_image[i, j, c]
-
-        return frames
+        return frame
 
     def plot_top5_offsides(self, fps, output_dir, team1_color_rgb=(0.0, 0.0, 1.0), team2_color_rgb=(1.0, 0.5, 0.0)):
-        # Top5 játékos kiválasztása lesen töltött frame alapján
-        top5 = sorted(self.offsides_stats.items(), key=lambda x: x[1], reverse=True)[:5]
+        # Eseményvezérelt módban a sorrend a lesen végződő passzok száma, egyébként a lesen töltött idő
+        by_events = self.offside_passes is not None
+        if by_events:
+            receivers, counts = np.unique(self.offside_passes["receiver_id"], return_counts=True)
+            event_counts = dict(zip(receivers.tolist(), counts.tolist()))
+            top5 = sorted(self.offsides_stats.items(), key=lambda x: (event_counts.get(x[0], 0), x[1]), reverse=True)[:5]
+        else:
+            # Top5 játékos kiválasztása lesen töltött frame alapján
+            top5 = sorted(self.offsides_stats.items(), key=lambda x: x[1], reverse=True)[:5]
 
         # Ábra előkészítése
         fig, ax = plt.subplots(figsize=(10, 6))
-        ax.set_title("Top 5 játékos lesen töltött idő alapján", fontsize=16, fontweight="bold")
+        title = "Top 5 játékos lesek száma alapján" if by_events else "Top 5 játékos lesen töltött idő alapján"
+        ax.set_title(title, fontsize=16, fontweight="bold")
 
         y_labels = []
         y_colors = []
@@ -130,8 +219,12 @@ class OffsideDetector:
 
             y_labels.append(f"$\\bf{{{idx}.}}$ Player {track_id}")
             y_colors.append(color)
-            times.append(total_seconds)
-            time_labels.append(time_str)
+            if by_events:
+                times.append(event_counts[track_id])
+                time_labels.append(f"{event_counts[track_id]} les ({time_str})")
+            else:
+                times.append(total_seconds)
+                time_labels.append(time_str)
 
         y_pos = np.arange(len(top5))
         bars = ax.barh(y_pos, times, color=y_colors)
@@ -139,11 +232,16 @@ class OffsideDetector:
         ax.set_yticks(y_pos)
         ax.set_yticklabels(y_labels)
         ax.invert_yaxis()
-        ax.set_xlabel("Lesen töltött idő")
+        ax.set_xlabel("Lesek száma" if by_events else "Lesen töltött idő")
         ax.grid(True, axis="x")
 
         max_x = max(times) if times else 1
         label_x_pos = max_x + 1.0
+        if by_events:
+            # Darabszámoknál a felirat a leghosszabb oszlophoz arányosan igazodik, egész osztásokkal
+            label_x_pos = max_x * 1.02
+            ax.set_xlim(0, max_x * 1.3)
+            ax.xaxis.set_major_locator(MaxNLocator(integer=True))
 
         for i, (label, bar) in enumerate(zip(time_labels, bars)):
             ax.text(label_x_pos, bar.get_y() + bar.get_height() / 2,
@@ -1,5 +1,8 @@
 import cv2
+import numpy as np
 from collections import defaultdict
+from utils import PossessionSegments
+from frame_compositor import HudPanel
 
 class PassCounter:
     def __init__(self):
@@ -19,65 +22,66 @@ class PassCounter:
         # Játékosonként is mérjük
         self.player_passes = defaultdict(lambda: {"accurate": 0, "inaccurate": 0})
 
-    def process_passes_per_frame(self, closest_player_ids_filtered: dict, total_frames: int):
+        # Áttetsző háttérpanel a bal felső sarokban
+        self.statistics_panel = HudPanel(641, 101)
 
-        for frame_num in range(total_frames):
-            player_id, team_id = closest_player_ids_filtered.get(frame_num, (None, None))
-
-            if player_id is not None and team_id is not None:
-                if self.prev_player_id is not None and self.prev_player_id != player_id:
-                    # Új birtokos → passz történt
-                    if self.prev_team_id == team_id:
-                        # Pontos passz
-                        if team_id == 1:
-                            self.team1_accurate += 1
-                            self.player_passes[self.prev_player_id]["accurate"] += 1
-                        else:
-                            self.team2_accurate += 1
-                            self.player_passes[self.prev_player_id]["accurate"] += 1
-                    else:
-                        # Pontatlan passz
-                        if self.prev_team_id == 1:
-                            self.team1_inaccurate += 1
-                            self.player_passes[self.prev_player_id]["inaccurate"] += 1
-                        elif self.prev_team_id == 2:
-                            self.team2_inaccurate += 1
-                            self.player_passes[self.prev_player_id]["inaccurate"] += 1
-
-                # Frissítjük az előző játékost
-                self.prev_player_id = player_id
-                self.prev_team_id = team_id
-
-            # Minden frame-hez elmentjük az akkori statisztikát
-            self.stats_per_frame.append((
-                self.team1_accurate,
-                self.team1_inaccurate,
-                self.team2_accurate,
-                self.team2_inaccurate
-            ))
-
-    def draw_pass_statistics(self, frames):
-
-        for i, frame in enumerate(frames):
-            if i >= len(self.stats_per_frame):
-                break  # ne lépjünk túl
-
-            team1_acc, team1_inacc, team2_acc, team2_inacc = self.stats_per_frame[i]
-
-            overlay = frame.copy()
-            # Átlátszó téglalap rajzolása a bal felső sarokba
-            cv2.rectangle(overlay, (0, 0), (640, 100), (255, 255, 255), -1)
-            alpha = 0.6
-            cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-
-            # Szöveg kirajzolása
-            cv2.putText(frame, f"Team1: Pontos passzok: {team1_acc} Pontatlan passzok: {team1_inacc}",
-                        (10, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
-
-            cv2.putText(frame, f"Team2: Pontos passzok: {team2_acc} Pontatlan passzok: {team2_inacc}",
-                        (10, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
-
-        return frames
+    def process_passes_per_frame(self, closest_player_ids_filtered: dict, total_frames: int):
+        segments = PossessionSegments.from_closest_player_ids(closest_player_ids_filtered, total_frames)
+        self.process_pass_segments(segments, total_frames)
+
+    # Passzok a birtoklási szakasz indexből: minden passz egy birtokosváltás a csapattal rendelkező
+    # szakaszok között; a frame-enkénti kumulált számlálók az események kumulált összegei
+    def process_pass_segments(self, segments, total_frames: int):
+        events = segments.get_pass_events(self.prev_player_id, self.prev_team_id)
+        in_range = events["frames"] < total_frames
+        events = {key: values[in_range] for key, values in events.items()}
+        accurate = events["accurate"]
+
+        # Pontos passz a fogadó csapatánál (1 vagy egyébként 2), pontatlan a passzoló csapatánál
+        counters = [
+            accurate & (events["receiver_teams"] == 1),
+            ~accurate & (events["passer_teams"] == 1),
+            accurate & (events["receiver_teams"] != 1),
+            ~accurate & (events["passer_teams"] == 2)
+        ]
+        cumulative = []
+        for counted, start in zip(counters, (self.team1_accurate, self.team1_inaccurate, self.team2_accurate, self.team2_inaccurate)):
+            per_frame = np.bincount(events["frames"][counted], minlength=total_frames)[:total_frames]
+            cumulative.append(start + np.cumsum(per_frame))
+        self.stats_per_frame.extend(zip(*(values.tolist() for values in cumulative)))
+        if total_frames:
+            self.team1_accurate, self.team1_inaccurate, self.team2_accurate, self.team2_inaccurate = self.stats_per_frame[-1]
+
+        # Játékosonkénti passzok (a pontatlan passz csak ismert csapatú passzolónál számít)
+        for passer in events["passers"][accurate].tolist():
+            self.player_passes[passer]["accurate"] += 1
+        for passer in events["passers"][~accurate & np.isin(events["passer_teams"], (1, 2))].tolist():
+            self.player_passes[passer]["inaccurate"] += 1
+
+        # Az utolsó birtokos megjegyzése (folytatáshoz)
+        with_team = (segments.team_ids >= 0) & (segments.starts < total_frames)
+        if np.any(with_team):
+            self.prev_player_id = int(segments.player_ids[with_team][-1])
+            self.prev_team_id = int(segments.team_ids[with_team][-1])
+
+    # Passz statisztikák kirajzolása a bal felső sarokba (réteg)
+    def draw_pass_statistics(self, frame, frame_num):
+        if frame_num >= len(self.stats_per_frame):
+            return frame  # ne lépjünk túl
+
+        team1_acc, team1_inacc, team2_acc, team2_inacc = self.stats_per_frame[frame_num]
+
+        # Átlátszó téglalap rajzolása a bal felső sarokba
+        self.statistics_panel.render(frame, 0, 0)
+
+        # Szöveg kirajzolása
+        cv2.putText(frame, f"Team1: Pontos passzok: {team1_acc} Pontatlan passzok: {team1_inacc}",
+                    (10, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+
+        cv2.putText(frame, f"Team2: Pontos passzok: {team2_acc} Pontatlan passzok: {team2_inacc}",
+                    (10, 75), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+
+        return frame
     
     def get_player_passes(self) -> dict:
         """
@@ -1,3 +1,4 @@
 from .pitch_config import FootballPitchConfiguration
-from .keypoint_annotations import process_keypoint_annotations
-from .view_transformer import ViewTransformer
\ No newline at end of file
+from .keypoint_annotations import process_keypoint_annotations, KeypointDetector
+from .view_transformer import ViewTransformer, transform_points_per_frame
+from .homography_cache import HomographyCache
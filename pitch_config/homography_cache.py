@@ -0,0 +1,49 @@
+import numpy as np
+from .view_transformer import ViewTransformer
+
+# Időbeli homográfia cache: az egymást követő frame-ek kamerapozíciója szinte mindig azonos,
+# ezért az előző kép -> pálya homográfiát újrahasznosítjuk, ha a detektált kulcspontok a
+# visszavetített helyüktől legfeljebb tolerance pixelre vannak. Elsodródás vagy vágás
+# (nagy visszavetítési hiba) esetén a homográfiát újraillesztjük
+class HomographyCache:
+    def __init__(self, tolerance=2.0):
+        self.tolerance = tolerance  # megengedett átlagos visszavetítési hiba [px]
+        self.transformer = None  # utoljára illesztett kép -> pálya transzformáció
+        self.keypoints = None  # az illesztett homográfiával visszavetített pálya kulcspontok
+        self.hits = 0  # újrahasznosított homográfiák száma
+        self.misses = 0  # újraillesztések száma
+
+    # Átlagos visszavetítési hiba [px]: a pálya pontok képre vetítve a detektált képpontokhoz képest
+    def reprojection_error(self, transformer, image_points, pitch_points):
+        forward_matrix = transformer.inverse_matrix
+        homogeneous = np.hstack([pitch_points, np.ones((len(pitch_points), 1))]) @ forward_matrix.T
+        projected_points = homogeneous[:, :2] / homogeneous[:, 2:3]
+        return float(np.mean(np.linalg.norm(projected_points - image_points, axis=1)))
+
+    # Kép -> pálya transzformáció a megbízható pontpárokhoz; visszaadja, hogy cache találat volt-e
+    def get_transformer(self, image_points, pitch_points):
+        if self.transformer is not None and self.tolerance:
+            if self.reprojection_error(self.transformer, image_points, pitch_points) <= self.tolerance:
+                self.hits += 1
+                return self.transformer, True
+
+        self.misses += 1
+        transformer = ViewTransformer(source=image_points, target=pitch_points)
+        if transformer.matrix is None:
+            self.reset()
+            return None, False
+        self.transformer = transformer
+        self.keypoints = None
+        return transformer, False
+
+    def reset(self):
+        self.transformer = None
+        self.keypoints = None
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def format_stats(self):
+        return f"Homográfia cache: {self.hits} találat, {self.misses} újraillesztés ({100 * self.hit_rate:.1f} % találati arány)"
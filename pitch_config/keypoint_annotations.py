@@ -2,115 +2,316 @@ import cv2
 import numpy as np
 from ultralytics import YOLO
 from pitch_config import FootballPitchConfiguration
-from .view_transformer import ViewTransformer
+from .view_transformer import ViewTransformer, transform_points_per_frame
+from .homography_cache import HomographyCache
+from utils.batch_utils import get_auto_batch_size
+from utils.video_utils import VideoFrameSource
+
+# Pálya kulcspont detektáló: képkockánként vagy kötegelve hívható, így az
+# objektumdetektálással közös dekódolási ciklusból etethető.
+# Kulcsképkocka módban (keyframe_interval > 1 vagy motion_threshold megadva) a modell csak
+# minden k-adik frame-en, illetve nagy kameramozgás esetén fut, a köztes frame-ek homográfiáját
+# a szomszédos kulcsképkockák homográfiáiból interpoláljuk. keyframe_interval=None esetén nincs
+# ütemezett kulcsképkocka, csak a mozgásküszöb dönt (tisztán mozgásvezérelt mód)
+class KeypointDetector:
+    def __init__(self, 
+                 keypoint_model_path, 
+                 frame_width, 
+                 frame_height, 
+                 confidence_threshold=0.5,
+                 batch_size=None,
+                 keyframe_interval=1,
+                 motion_threshold=None,
+                 homography_tolerance=2.0):
+        # Konfidencia határérték
+        self.confidence_threshold = confidence_threshold
+
+        # Képátméretezéshez szükséges skálázási tényezők a 640×640-es detektáláshoz
+        self.scale_x_det = frame_width / 640.0
+        self.scale_y_det = frame_height / 640.0
+        self.scale_det = np.array([self.scale_x_det, self.scale_y_det], dtype=np.float32)
+
+        # Pálya konfiguráció betöltése
+        self.pitch_config = FootballPitchConfiguration()
+        self.pitch_vertices_cm = np.array(self.pitch_config.vertices, dtype=np.float32)
+
+        # Keypoint detektáló modell betöltése
+        self.model = YOLO(keypoint_model_path)
+
+        # Kötegelés és kulcsképkocka beállítások
+        self.batch_size = batch_size if batch_size is not None else get_auto_batch_size(frame_width, frame_height)
+        self.keyframe_interval = None if keyframe_interval is None else max(1, keyframe_interval)
+        self.motion_threshold = motion_threshold  # kameramozgás küszöb pixelben (teljes felbontáson)
+        if self.keyframe_interval is None and motion_threshold is None:
+            raise ValueError("keyframe_interval=None esetén motion_threshold megadása szükséges")
+        if self.keyframe_interval == 1 and motion_threshold is not None:
+            print("Figyelem: keyframe_interval=1 mellett minden frame kulcsképkocka, a motion_threshold hatástalan "
+                  "(tisztán mozgásvezérelt módhoz keyframe_interval=None)")
+        self.motion_scale = frame_width / 160.0
+        self.last_keyframe_thumbnail = None
+        self.frames_since_keyframe = None
+
+        # Homográfia cache: az előző homográfia újrahasznosítása, ha még illeszkedik (None/0: kikapcsolva)
+        self.homography_cache = HomographyCache(tolerance=homography_tolerance)
+
+        self.all_keypoints = []        # minden képkocka detektált kulcspontjait tartalmazza
+        self.inverse_transformers = [] # képkockánként a kép -> pálya transzformáció (vagy None)
+        self.keyframe_flags = []       # képkockánként: futott-e rajta a modell
+
+    # Kicsinyített szürkeárnyalatos kép a kameramozgás becsléséhez
+    def get_motion_thumbnail(self, frame):
+        thumbnail = cv2.resize(frame, (160, 90), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(thumbnail, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+    # Eldönti, hogy az adott frame-en futtatni kell-e a modellt. Mozgásküszöb esetén
+    # a keyframe_interval a két kulcsképkocka közötti maximális távolság (None: nincs felső korlát)
+    def is_keyframe(self, frame):
+        if self.keyframe_interval == 1:
+            return True
+
+        thumbnail = self.get_motion_thumbnail(frame) if self.motion_threshold is not None else None
+
+        # Az első frame mindig kulcsképkocka
+        if self.frames_since_keyframe is None:
+            keyframe = True
+        else:
+            keyframe = self.keyframe_interval is not None and self.frames_since_keyframe + 1 >= self.keyframe_interval
+
+            # Kameramozgás becslése fáziskorrelációval az utolsó kulcsképkockához képest
+            if not keyframe and thumbnail is not None:
+                (shift_x, shift_y), _ = cv2.phaseCorrelate(self.last_keyframe_thumbnail, thumbnail)
+                motion = np.hypot(shift_x, shift_y) * self.motion_scale
+                keyframe = motion > self.motion_threshold
+
+        if keyframe:
+            self.last_keyframe_thumbnail = thumbnail
+            self.frames_since_keyframe = 0
+        else:
+            self.frames_since_keyframe += 1
+        return keyframe
+
+    # Egy modell eredményből a kulcspontok és a kép -> pálya transzformáció meghatározása
+    def process_result(self, result, frame_count):
+        inverse_transformer = None
 
-def process_keypoint_annotations(video_path, keypoint_model_path, players_tracks=None, ball_tracks=None, status_callback=None):
-    
-    # Konfidencia határérték
-    confidence_threshold = 0.5
-    
-    # Videó megnyitása
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print("Nem sikerült megnyitni a videót!")
-        return None
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    # Képátméretezéshez szükséges skálázási tényezők a 640×640-es detektáláshoz
-    scale_x_det = frame_width / 640.0
-    scale_y_det = frame_height / 640.0
-
-    # Pálya konfiguráció betöltése
-    pitch_config = FootballPitchConfiguration()
-    pitch_vertices_cm = np.array(pitch_config.vertices, dtype=np.float32)
-    
-    frame_count = 0
-    all_keypoints = []       # minden képkocka detektált kulcspontjait tartalmazza
-    all_player_coords = []    # minden képkockára (x, y) játékos koordináta
-    all_ball_coords = []      # minden képkockára (x, y) labda koordináta
-    
-    # Keypoint detektáló modell betöltése
-    model = YOLO(keypoint_model_path)
-    
-    while True:
-        ret, fullhd_frame = cap.read()
-        if status_callback:
-            status_callback(f"Kulcspontok detektálása... (Frame {frame_count + 1}/{int(cap.get(cv2.CAP_PROP_FRAME_COUNT))})")
-        if not ret:
-            break
-        
-        frame_keypoints = None  # kulcspontok a képkockán
-        player_pitch_coords = {} # játékos pályakoordináták (track_id → (x, y))
-        homography_valid = False
-        
-        # Átméretezés a 640x640-es bemenetre
-        resized_frame = cv2.resize(fullhd_frame, (640, 640))
-        results = model(resized_frame)
-        result = results[0]
-        
         if hasattr(result, "keypoints") and result.keypoints is not None:
             kp_array = result.keypoints.xy.cpu().numpy()[0]  # alak: (N, 2)
             conf_array = result.keypoints.conf.cpu().numpy()[0]
             # Visszaskálázás FULLHD méretre
-            detected_points = np.array([[x * scale_x_det, y * scale_y_det] for x, y in kp_array])
-            
+            detected_points = kp_array * self.scale_det
+
             # Csak a megbízható pontok kiválasztása
-            valid_filter = conf_array >= confidence_threshold
+            valid_filter = conf_array >= self.confidence_threshold
             if np.sum(valid_filter) >= 4:
                 image_points = detected_points[valid_filter]
-                pitch_points = pitch_vertices_cm[valid_filter]
-                transformer = ViewTransformer(source=pitch_points, target=image_points)
-                homography_valid = True
-                corrected_points = transformer.transform_points(points=pitch_vertices_cm)
-                frame_keypoints = corrected_points
+                pitch_points = self.pitch_vertices_cm[valid_filter]
+                # Kép -> pálya homográfia a cache-ből vagy egyetlen új illesztéssel,
+                # a pálya -> kép irány ennek inverze
+                inverse_transformer, _ = self.homography_cache.get_transformer(image_points, pitch_points)
+                if inverse_transformer is None:
+                    return detected_points, None
+                if self.homography_cache.keypoints is None:
+                    transformer = inverse_transformer.inverse()
+                    self.homography_cache.keypoints = transformer.transform_points(points=self.pitch_vertices_cm)
+                frame_keypoints = self.homography_cache.keypoints
             else:
                 frame_keypoints = detected_points
         else:
             print(f"Frame {frame_count}: Nem érhető el keypoint adat!")
             frame_keypoints = np.empty((0, 2))
-        
-        # Pályakoordináták kiszámítása (játékosok)
-        if homography_valid and players_tracks is not None and frame_count < len(players_tracks):
-            inverse_transformer = ViewTransformer(source=image_points, target=pitch_points)
-            for track_id, player in players_tracks[frame_count].items():
-                bbox = player.get("bbox", None)
-                if bbox is None or len(bbox) != 4:
+
+        return frame_keypoints, inverse_transformer
+
+    # Frame-ek kulcspontjainak detektálása egyetlen modellhívásban (csak a kulcsképkockákon)
+    def detect_batch(self, frames):
+        keyframes = [self.is_keyframe(frame) for frame in frames]
+
+        # Átméretezés a 640x640-es bemenetre
+        resized_frames = [cv2.resize(frame, (640, 640)) for frame, keyframe in zip(frames, keyframes) if keyframe]
+        results = iter(self.model(resized_frames)) if resized_frames else iter(())
+
+        for keyframe in keyframes:
+            if keyframe:
+                frame_keypoints, inverse_transformer = self.process_result(next(results), len(self.all_keypoints))
+            else:
+                # A köztes frame-ek a project_tracks előtt kapnak értéket
+                frame_keypoints, inverse_transformer = None, None
+            self.all_keypoints.append(frame_keypoints)
+            self.inverse_transformers.append(inverse_transformer)
+            self.keyframe_flags.append(keyframe)
+
+    # Egy képkocka kulcspontjainak detektálása és a homográfia eltárolása
+    def detect_frame(self, fullhd_frame):
+        self.detect_batch([fullhd_frame])
+
+    # Kulcspont detektálás lépésként a feldolgozó láncban (generátor): az elemeket kötegelve
+    # dolgozza fel (az elem első tagja a frame), és változatlanul továbbadja őket
+    def detect_frames(self, items):
+        batch = []
+        last_item = None
+        for item in items:
+            batch.append(item)
+            last_item = item
+            if len(batch) < self.batch_size:
+                continue
+            self.detect_batch([batch_item[0] for batch_item in batch])
+            yield from batch
+            batch = []
+
+        # Maradék (nem teljes) batch feldolgozása
+        if batch:
+            self.detect_batch([batch_item[0] for batch_item in batch])
+
+        # Az utolsó frame mindig kulcsképkocka, hogy a végén se maradjon interpolálatlan szakasz
+        if last_item is not None and not self.keyframe_flags[-1]:
+            result = self.model([cv2.resize(last_item[0], (640, 640))])[0]
+            self.all_keypoints[-1], self.inverse_transformers[-1] = self.process_result(result, len(self.all_keypoints) - 1)
+            self.keyframe_flags[-1] = True
+
+        yield from batch
+
+    # Kihagyott (nem kulcs-) képkockák homográfiájának és kulcspontjainak kitöltése:
+    # két érvényes kulcsképkocka között lineáris interpoláció, egyébként a legközelebbi továbbvitele
+    def fill_skipped_frames(self):
+        keyframe_indices = [i for i, keyframe in enumerate(self.keyframe_flags) if keyframe]
+        if len(keyframe_indices) == len(self.keyframe_flags):
+            return
+
+        # Normalizált kép -> pálya mátrixok a kulcsképkockákon
+        def normalized_matrix(index):
+            transformer = self.inverse_transformers[index]
+            if transformer is None or transformer.matrix is None:
+                return None
+            return transformer.matrix / transformer.matrix[2, 2]
+
+        for position, start in enumerate(keyframe_indices):
+            end = keyframe_indices[position + 1] if position + 1 < len(keyframe_indices) else len(self.keyframe_flags)
+            if end - start <= 1:
+                continue
+            start_matrix = normalized_matrix(start)
+            end_matrix = normalized_matrix(end) if end < len(self.keyframe_flags) else None
+
+            for frame_index in range(start + 1, end):
+                if start_matrix is not None and end_matrix is not None:
+                    t = (frame_index - start) / (end - start)
+                    matrix = (1 - t) * start_matrix + t * end_matrix
+                else:
+                    matrix = start_matrix if start_matrix is not None else end_matrix
+
+                if matrix is None:
+                    self.inverse_transformers[frame_index] = None
+                    self.all_keypoints[frame_index] = self.all_keypoints[start]
+                    continue
+
+                inverse_transformer = ViewTransformer.from_matrix(matrix)
+                transformer = inverse_transformer.inverse()
+                self.inverse_transformers[frame_index] = inverse_transformer
+                self.all_keypoints[frame_index] = transformer.transform_points(points=self.pitch_vertices_cm)
+
+    # Kulcsképkocka statisztika (hány frame-en futott a modell) a teljesítmény riporthoz
+    def format_keyframe_stats(self):
+        return f"Kulcspont modell futtatva {sum(self.keyframe_flags)}/{len(self.keyframe_flags)} frame-en"
+
+    # Képpontok átváltása pályakoordinátára [m], megfordított y tengellyel (vektorizáltan):
+    # a points[i] képpontot a frame_indices[i]. frame kép -> pálya mátrixával vetítjük
+    def to_pitch_meters(self, matrices, points, frame_indices):
+        pitch_points = transform_points_per_frame(matrices, points, frame_indices) / 100.0  # cm -> m
+        pitch_points[:, 1] = (self.pitch_config.width / 100.0) - pitch_points[:, 1]  # y tengely megfordítása
+        return pitch_points
+
+    # Frame-enkénti kép -> pálya mátrixok egy (F, 3, 3) tömbben, és hogy melyik frame-en érvényes
+    def get_inverse_matrices(self):
+        matrices = np.zeros((len(self.inverse_transformers), 3, 3), dtype=np.float64)
+        valid = np.zeros(len(self.inverse_transformers), dtype=bool)
+        for frame_count, inverse_transformer in enumerate(self.inverse_transformers):
+            if inverse_transformer is not None and inverse_transformer.matrix is not None:
+                matrices[frame_count] = inverse_transformer.matrix
+                valid[frame_count] = True
+        return matrices, valid
+
+    # Játékosok és labda pályakoordinátáinak kiszámítása az eltárolt homográfiákkal.
+    # Az összes frame összes pontját egyetlen vektorizált hívással vetítjük
+    def project_tracks(self, players_tracks=None, ball_tracks=None):
+        # Kihagyott képkockák homográfiáinak kitöltése interpolációval
+        self.fill_skipped_frames()
+
+        frame_total = len(self.inverse_transformers)
+        matrices, valid = self.get_inverse_matrices()
+
+        # Játékos képpontok (bbox alsó közepe) összegyűjtése az érvényes homográfiájú frame-ekről
+        player_frames, player_ids, player_points = [], [], []
+        if players_tracks is not None:
+            for frame_count in range(min(frame_total, len(players_tracks))):
+                if not valid[frame_count]:
+                    continue
+                for track_id, player in players_tracks[frame_count].items():
+                    bbox = player.get("bbox", None)
+                    if bbox is None or len(bbox) != 4:
+                        continue
+                    x1, y1, x2, y2 = bbox
+                    player_frames.append(frame_count)
+                    player_ids.append(track_id)
+                    player_points.append(((x1 + x2) / 2, y2))
+
+        all_player_coords = [{} for _ in range(frame_total)]  # minden képkockára játékos koordináták (track_id → (x, y))
+        if player_points:
+            player_pitch_points = self.to_pitch_meters(matrices, player_points, player_frames).tolist()
+            for frame_count, track_id, pitch_point in zip(player_frames, player_ids, player_pitch_points):
+                all_player_coords[frame_count][track_id] = tuple(pitch_point)
+
+        # A labdához az utolsó érvényes homográfiát használjuk (frame index előrevitele)
+        last_valid_frames = np.maximum.accumulate(np.where(valid, np.arange(frame_total), -1)) if frame_total else np.array([], dtype=int)
+        ball_frames, ball_matrix_frames, ball_points = [], [], []
+        if ball_tracks is not None:
+            for frame_count in range(min(frame_total, len(ball_tracks))):
+                ball_data = ball_tracks[frame_count].get(1, {}).get("bbox", None)
+                if ball_data is None or last_valid_frames[frame_count] < 0:
                     continue
-                x1, y1, x2, y2 = bbox
-                x_center = (x1 + x2) / 2
-                y_bottom = y2
-                player_point = np.array([[x_center, y_bottom]], dtype=np.float32)
-                transformed_point = inverse_transformer.transform_points(player_point)
-                x_field = transformed_point[0][0] / 100.0  # átváltás centiméterről méterre
-                y_field = transformed_point[0][1] / 100.0
-                y_field = (pitch_config.width / 100.0) - y_field  # y tengely megfordítása
-                player_pitch_coords[track_id] = (x_field, y_field)
-
-        # Pályakoordináták kiszámítása (labda)
-        if ball_tracks is not None and frame_count < len(ball_tracks):
-            ball_data = ball_tracks[frame_count].get(1, {}).get("bbox", None)
-            if ball_data is not None:
                 x1, y1, x2, y2 = ball_data
-                ball_x = (x1 + x2) / 2
-                ball_y = (y1 + y2) / 2
-                ball_point = np.array([[ball_x, ball_y]], dtype=np.float32)
-                transformed_ball_point = inverse_transformer.transform_points(ball_point)
-                ball_x_field = transformed_ball_point[0][0] / 100.0
-                ball_y_field = transformed_ball_point[0][1] / 100.0
-                ball_y_field = (pitch_config.width / 100.0) - ball_y_field
-                ball_pitch_coords = (ball_x_field, ball_y_field)
-        
-        all_keypoints.append(frame_keypoints)
-        all_player_coords.append(player_pitch_coords)
-        all_ball_coords.append(ball_pitch_coords)
-        frame_count += 1
-
-    cap.release()
-    
-    return {
-        "keypoints": all_keypoints,
-        "player_coordinates": all_player_coords,
-        "ball_coordinates": all_ball_coords
-    }
\ No newline at end of file
+                ball_frames.append(frame_count)
+                ball_matrix_frames.append(last_valid_frames[frame_count])
+                ball_points.append(((x1 + x2) / 2, (y1 + y2) / 2))
+
+        # Labda koordináták: hiányzó labda esetén az előző koordináta marad érvényben
+        all_ball_coords = [None] * frame_total
+        if ball_points:
+            ball_pitch_points = self.to_pitch_meters(matrices, ball_points, ball_matrix_frames).tolist()
+            for frame_count, pitch_point in zip(ball_frames, ball_pitch_points):
+                all_ball_coords[frame_count] = tuple(pitch_point)
+        ball_pitch_coords = None
+        for frame_count in range(frame_total):
+            if all_ball_coords[frame_count] is None:
+                all_ball_coords[frame_count] = ball_pitch_coords
+            else:
+                ball_pitch_coords = all_ball_coords[frame_count]
+
+        return {
+            "keypoints": self.all_keypoints,
+            "player_coordinates": all_player_coords,
+            "ball_coordinates": all_ball_coords
+        }
+
+def process_keypoint_annotations(video_path, keypoint_model_path, players_tracks=None, ball_tracks=None, status_callback=None, batch_size=None, keyframe_interval=1, motion_threshold=None, homography_tolerance=2.0):
+
+    # Videó megnyitása
+    try:
+        frames = VideoFrameSource(video_path)
+    except FileNotFoundError:
+        print("Nem sikerült megnyitni a videót!")
+        return None
+
+    keypoint_detector = KeypointDetector(keypoint_model_path, 
+                                         frames.width, 
+                                         frames.height, 
+                                         batch_size=batch_size,
+                                         keyframe_interval=keyframe_interval,
+                                         motion_threshold=motion_threshold,
+                                         homography_tolerance=homography_tolerance)
+
+    for frame_count, _ in enumerate(keypoint_detector.detect_frames((frame,) for frame in frames)):
+        if status_callback:
+            status_callback(f"Kulcspontok detektálása... (Frame {frame_count + 1}/{len(frames)})")
+    if status_callback:
+        status_callback(keypoint_detector.homography_cache.format_stats())
+
+    return keypoint_detector.project_tracks(players_tracks, ball_tracks)
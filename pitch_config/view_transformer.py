@@ -8,6 +8,26 @@ class ViewTransformer:
         target = target.astype(np.float32)
         # A homográfia mátrix számítása
         self.matrix, _ = cv2.findHomography(source, target)
+        self._inverse_matrix = None
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray) -> "ViewTransformer":
+        # Transzformáció létrehozása egy már ismert homográfia mátrixból (pl. interpolált)
+        transformer = cls.__new__(cls)
+        transformer.matrix = matrix
+        transformer._inverse_matrix = None
+        return transformer
+
+    @property
+    def inverse_matrix(self) -> np.ndarray:
+        # Az ellenkező irányú homográfia mátrixinvertálással, újabb illesztés nélkül
+        if self._inverse_matrix is None and self.matrix is not None:
+            self._inverse_matrix = np.linalg.inv(self.matrix)
+        return self._inverse_matrix
+
+    def inverse(self) -> "ViewTransformer":
+        # Ellenkező irányú transzformáció (célpont -> forrás)
+        return ViewTransformer.from_matrix(self.inverse_matrix)
 
     def transform_points(self, points: np.ndarray) -> np.ndarray:
         # Pontok átalakítása a cv2.perspectiveTransform által elvárt alakra
@@ -15,4 +35,21 @@ class ViewTransformer:
         # Perspektív transzformáció alkalmazása a homográfia mátrix használatával
         points = cv2.perspectiveTransform(points, self.matrix)
 
-        return points.reshape(-1, 2).astype(np.float32)
\ No newline at end of file
+        return points.reshape(-1, 2).astype(np.float32)
+
+# Pontok vektorizált transzformációja több frame-re egyszerre: a points[i] pontot a
+# matrices[frame_indices[i]] homográfiával vetítjük (matrices alakja: (F, 3, 3))
+def transform_points_per_frame(matrices: np.ndarray, points: np.ndarray, frame_indices: np.ndarray) -> np.ndarray:
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    frame_indices = np.asarray(frame_indices, dtype=np.intp)
+    x, y = points[:, 0], points[:, 1]
+
+    # Mátrixelemek frame-enkénti kigyűjtése komponensenként (nem kell (N, 3, 3)-as tömb)
+    def element(row, col):
+        return matrices[frame_indices, row, col]
+
+    w = element(2, 0) * x + element(2, 1) * y + element(2, 2)
+    transformed_x = (element(0, 0) * x + element(0, 1) * y + element(0, 2)) / w
+    transformed_y = (element(1, 0) * x + element(1, 1) * y + element(1, 2)) / w
+
+    return np.stack([transformed_x, transformed_y], axis=1)
@@ -2,20 +2,18 @@ import os
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.patches import Rectangle
+from utils import PresenceIndex
 
 # Játékos aktivitási statisztikák generálása
-def generate_player_activity_summary(player_coordinates_list, speed_estimator, tracker=None, output_dir="statistics"):
+def generate_player_activity_summary(player_coordinates_list, speed_estimator, tracker=None, output_dir="statistics", presence_index=None):
     os.makedirs(output_dir, exist_ok=True)
 
-    # Játékosok jelenlétének számlálása
-    player_presence = {}
-    total_frames = len(player_coordinates_list)
-    for frame_data in player_coordinates_list:
-        for track_id in frame_data:
-            player_presence[track_id] = player_presence.get(track_id, 0) + 1
+    # Játékosok jelenléte (a koordinátákból épül, ha az elemzés nem adta át)
+    if presence_index is None:
+        presence_index = PresenceIndex.from_frames(player_coordinates_list)
 
     # Csak azok a játékosok, akik a frame-ek legalább 50%-ában jelen voltak
-    valid_players = [track_id for track_id, count in player_presence.items() if count >= total_frames * 0.5]
+    valid_players = presence_index.get_players_with_minimum_presence(0.5)
 
     # Játékos statisztikák külön csapatonként
     player_stats_team1 = {}
@@ -1,6 +1,6 @@
 import os
 import json
-from utils import get_players_with_minimum_presence, get_players_presence_ratios
+from utils import PresenceIndex
 from pathlib import Path
 
 def generate_basic_player_statistics(players_tracks, 
@@ -11,13 +11,18 @@ def generate_basic_player_statistics(players_tracks,
                                      output_dir: str,
                                      offside_frame_counts,
                                      fps,
-                                     minimum_ratio: float = 0.5):
+                                     minimum_ratio: float = 0.5,
+                                     presence_index=None):
     
+    # Jelenléti index (a trackekből épül, ha az elemzés nem adta át)
+    if presence_index is None:
+        presence_index = PresenceIndex.from_frames(players_tracks)
+
     # Megfelelő játékosok kiválasztása
-    valid_players = get_players_with_minimum_presence(players_tracks, minimum_ratio)
+    valid_players = presence_index.get_players_with_minimum_presence(minimum_ratio)
 
     # Jelenléti arány a frameken
-    presence_ratios = get_players_presence_ratios(players_tracks)
+    presence_ratios = presence_index.get_ratios()
 
     player_stats = {}
     for track_id in valid_players:
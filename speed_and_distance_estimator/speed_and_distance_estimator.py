@@ -1,4 +1,5 @@
 import numpy as np
+from bisect import bisect_right
 
 class SpeedAndDistanceEstimator:
     def __init__(self, fps, smoothing_window_size=8, max_realistic_speed_kmh=36):
@@ -12,9 +13,19 @@ class SpeedAndDistanceEstimator:
         # Játékosok adatainak tárolása: track_id -> pozíciók, időbélyegek, teljes megtett távolság, sebességek, simított sebesség
         self.player_data = {}
 
+    # Egyetlen minta hozzáadása (folyamatos, mintánkénti használathoz); a számítást a kötegelt
+    # add_trajectory végzi, így a két út eredménye azonos
     def add_measurement(self, track_id, position_m, frame_num, team_id=None):
-        # Időbélyeg kiszámítása a képkocka sorszám és az fps alapján
-        timestamp = frame_num / self.fps
+        self.add_trajectory(track_id, [frame_num], [position_m], team_id)
+
+    # Egy játékos mintáinak kötegelt hozzáadása (frame indexek és pályapozíciók tömbjei, időrendben).
+    # A pillanatnyi sebesség, a korlát, a mozgóátlagos simítás (kumulatív összegekkel) és a megtett
+    # távolság vektorizáltan számolódik, a játékos korábbi mintáinak folytatásaként
+    def add_trajectory(self, track_id, frame_nums, positions_m, team_id=None):
+        frame_nums = np.asarray(frame_nums, dtype=np.int64)
+        positions = np.asarray(positions_m, dtype=np.float64).reshape(-1, 2)
+        if len(frame_nums) == 0:
+            return
 
         # Ha még nem létezik az adott játékos az adatbázisban, inicializáljuk
         if track_id not in self.player_data:
@@ -24,60 +35,56 @@ class SpeedAndDistanceEstimator:
                 'total_distance': 0.0,
                 'speeds': [],
                 'smoothed_speed': 0.0,
-                'team_id': team_id
+                'team_id': team_id,
+                'frame_nums': [],
+                'distances': [],
+                'smoothed_list': []
             }
-
-        # Az aktuális játékos adatai
         player_info = self.player_data[track_id]
-        instant_speed_ms = 0.0
-
-        # Ha már vannak korábbi pozíciók, akkor kiszámítjuk a távolságot és a sebességet
-        if player_info['positions']:
-            prev_pos = np.array(player_info['positions'][-1])
-            current_pos = np.array(position_m)
-            prev_time = player_info['timestamps'][-1]
-
-            # Két pozíció közötti távolság
-            delta_distance = np.linalg.norm(current_pos - prev_pos)
-            delta_time = timestamp - prev_time
+        previous_count = len(player_info['speeds'])
 
-            if delta_time > 0:
-                # Sebesség kiszámítása: távolság/idő
-                calculated_speed_ms = delta_distance / delta_time
-
-                # Sebesség korlátozása a maximális reális értékre
-                if calculated_speed_ms > self.max_realistic_speed_ms:
-                    instant_speed_ms = self.max_realistic_speed_ms
-                elif calculated_speed_ms < 0:
-                    instant_speed_ms = 0.0
-                else:
-                    instant_speed_ms = calculated_speed_ms
-                
-                # Megtett távolság hozzáadása az összesített értékhez
-                player_info['total_distance'] += delta_distance
-            else:
-                # Ha nincs időeltolódás, a sebesség az utolsó mért érték marad
-                instant_speed_ms = player_info['speeds'][-1] if player_info['speeds'] else 0.0
+        # Időbélyegek; az első új mintát az előző (már tárolt) mintához hasonlítjuk
+        timestamps = frame_nums / self.fps
+        if previous_count:
+            previous_positions = np.vstack([player_info['positions'][-1], positions])
+            previous_timestamps = np.concatenate([[player_info['timestamps'][-1]], timestamps])
         else:
-            # Ha ez az első pozíció, a sebesség nulla
-            instant_speed_ms = 0.0
+            previous_positions = np.vstack([positions[:1], positions])
+            previous_timestamps = np.concatenate([timestamps[:1], timestamps])
+        delta_distances = np.linalg.norm(np.diff(previous_positions, axis=0), axis=1)
+        delta_times = np.diff(previous_timestamps)
+        moving = delta_times > 0
+
+        # Pillanatnyi sebesség a maximális reális értékre korlátozva; ha nincs időeltolódás, az
+        # előző sebesség marad (előre kitöltés), a legelső minta sebessége nulla
+        speeds = np.zeros(len(frame_nums))
+        speeds[moving] = np.minimum(delta_distances[moving] / delta_times[moving], self.max_realistic_speed_ms)
+        if not previous_count:
+            moving[0] = True
+        last_valid = np.maximum.accumulate(np.where(moving, np.arange(len(speeds)), -1))
+        first_speed = player_info['speeds'][-1] if previous_count else 0.0
+        speeds = np.where(last_valid >= 0, speeds[np.maximum(last_valid, 0)], first_speed)
 
-        # Új pozíció és időbélyeg mentése
-        player_info['positions'].append(list(position_m))
-        player_info['timestamps'].append(timestamp)
-        player_info['speeds'].append(instant_speed_ms)
+        # Megtett távolság: csak az időben előrelépő minták adódnak hozzá
+        distances = player_info['total_distance'] + np.cumsum(np.where(moving, delta_distances, 0.0))
 
-        # Sebesség simítása mozgóátlaggal
-        if len(player_info['speeds']) >= self.smoothing_window_size:
-            window = player_info['speeds'][-self.smoothing_window_size:]
-            player_info['smoothed_speed'] = np.mean(window)
-        elif player_info['speeds']:
-            player_info['smoothed_speed'] = np.mean(player_info['speeds'])
+        # Mozgóátlag kumulatív összegekkel; az ablak a korábbi minták végét is tartalmazhatja
+        window = self.smoothing_window_size
+        tail = player_info['speeds'][len(player_info['speeds']) - min(previous_count, window - 1):]
+        sums = np.concatenate([[0.0], np.cumsum(np.concatenate([tail, speeds]))])
+        ends = len(tail) + np.arange(1, len(speeds) + 1)
+        window_lengths = np.minimum(previous_count + np.arange(1, len(speeds) + 1), window)
+        smoothed = (sums[ends] - sums[ends - window_lengths]) / window_lengths
 
-        # Simított sebességek gyűjtése a listába
-        if 'smoothed_list' not in player_info:
-            player_info['smoothed_list'] = []
-        player_info['smoothed_list'].append(player_info['smoothed_speed'])
+        # Tárolás a mintánkénti listákban (a lekérdezések és a statisztikák ezeket olvassák)
+        player_info['positions'].extend(positions.tolist())
+        player_info['timestamps'].extend(timestamps.tolist())
+        player_info['speeds'].extend(speeds.tolist())
+        player_info['smoothed_list'].extend(smoothed.tolist())
+        player_info['frame_nums'].extend(frame_nums.tolist())
+        player_info['distances'].extend(distances.tolist())
+        player_info['smoothed_speed'] = float(smoothed[-1])
+        player_info['total_distance'] = float(distances[-1])
 
     def get_player_speed_kmh(self, track_id):
         # A játékos aktuális simított sebessége km/h-ban visszaadva
@@ -96,3 +103,13 @@ class SpeedAndDistanceEstimator:
         speed_kmh = self.get_player_speed_kmh(track_id)
         distance_m = self.get_player_distance_m(track_id)
         return speed_kmh, distance_m
+
+    def get_player_info_at(self, track_id, frame_num):
+        # A játékos sebessége és megtett távolsága az adott frame-ig bezárólag
+        player_info = self.player_data.get(track_id)
+        if player_info is None or not player_info['frame_nums']:
+            return 0.0, 0.0
+        index = bisect_right(player_info['frame_nums'], frame_num) - 1
+        if index < 0:
+            return 0.0, 0.0
+        return player_info['smoothed_list'][index] * 3.6, player_info['distances'][index]
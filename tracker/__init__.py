@@ -1 +1,2 @@
-from .tracker import Tracker
\ No newline at end of file
+from .tracker import Tracker
+from .track_store import TrackStore, PLAYER, REFEREE, BALL
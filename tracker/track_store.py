@@ -0,0 +1,165 @@
+import numpy as np
+
+# Osztályazonosítók az oszlopos tárolóban
+PLAYER, REFEREE, BALL = 0, 1, 2
+TRACK_CLASSES = {"players": PLAYER, "referees": REFEREE, "ball": BALL}
+
+# Oszlopos track tároló: a frame-enkénti {track_id: {"bbox": [...]}} szótárlisták tartalma
+# egybefüggő NumPy tömbökben (frame index, track id, osztály, bbox, pálya x/y), frame szerint
+# rendezve. A frame_offsets[f]:frame_offsets[f + 1] tartomány az f. frame sorait adja,
+# a track nézetek lusta módon felépített indexből jönnek. Jelenleg a szótárlisták mellett
+# élő, azokból épített index a teljes meccsre vonatkozó tömbös számításokhoz (jelenlét, térfél
+# szavazás); a rajzolás, a stub és a többi elemző még a szótárlistákat használja, így a tároló
+# a memóriát nem csökkenti, hanem növeli. A to_tracks / to_player_coordinates /
+# to_ball_coordinates adapterek a régi alakot adják vissza a későbbi átálláshoz
+class TrackStore:
+    def __init__(self, frame_count, frames, track_ids, classes, bboxes, pitch_xy=None, ball_coordinates=None):
+        frames = np.asarray(frames, dtype=np.int32)
+        # Sorok frame szerinti rendezése (stabilan, a frame-en belüli sorrend megmarad)
+        order = None if np.all(frames[1:] >= frames[:-1]) else np.argsort(frames, kind="stable")
+
+        def column(values, dtype, shape):
+            values = np.asarray(values, dtype=dtype).reshape(shape)
+            return values if order is None else values[order]
+
+        self.frame_count = frame_count
+        self.frames = frames if order is None else frames[order]
+        self.track_ids = column(track_ids, np.int32, (-1,))
+        self.classes = column(classes, np.int8, (-1,))
+        self.bboxes = column(bboxes, np.float32, (-1, 4))
+        if pitch_xy is None:
+            pitch_xy = np.full((len(self.frames), 2), np.nan, dtype=np.float32)
+        self.pitch_xy = column(pitch_xy, np.float32, (-1, 2))
+
+        # Frame-enkénti labda pályakoordináta (a hiányzó frame-eken az előző érték marad, mint eddig)
+        if ball_coordinates is None:
+            ball_coordinates = np.full((frame_count, 2), np.nan, dtype=np.float32)
+        self.ball_coordinates = np.asarray(ball_coordinates, dtype=np.float32).reshape(-1, 2)
+
+        # Frame-enkénti eltolás index
+        self.frame_offsets = np.searchsorted(self.frames, np.arange(frame_count + 1)).astype(np.int64)
+        self._track_index = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    # Tároló felépítése a detect_video / project_tracks kimenetéből (kompatibilitási adapter)
+    @classmethod
+    def from_tracks(cls, tracks, player_coordinates=None, ball_coordinates=None):
+        frame_count = max(len(tracks.get(key, [])) for key in TRACK_CLASSES)
+
+        # Sorok számának előzetes meghatározása, hogy a tömbök egyszer foglalódjanak
+        row_count = sum(len(frame_tracks) for key in TRACK_CLASSES for frame_tracks in tracks.get(key, []))
+        frames = np.empty(row_count, dtype=np.int32)
+        track_ids = np.empty(row_count, dtype=np.int32)
+        classes = np.empty(row_count, dtype=np.int8)
+        bboxes = np.empty((row_count, 4), dtype=np.float32)
+        pitch_xy = np.full((row_count, 2), np.nan, dtype=np.float32)
+
+        row = 0
+        for frame_num in range(frame_count):
+            for key, class_id in TRACK_CLASSES.items():
+                class_tracks = tracks.get(key, [])
+                if frame_num >= len(class_tracks):
+                    continue
+                for track_id, track_data in class_tracks[frame_num].items():
+                    bbox = track_data.get("bbox", None)
+                    if bbox is None or len(bbox) != 4:
+                        continue
+                    frames[row] = frame_num
+                    track_ids[row] = track_id
+                    classes[row] = class_id
+                    bboxes[row] = bbox
+
+                    # Pályakoordináta: játékosnál a projekcióból, labdánál a frame labda koordinátájából
+                    if class_id == PLAYER and player_coordinates is not None and frame_num < len(player_coordinates):
+                        coords = player_coordinates[frame_num].get(track_id, None)
+                        if coords is not None:
+                            pitch_xy[row] = coords
+                    elif class_id == BALL and ball_coordinates is not None and frame_num < len(ball_coordinates):
+                        if ball_coordinates[frame_num] is not None:
+                            pitch_xy[row] = ball_coordinates[frame_num]
+                    row += 1
+
+        dense_ball_coordinates = np.full((frame_count, 2), np.nan, dtype=np.float32)
+        if ball_coordinates is not None:
+            for frame_num, coords in enumerate(ball_coordinates[:frame_count]):
+                if coords is not None:
+                    dense_ball_coordinates[frame_num] = coords
+
+        return cls(frame_count, frames[:row], track_ids[:row], classes[:row], bboxes[:row], pitch_xy[:row], dense_ball_coordinates)
+
+    # Egy frame sorainak indexei (opcionálisan csak egy osztályra)
+    def frame_rows(self, frame_num, class_id=None):
+        rows = np.arange(self.frame_offsets[frame_num], self.frame_offsets[frame_num + 1])
+        if class_id is not None:
+            rows = rows[self.classes[rows] == class_id]
+        return rows
+
+    # Track index lusta felépítése: (osztály, track id) -> a track sorai frame szerint rendezve
+    def _build_track_index(self):
+        order = np.lexsort((self.frames, self.track_ids, self.classes))
+        keys = np.stack([self.classes[order], self.track_ids[order]], axis=1)
+        boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        starts = np.concatenate([[0], boundaries]) if len(order) else np.array([], dtype=np.int64)
+        ends = np.concatenate([boundaries, [len(order)]]) if len(order) else np.array([], dtype=np.int64)
+        self._track_index = {
+            (int(keys[start, 0]), int(keys[start, 1])): order[start:end] for start, end in zip(starts, ends)
+        }
+
+    # Egy track sorainak indexei frame szerint rendezve
+    def track_rows(self, track_id, class_id=PLAYER):
+        if self._track_index is None:
+            self._build_track_index()
+        return self._track_index.get((class_id, track_id), np.array([], dtype=np.int64))
+
+    # Egy track nézete: frame indexek, bboxok és pályakoordináták tömbjei
+    def track_view(self, track_id, class_id=PLAYER):
+        rows = self.track_rows(track_id, class_id)
+        return {
+            "frames": self.frames[rows],
+            "bboxes": self.bboxes[rows],
+            "pitch_xy": self.pitch_xy[rows]
+        }
+
+    # Adott osztály összes track azonosítója
+    def get_track_ids(self, class_id=PLAYER):
+        return np.unique(self.track_ids[self.classes == class_id])
+
+    # Frame x track párnázott tömbök: ids (F, Pmax), -1 a kitöltés; values (F, Pmax, k), NaN a kitöltés
+    def padded(self, class_id=PLAYER, column="pitch_xy"):
+        rows = np.flatnonzero(self.classes == class_id)
+        class_frames = self.frames[rows]
+        counts = np.bincount(class_frames, minlength=self.frame_count)
+        starts = np.cumsum(counts) - counts
+        ranks = np.arange(len(rows)) - starts[class_frames]
+        max_count = int(counts.max()) if len(counts) else 0
+
+        values = getattr(self, column)
+        ids = np.full((self.frame_count, max_count), -1, dtype=np.int32)
+        padded_values = np.full((self.frame_count, max_count) + values.shape[1:], np.nan, dtype=values.dtype)
+        ids[class_frames, ranks] = self.track_ids[rows]
+        padded_values[class_frames, ranks] = values[rows]
+        return ids, padded_values
+
+    # Kompatibilitási adapter: frame-enkénti {track_id: {"bbox": [...]}} listák
+    def to_tracks(self):
+        tracks = {key: [{} for _ in range(self.frame_count)] for key in TRACK_CLASSES}
+        class_keys = {class_id: key for key, class_id in TRACK_CLASSES.items()}
+        for frame_num, track_id, class_id, bbox in zip(self.frames.tolist(), self.track_ids.tolist(),
+                                                       self.classes.tolist(), self.bboxes.tolist()):
+            tracks[class_keys[class_id]][frame_num][track_id] = {"bbox": bbox}
+        return tracks
+
+    # Kompatibilitási adapter: frame-enkénti {track_id: (x, y)} játékos pályakoordináták
+    def to_player_coordinates(self):
+        player_coordinates = [{} for _ in range(self.frame_count)]
+        rows = np.flatnonzero((self.classes == PLAYER) & ~np.isnan(self.pitch_xy[:, 0]))
+        for frame_num, track_id, coords in zip(self.frames[rows].tolist(), self.track_ids[rows].tolist(),
+                                               self.pitch_xy[rows].tolist()):
+            player_coordinates[frame_num][track_id] = tuple(coords)
+        return player_coordinates
+
+    # Kompatibilitási adapter: frame-enkénti (x, y) labda pályakoordináták (vagy None)
+    def to_ball_coordinates(self):
+        return [None if np.isnan(coords[0]) else tuple(coords) for coords in self.ball_coordinates.tolist()]
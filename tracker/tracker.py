@@ -1,7 +1,10 @@
 from ultralytics import YOLO
 from utils.bbox_utils import get_center_of_bbox, get_bbox_width
 from utils.team_assigner_utils import TeamAssigner
-from ball_possession import BallPossession
+from utils.stage_pipeline import StagePipeline
+from utils.batch_utils import get_auto_batch_size
+from ball_possession import BallPossession, get_dense_coordinates
+from frame_compositor import HudPanel, LabelRenderer
 from pitch_config import FootballPitchConfiguration
 from speed_and_distance_estimator import SpeedAndDistanceEstimator
 import pickle
@@ -21,7 +24,6 @@ class Tracker:
         self.teamAssigner = TeamAssigner()
         self.team1_color = None
         self.team2_color = None
-        self.threshold = 70
 
         # Labdabirtoklás méréséhez szükséges inicalizáció
         self.possession = BallPossession()
@@ -41,6 +43,18 @@ class Tracker:
         # Legközelebbi játékosok azonosítóinak tárolása
         self.closest_player_ids = {}
 
+        # Játékos track_id -> csapat hozzárendelés gyorsítótára
+        self.track_id_to_team = {}
+
+        # Kapus track_id -> csapat (kapusonként egyszer, szavazással meghatározva)
+        self.goalkeeper_teams = {}
+
+        # Csapatszín HUD panel (az első kirajzoláskor készül el)
+        self.team_colors_panel = None
+
+        # Játékosonkénti feliratok (azonosítók, koordináták, sebesség) sprite gyorsítótára
+        self.label_renderer = LabelRenderer()
+
     def draw_ellipse(self, frame, bbox, color, track_id = None, draw_player_ellipses=True, draw_player_ids=True):
         # Alsó koordináta a bbox alapján
         y2 = int(bbox[3])  
@@ -66,21 +80,8 @@ class Tracker:
         # Track_id megjelenítése a játékos alatt
         if draw_player_ids:
             if track_id is not None:
-                # Text generálása
-                text = str(track_id)
-                font = cv2.FONT_HERSHEY_SIMPLEX
-                font_scale = 0.5
-                thickness = 1
-                text_size, _ = cv2.getTextSize(text, font, font_scale, thickness)
-                text_w, text_h = text_size
-
-                # Téglalap pozicionálása
-                rect_top_left = (x_center - text_w // 2, y2 - text_h - 10)
-                rect_bottom_right = (x_center + text_w // 2 + 2 , y2 - 10)
-
-                # Téglalap kitöltése fehér színnel
-                cv2.rectangle(frame, rect_top_left, rect_bottom_right, color=(255, 255, 255), thickness=cv2.FILLED)
-                cv2.putText(frame, text, (x_center - text_w // 2, y2 - 10), font, font_scale, (0, 0, 0), thickness)
+                # Fehér téglalap fekete azonosítóval, gyorsítótárazott sprite-ként
+                self.label_renderer.draw_id_badge(frame, str(track_id), x_center, y2)
         
         return frame
 
@@ -125,41 +126,56 @@ class Tracker:
 
         return interpolated_ball_positions
 
-    def detect_video(self, frames, read_from_stub=False, stub_path=None, status_callback=None):
-
-        if read_from_stub and stub_path and os.path.exists(stub_path):
-            with open(stub_path, "rb") as f:
-                annotated_frames = pickle.load(f)
-            return annotated_frames
-        
-        detections = []
-        total_frames = len(frames)
-
-        for frame_num, frame in enumerate(frames):
-            if status_callback:
-                status_callback(f"Objektumdetektálás... (Frame {frame_num + 1}/{total_frames})")
-            detection = self.model(frame)[0]
-            detections.append(detection)
-
-        tracks = {
-            "players": [],
-            "referees": [],
-            "ball": []
-        }
-
-        # Detektálás az összes képkockán
-        for frame_num, detection in enumerate(detections):
-            cls_names = detection.names
+    # Egy ultralytics Results tömörítése: csak a dobozok, osztályok és konfidenciák maradnak meg,
+    # a Results-ben tárolt eredeti kép nem kerül tovább
+    def compact_detections(self, result):
+        boxes = result.boxes
+        return sv.Detections(
+            xyxy=boxes.xyxy.cpu().numpy().astype(np.float32),
+            confidence=boxes.conf.cpu().numpy().astype(np.float32),
+            class_id=boxes.cls.cpu().numpy().astype(int)
+        )
+
+    # Objektumdetektálás kötegelve (generátor): batch_size frame egyetlen modellhívásban;
+    # frame-enként (frame, tömörített detektálások, osztálynevek) elemeket ad tovább
+    def detect_frames(self, frames, status_callback=None, total_frames=None, batch_size=1):
+        batch = []
+        frame_num = 0
+        for frame in frames:
+            batch.append(frame)
+            if len(batch) < batch_size:
+                continue
+            for item in self.detect_batch(batch):
+                frame_num += 1
+                if status_callback:
+                    status_callback(f"Objektumdetektálás... (Frame {frame_num}/{total_frames})")
+                yield item
+            batch = []
+
+        # Maradék (nem teljes) batch feldolgozása
+        if batch:
+            for item in self.detect_batch(batch):
+                frame_num += 1
+                if status_callback:
+                    status_callback(f"Objektumdetektálás... (Frame {frame_num}/{total_frames})")
+                yield item
+
+    def detect_batch(self, batch):
+        results = self.model(batch)
+        return [(frame, self.compact_detections(result), result.names) for frame, result in zip(batch, results)]
+
+    # Objektumok követése és osztályozása (generátor): frame-enként a játékosok,
+    # játékvezetők és a labda szótárai
+    def track_detections(self, detections):
+        for _, detection_supervision, cls_names in detections:
             cls_names_inv = {value:key for key, value in cls_names.items()}
 
             # Objektumok követése supervision-nel
-            detection_supervision = sv.Detections.from_ultralytics(detection)
-                    
             tracked_objects = self.tracker.update_with_detections(detection_supervision)
 
-            tracks["players"].append({})
-            tracks["referees"].append({})
-            tracks["ball"].append({})
+            players = {}
+            referees = {}
+            ball = {}
 
             for frame_detection in tracked_objects:
                 bbox = frame_detection[0].tolist()
@@ -171,17 +187,56 @@ class Tracker:
                     cls_id = cls_names_inv['player']
 
                 if cls_id == cls_names_inv['player']:
-                    tracks["players"][frame_num][track_id] = {"bbox":bbox}
+                    players[track_id] = {"bbox":bbox}
 
                 if cls_id == cls_names_inv['referee']:
-                    tracks["referees"][frame_num][track_id] = {"bbox":bbox}
+                    referees[track_id] = {"bbox":bbox}
 
             for frame_detection in detection_supervision:
                 bbox = frame_detection[0].tolist()
                 cls_id = frame_detection[3]
 
                 if cls_id == cls_names_inv['ball']:
-                    tracks["ball"][frame_num][1] = {"bbox":bbox}
+                    ball[1] = {"bbox":bbox}
+
+            yield players, referees, ball
+
+    # Detektálás, kulcspontok és követés lépéseinek összeállítása a feldolgozó lánchoz
+    def get_detection_stages(self, total_frames, status_callback=None, keypoint_detector=None, batch_size=1):
+        stages = [("detektálás", lambda frames: self.detect_frames(frames, status_callback, total_frames, batch_size))]
+        # Ugyanazon dekódolt frame-en fut a pálya kulcspont detektálás is
+        if keypoint_detector is not None:
+            stages.append(("kulcspontok", keypoint_detector.detect_frames))
+        stages.append(("követés", self.track_detections))
+        return stages
+
+    def detect_video(self, frames, read_from_stub=False, stub_path=None, status_callback=None, keypoint_detector=None, pipeline=None, batch_size=None):
+
+        if read_from_stub and stub_path and os.path.exists(stub_path):
+            with open(stub_path, "rb") as f:
+                annotated_frames = pickle.load(f)
+            return annotated_frames
+
+        # Batch méret automatikus hangolása a CPU magok és a szabad memória alapján
+        if batch_size is None:
+            batch_size = get_auto_batch_size(getattr(frames, "width", 1920), getattr(frames, "height", 1080))
+
+        # Alapértelmezés szerint a lépések szekvenciálisan, egymásba láncolva futnak
+        if pipeline is None:
+            pipeline = StagePipeline(concurrent=False)
+        for name, transform in self.get_detection_stages(len(frames), status_callback, keypoint_detector, batch_size):
+            pipeline.add_stage(name, transform)
+
+        tracks = {
+            "players": [],
+            "referees": [],
+            "ball": []
+        }
+
+        for players, referees, ball in pipeline.run(frames):
+            tracks["players"].append(players)
+            tracks["referees"].append(referees)
+            tracks["ball"].append(ball)
 
         if stub_path is not None:
             with open(stub_path,'wb') as f:
@@ -192,317 +247,293 @@ class Tracker:
 
         return tracks
 
+    # Csapatszínek és a játékosok csapatának meghatározása a frame-ek streamelt bejárásával
+    def assign_teams(self, frames, tracks):
+        # Minden mezőnyjátékos track első megjelenésének frame-je
+        first_appearances = {}
+        for frame_num, player_dict in enumerate(tracks["players"]):
+            for track_id in player_dict:
+                if track_id in self.goalkeeper_ids or track_id in self.track_id_to_team:
+                    continue
+                first_appearances.setdefault(frame_num, []).append(track_id)
+                self.track_id_to_team[track_id] = None
 
-    def annotations(self, 
-                    frames, 
-                    tracks,  
-                    keypoints_list=None, 
-                    player_coordinates_list=None, 
-                    ball_coordinates_list=None,
-                    draw_player_ellipses=True,
-                    draw_player_ids=True,
-                    draw_referee_ellipses=True,
-                    draw_ball_triangle=True,
-                    draw_speed_distance=True,
-                    draw_keypoints=True,
-                    draw_player_coordinates=True
-                    ):
-
-        annotated_frames = []
-
-        # track_id gyorsítótár
-        self.track_id_to_team = {}
+        # Csak addig dekódolunk, amíg új játékos jelenik meg
+        last_needed_frame = max(first_appearances, default=0)
 
         for frame_num, frame in enumerate(frames):
-            annotated_frame = frame.copy()
+            if frame_num > last_needed_frame:
+                break
 
             player_dict = tracks["players"][frame_num]
-            referee_dict = tracks["referees"][frame_num]
-            ball_dict = tracks["ball"][frame_num]
-
-            # Csapatszín beállítása az első frame-en
-            if frame_num == 0:
-                for _, player in player_dict.items():
-                    # Első csapat színének meghatározása
-                    if self.team1_color is None:
-                        upper_body_image = self.teamAssigner.get_upper_body_image(frame, player["bbox"])
-                        self.team1_color = self.teamAssigner.get_player_color(upper_body_image)
-                        continue
-                    
-                    # Második csapat színének meghatározása
-                    upper_body_image = self.teamAssigner.get_upper_body_image(frame, player["bbox"])
-                    player_color = self.teamAssigner.get_player_color(upper_body_image)
-
-                    # Színkülönbség számítása
-                    color_diff = np.linalg.norm(np.array(self.team1_color) - np.array(player_color))
-                    if color_diff > self.threshold:
-                        self.team2_color = player_color
-                        break
-
-            # Játékosok:
-            for track_id, player in player_dict.items():
-                # Csak a mezőnyjátékosokat vizsgáljuk
-                if track_id in self.goalkeeper_ids:
-                    continue
-                # Játékos színének meghatározása
-                if track_id not in self.track_id_to_team:
-                    upper_body_image = self.teamAssigner.get_upper_body_image(frame, player["bbox"])
-                    apperance_feature = self.teamAssigner.get_player_color(upper_body_image)
-                    team_color_num = self.teamAssigner.get_player_to_team(apperance_feature, self.team1_color, self.team2_color)
-                    self.track_id_to_team[track_id] = team_color_num
-                else:
-                    team_color_num = self.track_id_to_team[track_id]
-
-                # Elipszis rajzolása a játékosok alá
-                if team_color_num == 1:
-                    annotated_frame = self.draw_ellipse(annotated_frame, 
-                                                        player["bbox"], 
-                                                        self.team1_color, 
-                                                        track_id=track_id,
-                                                        draw_player_ellipses=draw_player_ellipses,
-                                                        draw_player_ids=draw_player_ids
-                                                        )
-                elif team_color_num == 2:
-                    annotated_frame = self.draw_ellipse(annotated_frame, 
-                                                        player["bbox"], 
-                                                        self.team2_color, 
-                                                        track_id=track_id,
-                                                        draw_player_ellipses=draw_player_ellipses,
-                                                        draw_player_ids=draw_player_ids
-                                                        )
-
-            # Játékvezetők:
-            if draw_referee_ellipses:
-                for track_id, referee in referee_dict.items():
-                    # Sárga elipszis rajzolása a játékvezető alá
-                    referee_color = (0, 255, 255)
-                    annotated_frame = self.draw_ellipse(annotated_frame, referee["bbox"], referee_color)
-
-            # Labda:
-            if draw_ball_triangle:
-                if 1 in ball_dict:
-                    ball_bbox = [int(v) for v in ball_dict[1]["bbox"]]
-                    # Labda fölé zöld háromszög rajzolása
-                    annotated_frame = self.draw_triangle(annotated_frame, ball_bbox, (0, 255, 0))
-
-            closest_player_id = self.possession.player_on_the_ball(player_coordinates_list[frame_num], 
-                                                                   ball_coordinates_list[frame_num])
+
+            # Csapatszínek (prototípusok) illesztése egyszer, az első frame mezőnyjátékosainak színeiből
+            if frame_num == 0 and self.team1_color is None:
+                bboxes = [player["bbox"] for track_id, player in player_dict.items() if track_id not in self.goalkeeper_ids]
+                crops, valid = self.teamAssigner.get_upper_body_batch(frame, bboxes)
+                colors = self.teamAssigner.get_player_colors(crops[valid])
+                self.team1_color, self.team2_color = self.teamAssigner.fit_team_prototypes(colors)
+
+            # Új játékosok csapatának meghatározása az első megjelenésük frame-jén, kötegelten
+            new_track_ids = first_appearances.get(frame_num, [])
+            if new_track_ids and self.team1_color is not None:
+                teams = self.teamAssigner.get_teams_for_bboxes(frame, 
+                                                               [player_dict[track_id]["bbox"] for track_id in new_track_ids], 
+                                                               self.team1_color, 
+                                                               self.team2_color)
+                for track_id, team in zip(new_track_ids, teams.tolist()):
+                    self.track_id_to_team[track_id] = team
+
+        # Meg nem határozható játékosok eltávolítása (pl. rövidebb videó, mint a track lista)
+        self.track_id_to_team = {track_id: team for track_id, team in self.track_id_to_team.items() if team is not None}
+
+        return self.track_id_to_team
+
+    # Sebesség, távolság és a labdához legközelebbi játékos mérése képek nélkül, csak a koordinátákból
+    def measure_players(self, tracks, player_coordinates_list, ball_coordinates_list, dense_coordinates=None):
+        # Labdához legközelebbi játékosok a teljes mérkőzésre, egyetlen vektorizált számítással
+        # (a sűrű koordinátatömbök kívülről is átadhatók, ha más elemző is használja őket)
+        frame_count = len(tracks["players"])
+        if dense_coordinates is None:
+            dense_coordinates = get_dense_coordinates(player_coordinates_list[:frame_count], ball_coordinates_list[:frame_count])
+        player_ids, player_xy, ball_xy = (array[:frame_count] for array in dense_coordinates)
+        closest_players = self.possession.players_on_the_ball(player_ids, player_xy, ball_xy).tolist()
+
+        trajectories = {} # track_id -> (frame indexek, pozíciók) a kötegelt sebességméréshez
+        for frame_num in range(frame_count):
+            closest_player_id = closest_players[frame_num]
 
             # Legközelebbi játékosok azonosítóinak tárolása a passzok számának méréséhez
-            if closest_player_id is not None:
+            if closest_player_id >= 0:
                 team_id = self.track_id_to_team.get(closest_player_id, None)
                 self.closest_player_ids[frame_num] = (closest_player_id, team_id)
             else:
                 self.closest_player_ids[frame_num] = (None, None)
 
-                    
-            # Kulcspontok és vonalak kirajzolása, ha van keypoint adat
-            if keypoints_list and frame_num < len(keypoints_list):
-                pts = keypoints_list[frame_num]
-                if pts is not None and pts.size > 0:
-                    # Kulcspontok kirajzolása
-                    if draw_keypoints:
-                        for pt in pts:
-                            cv2.circle(annotated_frame, (int(pt[0]), int(pt[1])), radius=4, color=(255, 0, 0), thickness=-1)
-                        # Kulcspontok összekötése -> pályavonalak rajzolása
-                        for edge in self.pitch_edges:
-                            idx1, idx2 = edge[0]-1, edge[1]-1
-                            if idx1 < len(pts) and idx2 < len(pts):
-                                pt1 = (int(pts[idx1][0]), int(pts[idx1][1]))
-                                pt2 = (int(pts[idx2][0]), int(pts[idx2][1]))
-                                cv2.line(annotated_frame, pt1, pt2, color=(255, 255, 0), thickness=2)
-
-            # Játékosok pályakoordinátáinak kiírása
+            # Játékosonkénti pályák gyűjtése a sebesség és távolság méréséhez
             if player_coordinates_list and frame_num < len(player_coordinates_list):
                 coords = player_coordinates_list[frame_num]
-                # Kiírások pozicionálása (koordináták + sebesség- és távolságmérés)
-                if draw_player_coordinates == True:
-                    if draw_speed_distance == True:
-                        coordinates_y_pos = 40
-                        speed_distance_y_pos = 20
-                    else:
-                        coordinates_y_pos = 20
-                if draw_speed_distance == True and draw_player_coordinates == False:
-                    speed_distance_y_pos = 20
-
-                for track_id, player in tracks["players"][frame_num].items():
+                for track_id in tracks["players"][frame_num]:
                     if track_id in coords:
-                        x1,y1,x2,y2 = player["bbox"]
-                        x_center = int((x1 + x2) / 2)
-                        y_bottom = int(y2)
-                        if draw_player_coordinates:
-                            text = f"x: {coords[track_id][0]:.1f}m y: {coords[track_id][1]:.1f}m"
-                            cv2.putText(annotated_frame, 
-                                        text, 
-                                        (x_center - 70, y_bottom + coordinates_y_pos), 
-                                        cv2.FONT_HERSHEY_SIMPLEX, 
-                                        0.5, 
-                                        (0, 0, 0), 
-                                        2)
-
-                        # Sebesség és távolság mérése
-                        team_id = self.track_id_to_team.get(track_id, None)
-                        self.speed_estimator.add_measurement(track_id, coords[track_id], frame_num, team_id)
-                        speed_kmh, distance_m = self.speed_estimator.get_player_info(track_id)
-
-                        # Sebesség és távolság kiírása
-                        if draw_speed_distance:
-                            speed_dist_text = f"{speed_kmh:.1f} km/h, {distance_m:.1f} m"
-                            (text_width, text_height), _ = cv2.getTextSize(speed_dist_text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-                            text_x = x_center - text_width // 2
-                            cv2.putText(annotated_frame, speed_dist_text, (text_x, y_bottom + speed_distance_y_pos), 
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 2, cv2.LINE_AA)
-                            cv2.putText(annotated_frame, speed_dist_text, (text_x, y_bottom + speed_distance_y_pos), 
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
-            
-            annotated_frames.append(annotated_frame)
-
-        return annotated_frames
-    
-    # Kapusokat külön annotáljuk
-    def goalkeeper_annotations(self, 
-                               annotated_frames, 
-                               tracks, 
-                               frames, 
-                               player_coordinates_list, 
-                               field_sides,
-                               draw_goalkeeper_ellipses=True,
-                               draw_goalkeeper_ids=True
-                               ):
-        
-        for frame_num, frame in enumerate(frames):
-            annotated_frame = annotated_frames[frame_num]
-            player_dict = tracks["players"][frame_num]
-            coords = player_coordinates_list[frame_num] if player_coordinates_list and frame_num < len(player_coordinates_list) else {}
-
-            # Csak a kapusokat vizsgáljuk
-            for track_id, player in player_dict.items():
-                if track_id not in self.goalkeeper_ids:
-                    continue
+                        frame_nums, positions = trajectories.setdefault(track_id, ([], []))
+                        frame_nums.append(frame_num)
+                        positions.append(coords[track_id])
+
+        # Sebesség és távolság mérése játékosonként, teljes pályákon, vektorizáltan
+        for track_id, (frame_nums, positions) in trajectories.items():
+            team_id = self.track_id_to_team.get(track_id, None)
+            self.speed_estimator.add_trajectory(track_id, frame_nums, positions, team_id)
+
+    # Rajzoló rétegek: mindegyik helyben rajzol az adott frame-re, az előre kiszámított állapotból
+    # (csapatok, sebességek, koordináták), és a FrameCompositor rétegeiként regisztrálhatók
+
+    # Mezőnyjátékosok elipszise és azonosítója
+    def draw_players(self, frame, frame_num, tracks, draw_player_ellipses=True, draw_player_ids=True):
+        for track_id, player in tracks["players"][frame_num].items():
+            # Csak a mezőnyjátékosokat vizsgáljuk
+            if track_id in self.goalkeeper_ids:
+                continue
+
+            # Elipszis rajzolása a játékosok alá (a csapatot az assign_teams határozza meg)
+            team_color_num = self.track_id_to_team.get(track_id)
+            if team_color_num == 1:
+                self.draw_ellipse(frame, 
+                                  player["bbox"], 
+                                  self.team1_color, 
+                                  track_id=track_id,
+                                  draw_player_ellipses=draw_player_ellipses,
+                                  draw_player_ids=draw_player_ids
+                                  )
+            elif team_color_num == 2:
+                self.draw_ellipse(frame, 
+                                  player["bbox"], 
+                                  self.team2_color, 
+                                  track_id=track_id,
+                                  draw_player_ellipses=draw_player_ellipses,
+                                  draw_player_ids=draw_player_ids
+                                  )
+        return frame
 
-                # Térfél szerint besoroljuk a kapust a megfelelő csapatba
-                if track_id in coords:
-                    x_coord = coords[track_id][0]
-                    if field_sides[1] == "left":
-                        team_number = 1 if x_coord < 52.5 else 2
-                    else:
-                        team_number = 1 if x_coord > 52.5 else 2
-
-                    # Kapus csapatának beállítása a closest_player_ids szótárban
-                    for frame_id, (player_id, _) in self.closest_player_ids.items():
-                        if player_id == track_id:
-                            self.closest_player_ids[frame_id] = (player_id, team_number)
-
-                    # Kapus annotációk rajzolása
-                    if team_number == 1:
-                        annotated_frame = self.draw_ellipse(annotated_frame, 
-                                                            player["bbox"], 
-                                                            self.team1_color, 
-                                                            track_id=track_id,
-                                                            draw_player_ellipses=draw_goalkeeper_ellipses,
-                                                            draw_player_ids=draw_goalkeeper_ids
-                                                            )
-                    else:
-                        annotated_frame = self.draw_ellipse(annotated_frame, 
-                                                            player["bbox"], 
-                                                            self.team2_color, 
-                                                            track_id=track_id,
-                                                            draw_player_ellipses=draw_goalkeeper_ellipses,
-                                                            draw_player_ids=draw_goalkeeper_ids
-                                                            )
-
-            # Annotált képkockák frissítése
-            annotated_frames[frame_num] = annotated_frame
-
-        return annotated_frames
-    
-    def draw_closest_players_triangles(self, frames, closest_player_ids_filtered, tracks):
+    # Játékvezetők: sárga elipszis
+    def draw_referees(self, frame, frame_num, tracks):
+        referee_color = (0, 255, 255)
+        for _, referee in tracks["referees"][frame_num].items():
+            self.draw_ellipse(frame, referee["bbox"], referee_color)
+        return frame
 
-        annotated_frames = []
+    # Labda: zöld háromszög a labda fölé
+    def draw_ball(self, frame, frame_num, tracks):
+        ball_dict = tracks["ball"][frame_num]
+        if 1 in ball_dict:
+            ball_bbox = [int(v) for v in ball_dict[1]["bbox"]]
+            self.draw_triangle(frame, ball_bbox, (0, 255, 0))
+        return frame
 
-        # Végigmegyünk minden frame-en
-        for frame_num, frame in enumerate(frames):
-            annotated_frame = frame.copy()
+    # Kulcspontok és pályavonalak kirajzolása, ha van keypoint adat
+    def draw_keypoints(self, frame, frame_num, keypoints_list):
+        if not keypoints_list or frame_num >= len(keypoints_list):
+            return frame
+        pts = keypoints_list[frame_num]
+        if pts is None or pts.size == 0:
+            return frame
+
+        # Kulcspontok kirajzolása
+        for pt in pts:
+            cv2.circle(frame, (int(pt[0]), int(pt[1])), radius=4, color=(255, 0, 0), thickness=-1)
+        # Kulcspontok összekötése -> pályavonalak rajzolása
+        for edge in self.pitch_edges:
+            idx1, idx2 = edge[0]-1, edge[1]-1
+            if idx1 < len(pts) and idx2 < len(pts):
+                pt1 = (int(pts[idx1][0]), int(pts[idx1][1]))
+                pt2 = (int(pts[idx2][0]), int(pts[idx2][1]))
+                cv2.line(frame, pt1, pt2, color=(255, 255, 0), thickness=2)
+        return frame
 
-            # Megnézzük, hogy az adott frame-en van-e legközelebbi játékos
-            player_id, team_id = closest_player_ids_filtered.get(frame_num, (None, None))
+    # Játékosok pályakoordinátáinak, sebességének és megtett távolságának kiírása
+    def draw_player_texts(self, frame, frame_num, tracks, player_coordinates_list, draw_speed_distance=True, draw_player_coordinates=True):
+        if not player_coordinates_list or frame_num >= len(player_coordinates_list):
+            return frame
+        coords = player_coordinates_list[frame_num]
+
+        # Kiírások pozicionálása (koordináták + sebesség- és távolságmérés)
+        coordinates_y_pos = 40 if draw_speed_distance else 20
+        speed_distance_y_pos = 20
+
+        for track_id, player in tracks["players"][frame_num].items():
+            if track_id not in coords:
+                continue
+            x1, y1, x2, y2 = player["bbox"]
+            x_center = int((x1 + x2) / 2)
+            y_bottom = int(y2)
+            if draw_player_coordinates:
+                text = f"x: {coords[track_id][0]:.1f}m y: {coords[track_id][1]:.1f}m"
+                self.label_renderer.put_text(frame,
+                                             text,
+                                             (x_center - 70, y_bottom + coordinates_y_pos),
+                                             cv2.FONT_HERSHEY_SIMPLEX,
+                                             0.5,
+                                             [((0, 0, 0), 2)])
+
+            # Sebesség és távolság kiírása (a measure_players által rögzített értékekből)
+            if draw_speed_distance:
+                speed_kmh, distance_m = self.speed_estimator.get_player_info_at(track_id, frame_num)
+                speed_dist_text = f"{speed_kmh:.1f} km/h, {distance_m:.1f} m"
+                text_width = self.label_renderer.get_text_width(speed_dist_text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+                text_x = x_center - text_width // 2
+                # Fekete körvonal, majd fehér kitöltés
+                self.label_renderer.put_text(frame, speed_dist_text, (text_x, y_bottom + speed_distance_y_pos),
+                                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, [((0, 0, 0), 2), ((255, 255, 255), 1)], cv2.LINE_AA)
+        return frame
+    
+    # Kapus csapatának meghatározása a térfél alapján
+    def get_goalkeeper_team(self, x_coord, field_sides):
+        if field_sides[1] == "left":
+            return 1 if x_coord < 52.5 else 2
+        return 1 if x_coord > 52.5 else 2
+
+    # Kapusok csapatának meghatározása egyszer, kapusonként: a kapus összes frame-en mért pálya x
+    # koordinátájával szavazás a térfél szerinti csapatra (döntetlennél az első szavazat nyer). Az
+    # eredmény a játékos -> legközelebbi frame-ek indexen keresztül kerül a closest_player_ids-be
+    def assign_goalkeeper_teams(self, tracks, player_coordinates_list, field_sides):
+        self.goalkeeper_teams = {}
+        if not field_sides:
+            return self.goalkeeper_teams
+
+        # Szavazatok kapusonként: [első szavazat, 1-es csapat szavazatai, 2-es csapat szavazatai]
+        votes = {}
+        for frame_num, player_dict in enumerate(tracks["players"]):
+            coords = player_coordinates_list[frame_num] if player_coordinates_list and frame_num < len(player_coordinates_list) else {}
+            for track_id in self.goalkeeper_ids:
+                if track_id not in player_dict or track_id not in coords:
+                    continue
+                team_number = self.get_goalkeeper_team(coords[track_id][0], field_sides)
+                track_votes = votes.setdefault(track_id, [team_number, 0, 0])
+                track_votes[team_number] += 1
 
+        for track_id, (first_vote, team1_votes, team2_votes) in votes.items():
+            if team1_votes != team2_votes:
+                self.goalkeeper_teams[track_id] = 1 if team1_votes > team2_votes else 2
+            else:
+                self.goalkeeper_teams[track_id] = first_vote
+
+        # Kapus csapatának beírása azokra a frame-ekre, ahol ő a labdához legközelebbi játékos
+        closest_frames = self.get_closest_frames_index()
+        for track_id, team_number in self.goalkeeper_teams.items():
+            for frame_id in closest_frames.get(track_id, []):
+                self.closest_player_ids[frame_id] = (track_id, team_number)
+        return self.goalkeeper_teams
+
+    # Index: játékos azonosító -> frame-ek, ahol ő a labdához legközelebbi játékos
+    def get_closest_frames_index(self):
+        closest_frames = {}
+        for frame_id, (player_id, _) in self.closest_player_ids.items():
             if player_id is not None:
-                # Lekérjük az aktuális játékos bounding boxát
-                player_data = tracks["players"][frame_num].get(player_id, None)
-
-                if player_data:
-                    bbox = player_data.get("bbox", None)
-
-                    if bbox:
-                        # Piros háromszög kirajzolása
-                        annotated_frame = self.draw_triangle(annotated_frame, bbox, (0, 0, 255))
-
-            # Hozzáadjuk az annotált frame-et a listához
-            annotated_frames.append(annotated_frame)
-
-        return annotated_frames
+                closest_frames.setdefault(player_id, []).append(frame_id)
+        return closest_frames
+
+    # Kapusok rajzolása: a csapatukat az assign_goalkeeper_teams határozza meg
+    def draw_goalkeepers(self, 
+                         frame, 
+                         frame_num, 
+                         tracks, 
+                         draw_goalkeeper_ellipses=True,
+                         draw_goalkeeper_ids=True
+                         ):
+        for track_id, player in tracks["players"][frame_num].items():
+            team_number = self.goalkeeper_teams.get(track_id)
+            if team_number is None:
+                continue
+            self.draw_ellipse(frame, 
+                              player["bbox"], 
+                              self.team1_color if team_number == 1 else self.team2_color, 
+                              track_id=track_id,
+                              draw_player_ellipses=draw_goalkeeper_ellipses,
+                              draw_player_ids=draw_goalkeeper_ids
+                              )
+        return frame
     
+    # Labdát birtokló (legközelebbi) játékos jelölése piros háromszöggel
+    def draw_closest_player(self, frame, frame_num, closest_player_ids_filtered, tracks):
+        # Megnézzük, hogy az adott frame-en van-e legközelebbi játékos
+        player_id, team_id = closest_player_ids_filtered.get(frame_num, (None, None))
+        if player_id is None:
+            return frame
+
+        # Lekérjük az aktuális játékos bounding boxát
+        player_data = tracks["players"][frame_num].get(player_id, None)
+        if player_data:
+            bbox = player_data.get("bbox", None)
+            if bbox:
+                self.draw_triangle(frame, bbox, (0, 0, 255))
+        return frame
+    
+    # Csapatszín panel felépítése: háttér és a statikus tartalom (színminták, kontúrok, feliratok)
+    # egyszer renderelt sprite-ként, a panel bal felső sarkához viszonyított koordinátákkal
+    def build_team_colors_panel(self, square_size=30, gap=10):
+        # Teljes szélesség kiszámítása (2 négyzet + 2 gap + 2 szöveg)
+        total_width = (square_size * 2) + (gap * 3) + 160
+        panel = HudPanel(total_width + 21, square_size + 11)
+        start_x, start_y = 10, 5
+        team2_x = start_x + square_size + gap + 100
+
+        def draw_team(canvas, x, color, label):
+            # Kitöltött négyzet a csapat színével, fekete kontúr és felirat
+            cv2.rectangle(canvas, (x, start_y), (x + square_size, start_y + square_size), color, -1)
+            cv2.rectangle(canvas, (x, start_y), (x + square_size, start_y + square_size), (0, 0, 0), 2)
+            cv2.putText(canvas, label, (x + square_size + gap, start_y + 20), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2, cv2.LINE_AA)
+
+        panel.add_static(lambda canvas: draw_team(canvas, start_x, self.team1_color, "Team1"))
+        panel.add_static(lambda canvas: draw_team(canvas, team2_x, self.team2_color, "Team2"))
+        return panel
+
     # Képernyő tetején a csapatok színével ellátott négyzetek kirajzolása
-    def coloured_squares_annotations(self, annotated_frames, draw_team_colors_topbar=True):
-        if draw_team_colors_topbar:
-            for frame_index, frame in enumerate(annotated_frames):
-                # Kép méretének lekérdezése
-                h, w, _ = frame.shape
-
-                # Négyzetek mérete és pozíciója
-                square_size = 30
-                gap = 10
-
-                # Teljes szélesség kiszámítása (2 négyzet + 2 gap + 2 szöveg)
-                total_width = (square_size * 2) + (gap * 3) + 160
-
-                # Kezdő X pozíció a középre igazításhoz
-                start_x = (w - total_width) // 2
-                start_y = 10
-
-                # Overlay másolat készítése
-                overlay = frame.copy()
-
-                # Átlátszó téglalap háttér (fehér, 60%-os átlátszóság)
-                cv2.rectangle(overlay, (start_x - 10, start_y - 5), 
-                            (start_x + total_width + 10, start_y + square_size + 5), 
-                            (255, 255, 255), -1)
-
-                # Átlátszóság alkalmazása
-                alpha = 0.6
-                cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0, frame)
-
-                # Team1 négyzet kirajzolása
-                cv2.rectangle(frame, (start_x, start_y), 
-                            (start_x + square_size, start_y + square_size), 
-                            self.team1_color, -1)  # Kitöltött négyzet
-
-                # Fekete kontúr
-                cv2.rectangle(frame, (start_x, start_y), 
-                            (start_x + square_size, start_y + square_size), 
-                            (0, 0, 0), 2)
-
-                # Szöveg megjelenítése
-                cv2.putText(frame, "Team1", (start_x + square_size + gap, start_y + 20), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2, cv2.LINE_AA)
-
-                # Team2 négyzet kirajzolása
-                team2_x = start_x + square_size + gap + 100  # Pozíció kiszámítása
-                cv2.rectangle(frame, (team2_x, start_y), 
-                            (team2_x + square_size, start_y + square_size), 
-                            self.team2_color, -1)
-
-                # Fekete kontúr
-                cv2.rectangle(frame, (team2_x, start_y), 
-                            (team2_x + square_size, start_y + square_size), 
-                            (0, 0, 0), 2)
-
-                # Szöveg megjelenítése
-                cv2.putText(frame, "Team2", (team2_x + square_size + gap, start_y + 20), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2, cv2.LINE_AA)
-
-                # Frissített frame visszaírása
-                annotated_frames[frame_index] = frame
-
-        return annotated_frames
\ No newline at end of file
+    def draw_team_colors_topbar(self, frame, frame_num=None):
+        # A panel egyszer készül el (a csapatszínek az assign_teams után már nem változnak)
+        if self.team_colors_panel is None:
+            self.team_colors_panel = self.build_team_colors_panel()
+
+        # Vízszintesen középre igazítva, 5 pixellel a frame teteje alatt
+        h, w, _ = frame.shape
+        self.team_colors_panel.render(frame, (w - self.team_colors_panel.width + 1) // 2, 5)
+        return frame
@@ -1,8 +1,12 @@
-from .video_utils import load_video, generate_output_video
+from .video_utils import load_video, generate_output_video, encode_video_frames, VideoFrameSource
+from .stage_pipeline import StagePipeline
+from .batch_utils import get_auto_batch_size
 from .bbox_utils import get_center_of_bbox, get_bbox_width
 from .team_assigner_utils import TeamAssigner
-from .field_sign_assigner import determine_team_sides, get_majority_team_sides
+from .field_sign_assigner import determine_team_sides, get_majority_team_sides, TeamSideVoter
 from .closest_player_ids_utils import closest_player_ids_filter, count_ball_possessions_per_player
+from .possession_segments import PossessionSegments
 from .thumbnail_utils import save_video_thumbnail
+from .presence_index import PresenceIndex
 from .players_frame_count import get_players_with_minimum_presence, get_players_presence_ratios
 from .football_shirt_utils import get_valid_player_colors, save_all_jersey_images, rgb_to_normalized
\ No newline at end of file
@@ -0,0 +1,23 @@
+import os
+import psutil
+
+# Becsült memóriaigény képkockánként a modell bemenetén (640x640x3 float32 tenzor,
+# a köztes aktivációkkal együtt durván ennek többszöröse) [bájt]
+MODEL_INPUT_BYTES = 640 * 640 * 3 * 4
+ACTIVATION_FACTOR = 8
+
+# Batch méret automatikus meghatározása a CPU magok és a szabad memória alapján
+def get_auto_batch_size(frame_width, frame_height, max_batch_size=16, memory_fraction=0.25):
+    # Magonként egy frame párhuzamosan dolgozható fel hatékonyan
+    cores = os.cpu_count() or 1
+
+    # Egy frame memóriaigénye: nyers frame + modell bemenet és aktivációk
+    frame_bytes = frame_width * frame_height * 3
+    per_frame_bytes = frame_bytes + MODEL_INPUT_BYTES * ACTIVATION_FACTOR
+    available_bytes = psutil.virtual_memory().available * memory_fraction
+    memory_limit = int(available_bytes // per_frame_bytes)
+
+    batch_size = max(1, min(cores, memory_limit, max_batch_size))
+
+    # Kettő hatványára kerekítés lefelé
+    return 1 << (batch_size.bit_length() - 1)
@@ -1,6 +1,5 @@
-from collections import defaultdict, Counter
+from collections import defaultdict
 import numpy as np
-from utils.team_assigner_utils import TeamAssigner
 
 # Meghatározza az adott frame-en a csapatok térfél-hozzárendelését a játékosok koordinátái alapján
 def determine_team_sides(player_coordinates_frame: dict[int, tuple[float, float]], player_to_team: dict[int, int]) -> dict[int, str] | None:
@@ -20,32 +19,74 @@ def determine_team_sides(player_coordinates_frame: dict[int, tuple[float, float]
         return {1: 'left', 2: 'right'}
     else:
         return {1: 'right', 2: 'left'}
-    
-def get_majority_team_sides(player_coordinates: list[dict], players_tracks: list[dict], first_frame, team1_color, team2_color, team_assigner: TeamAssigner) -> dict[int, str]:
-
-    # Játékosok csapatának meghatározása
-    player_to_team = {}
-
-    for frame in players_tracks:
-        for track_id, player in frame.items():
-            if track_id in player_to_team:
-                continue
-            upper_body = team_assigner.get_upper_body_image(first_frame, player["bbox"])
-            color = team_assigner.get_player_color(upper_body)
-            team_id = team_assigner.get_player_to_team(color, team1_color, team2_color)
-            player_to_team[track_id] = team_id
-
-    # Minden frame-re meghatározzuk a csapatok térfél-hozzárendelését
-    votes = []
-
-    for frame_coords in player_coordinates:
-        side_result = determine_team_sides(frame_coords, player_to_team)
-        if side_result:
-            votes.append(tuple(sorted(side_result.items())))
-
-    if not votes:
-        return {}
-
-    # Leggyakoribb térfél-hozzárendelés meghatározása
-    most_common = Counter(votes).most_common(1)[0][0]
-    return dict(most_common)
+
+# Térfél szavazó: frame-enként a csapatok átlagos x koordinátája dönt, a szavazatok
+# összesítése vektorizáltan történik (teljes frame-ek soraiból, akár darabokban). A csapatokat
+# a tracker már meglévő track_id_to_team szótárából veszi, ezért a csapatok meghatározása után
+# fut; a pályakoordináták amúgy is csak a detektálás végén, a projekció után állnak elő
+class TeamSideVoter:
+    def __init__(self, player_to_team: dict[int, int]):
+        self.team1_left_votes = 0  # frame-ek, ahol az 1-es csapat a bal térfélen van
+        self.team1_right_votes = 0
+        self.first_vote = None  # döntetlennél az időben első szavazat nyer (mint a Counter esetén)
+
+        # Track id -> csapat keresőtábla
+        track_ids = np.array(list(player_to_team.keys()), dtype=np.int64)
+        teams = np.array(list(player_to_team.values()), dtype=np.int8)
+        valid = (track_ids >= 0) & np.isin(teams, (1, 2))
+        self.team_lookup = np.zeros(int(track_ids[valid].max()) + 1 if np.any(valid) else 0, dtype=np.int8)
+        self.team_lookup[track_ids[valid]] = teams[valid]
+
+    # Szavazatok hozzáadása teljes frame-ek soraiból (frame index, track id, pálya x)
+    def update_arrays(self, frames, track_ids, xs):
+        frames = np.asarray(frames, dtype=np.int64)
+        track_ids = np.asarray(track_ids, dtype=np.int64)
+        xs = np.asarray(xs, dtype=np.float64)
+        if len(frames) == 0:
+            return
+
+        # Csapat kikeresése; ismeretlen track vagy hiányzó koordináta nem szavaz
+        known = (track_ids >= 0) & (track_ids < len(self.team_lookup)) & ~np.isnan(xs)
+        teams = np.zeros(len(track_ids), dtype=np.int8)
+        teams[known] = self.team_lookup[track_ids[known]]
+
+        # Frame-enkénti csapat átlagok egy-egy bincount-tal
+        first_frame = frames.min()
+        local_frames = frames - first_frame
+        length = int(local_frames.max()) + 1
+        team1, team2 = teams == 1, teams == 2
+        team1_counts = np.bincount(local_frames[team1], minlength=length)
+        team2_counts = np.bincount(local_frames[team2], minlength=length)
+        team1_sums = np.bincount(local_frames[team1], weights=xs[team1], minlength=length)
+        team2_sums = np.bincount(local_frames[team2], weights=xs[team2], minlength=length)
+
+        voting = (team1_counts > 0) & (team2_counts > 0)
+        team1_left = team1_sums[voting] / team1_counts[voting] < team2_sums[voting] / team2_counts[voting]
+        self.team1_left_votes += int(np.count_nonzero(team1_left))
+        self.team1_right_votes += int(len(team1_left) - np.count_nonzero(team1_left))
+        if self.first_vote is None and len(team1_left):
+            self.first_vote = bool(team1_left[0])
+
+    # Leggyakoribb térfél-hozzárendelés
+    def get_sides(self) -> dict[int, str]:
+        if self.first_vote is None:
+            return {}
+        if self.team1_left_votes != self.team1_right_votes:
+            team1_left = self.team1_left_votes > self.team1_right_votes
+        else:
+            team1_left = self.first_vote
+        return {1: 'left', 2: 'right'} if team1_left else {1: 'right', 2: 'left'}
+
+def get_majority_team_sides(player_coordinates: list[dict], player_to_team: dict[int, int]) -> dict[int, str]:
+    # Frame-enkénti koordináták kilapítása oszlopokba
+    frames, track_ids, xs = [], [], []
+    for frame_num, frame_coords in enumerate(player_coordinates):
+        for track_id, (x, _) in frame_coords.items():
+            frames.append(frame_num)
+            track_ids.append(track_id)
+            xs.append(x)
+
+    # Minden frame-re meghatározzuk a csapatok térfél-hozzárendelését, majd összesítünk
+    voter = TeamSideVoter(player_to_team)
+    voter.update_arrays(frames, track_ids, xs)
+    return voter.get_sides()
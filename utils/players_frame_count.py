@@ -1,38 +1,10 @@
-from collections import defaultdict
+from .presence_index import PresenceIndex
 
 # Listát ad azokról a játékosokról, akik legalább a frame-k 50%-án detektálva vannak
+# (kompatibilitási burok; egy elemzésen belül a közös PresenceIndex használandó)
 def get_players_with_minimum_presence(players_tracks: list, minimum_ratio: float = 0.5) -> list:
-
-    # Jelenlétszámláló minden track_id-re
-    presence_counter = defaultdict(int)
-    total_frames = len(players_tracks)
-
-    # Végigmegyünk minden frame-en
-    for frame_data in players_tracks:
-        for track_id in frame_data.keys():
-            presence_counter[track_id] += 1
-
-    # Szűrés: csak azok, akik legalább a minimum_ratio * összes képkocka arányban jelen voltak
-    valid_players = [
-        track_id for track_id, count in presence_counter.items()
-        if count >= total_frames * minimum_ratio
-    ]
-
-    return valid_players
+    return PresenceIndex.from_frames(players_tracks).get_players_with_minimum_presence(minimum_ratio)
 
 # Játékosok a framek hány %-án voltak detektálva
 def get_players_presence_ratios(players_tracks: list) -> dict:
-
-    presence_counter = defaultdict(int)
-    total_frames = len(players_tracks)
-
-    for frame_data in players_tracks:
-        for track_id in frame_data.keys():
-            presence_counter[track_id] += 1
-
-    presence_ratios = {
-        track_id: count / total_frames
-        for track_id, count in presence_counter.items()
-    }
-
-    return presence_ratios
\ No newline at end of file
+    return PresenceIndex.from_frames(players_tracks).get_ratios()
\ No newline at end of file
@@ -0,0 +1,113 @@
+import numpy as np
+
+# Labdabirtoklási szakasz index: a frame-enkénti {frame: (player_id, team_id)} szótár helyett
+# futáshossz-kódolt szakaszok tömbjei (kezdő frame, záró frame (kizárólagos), játékos, csapat).
+# Egy szakasz ugyanannak a játékosnak a megszakítás nélküli birtoklása; a csapat a szakasz első
+# frame-jének csapata. A hiányzó értékek (None) -1-ként tárolódnak. A szűrés, az érintésszámok, a
+# passzesemények és a kumulált birtoklási arányok mind a szakaszokon futó lekérdezések
+class PossessionSegments:
+    def __init__(self, starts, ends, player_ids, team_ids, frame_count):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.player_ids = np.asarray(player_ids, dtype=np.int64)
+        self.team_ids = np.asarray(team_ids, dtype=np.int64)
+        self.frame_count = frame_count
+
+    def __len__(self):
+        return len(self.starts)
+
+    # Index építése a closest_player_ids szótárból egyetlen vektorizált futáshossz-kódolással
+    @classmethod
+    def from_closest_player_ids(cls, closest_player_ids, frame_count=None):
+        if frame_count is None:
+            frame_count = max(closest_player_ids, default=-1) + 1
+        players = np.full(frame_count, -1, dtype=np.int64)
+        teams = np.full(frame_count, -1, dtype=np.int64)
+        for frame_num, (player_id, team_id) in closest_player_ids.items():
+            if frame_num < frame_count:
+                players[frame_num] = -1 if player_id is None else player_id
+                teams[frame_num] = -1 if team_id is None else team_id
+        return cls.from_arrays(players, teams)
+
+    # Index építése frame-enkénti játékos és csapat tömbökből (-1: nincs)
+    @classmethod
+    def from_arrays(cls, players, teams):
+        players = np.asarray(players, dtype=np.int64)
+        teams = np.asarray(teams, dtype=np.int64)
+        frame_count = len(players)
+        if frame_count == 0:
+            return cls([], [], [], [], 0)
+
+        change = np.concatenate([[True], players[1:] != players[:-1]])
+        run_starts = np.flatnonzero(change)
+        run_ends = np.append(run_starts[1:], frame_count)
+        valid = players[run_starts] >= 0
+        starts, ends = run_starts[valid], run_ends[valid]
+        return cls(starts, ends, players[starts], teams[starts], frame_count)
+
+    # Rövid szakaszok kiszűrése: legalább min_length frame hosszú szakasz marad meg, kivéve az
+    # utolsó frame-ig tartó szakaszt, amelynek final_min_length is elég (closest_player_ids_filter)
+    def filtered(self, min_length=3, final_min_length=2):
+        lengths = self.ends - self.starts
+        keep = np.where(self.ends == self.frame_count, lengths >= final_min_length, lengths >= min_length)
+        return PossessionSegments(self.starts[keep], self.ends[keep], self.player_ids[keep], self.team_ids[keep], self.frame_count)
+
+    # Frame-enkénti tömbök visszaállítása: játékos és csapat frame-enként (-1: nincs)
+    def to_arrays(self):
+        lengths = self.ends - self.starts
+        # Szakaszon belüli eltolás: sorszám mínusz a szakasz első elemének sorszáma
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        frames = np.repeat(self.starts, lengths) + offsets
+        players = np.full(self.frame_count, -1, dtype=np.int64)
+        teams = np.full(self.frame_count, -1, dtype=np.int64)
+        players[frames] = np.repeat(self.player_ids, lengths)
+        teams[frames] = np.repeat(self.team_ids, lengths)
+        return players, teams
+
+    # Kompatibilitási alak: {frame: (player_id, team_id)} minden frame-re, (None, None) birtokló nélkül
+    def to_closest_player_ids(self):
+        players, teams = self.to_arrays()
+        return {frame_num: (None if player_id < 0 else player_id, None if team_id < 0 else team_id)
+                for frame_num, (player_id, team_id) in enumerate(zip(players.tolist(), teams.tolist()))}
+
+    # Játékosonkénti labdaérintések (birtoklási szakaszok) száma
+    def get_touch_counts(self):
+        player_ids, counts = np.unique(self.player_ids, return_counts=True)
+        return dict(zip(player_ids.tolist(), counts.tolist()))
+
+    # Passzesemények: a csapattal rendelkező szakaszok egymásutánjában minden játékosváltás egy passz,
+    # amely pontos, ha a két csapat azonos. Az előző birtokos (és csapata) kívülről is megadható
+    # a folytatáshoz. Kimenet: (frame, passzoló, csapata, átvevő, csapata, pontos) tömbök
+    def get_pass_events(self, prev_player_id=None, prev_team_id=None):
+        with_team = self.team_ids >= 0
+        frames = self.starts[with_team]
+        receivers = self.player_ids[with_team]
+        receiver_teams = self.team_ids[with_team]
+        passers = np.concatenate([[-1 if prev_player_id is None else prev_player_id], receivers[:-1]])
+        passer_teams = np.concatenate([[-1 if prev_team_id is None else prev_team_id], receiver_teams[:-1]])
+
+        is_pass = (passers >= 0) & (passers != receivers)
+        return {
+            "frames": frames[is_pass],
+            "passers": passers[is_pass],
+            "passer_teams": passer_teams[is_pass],
+            "receivers": receivers[is_pass],
+            "receiver_teams": receiver_teams[is_pass],
+            "accurate": (passer_teams == receiver_teams)[is_pass]
+        }
+
+    # Kumulált birtoklási frame-számok frame-enként: (team1, team2, összes), ahol az összesbe
+    # minden csapattal rendelkező birtoklási frame beleszámít; a hossz alapértelmezetten frame_count
+    def get_cumulative_possession(self, frame_count=None):
+        if frame_count is None:
+            frame_count = self.frame_count
+
+        def cumulative_frames(mask):
+            changes = np.zeros(max(frame_count, self.frame_count) + 1, dtype=np.int64)
+            np.add.at(changes, self.starts[mask], 1)
+            np.add.at(changes, self.ends[mask], -1)
+            return np.cumsum(np.cumsum(changes)[:frame_count])
+
+        return (cumulative_frames(self.team_ids == 1),
+                cumulative_frames(self.team_ids == 2),
+                cumulative_frames(self.team_ids >= 0))
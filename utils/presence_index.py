@@ -0,0 +1,60 @@
+import numpy as np
+
+# Játékosok jelenléti indexe: track_id-nként a jelenléti frame-ek száma, az első és az utolsó
+# frame, egyetlen bincount menetben felépítve. A track_id-k az első megjelenés sorrendjében
+# (frame, majd a frame-en belüli sorrend) tárolódnak, ahogy a régi szótáras számlálók is.
+# Egy elemzés egyszer építi fel, a játékosonkénti statisztikák és grafikonok ezt kapják meg
+class PresenceIndex:
+    def __init__(self, track_ids, counts, first_frames, last_frames, frame_count):
+        self.track_ids = np.asarray(track_ids, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.first_frames = np.asarray(first_frames, dtype=np.int64)
+        self.last_frames = np.asarray(last_frames, dtype=np.int64)
+        self.frame_count = frame_count
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    # Index építése (frame, track_id) sorokból; a sorok frame szerint rendezettek (pl. TrackStore)
+    @classmethod
+    def from_rows(cls, frames, track_ids, frame_count):
+        frames = np.asarray(frames, dtype=np.int64)
+        track_ids = np.asarray(track_ids, dtype=np.int64)
+        if len(track_ids) == 0:
+            return cls([], [], [], [], frame_count)
+
+        size = int(track_ids.max()) + 1
+        counts = np.bincount(track_ids, minlength=size)
+        first_rows = np.full(size, len(track_ids), dtype=np.int64)
+        np.minimum.at(first_rows, track_ids, np.arange(len(track_ids)))
+        last_frames = np.full(size, -1, dtype=np.int64)
+        np.maximum.at(last_frames, track_ids, frames)
+
+        # Jelen lévő track_id-k az első előfordulásuk sorrendjében
+        present = np.flatnonzero(counts)
+        present = present[np.argsort(first_rows[present], kind="stable")]
+        return cls(present, counts[present], frames[first_rows[present]], last_frames[present], frame_count)
+
+    # Index építése frame-enkénti {track_id: ...} szótárakból (tracks["players"] vagy player_coordinates)
+    @classmethod
+    def from_frames(cls, frame_dicts):
+        counts = np.fromiter(map(len, frame_dicts), dtype=np.int64, count=len(frame_dicts))
+        frames = np.repeat(np.arange(len(frame_dicts)), counts)
+        track_ids = np.fromiter((track_id for frame_data in frame_dicts for track_id in frame_data), dtype=np.int64, count=int(counts.sum()))
+        return cls.from_rows(frames, track_ids, len(frame_dicts))
+
+    # Jelenléti arány track_id-nként (a frame-ek hányad részén volt jelen)
+    def get_ratios(self):
+        return dict(zip(self.track_ids.tolist(), (self.counts / self.frame_count).tolist()))
+
+    # Azok a track_id-k, akik legalább a frame-ek minimum_ratio részén jelen voltak
+    def get_players_with_minimum_presence(self, minimum_ratio=0.5):
+        return self.track_ids[self.counts >= self.frame_count * minimum_ratio].tolist()
+
+    # Jelenléti frame-ek száma track_id-nként
+    def get_counts(self):
+        return dict(zip(self.track_ids.tolist(), self.counts.tolist()))
+
+    # Első és utolsó jelenléti frame track_id-nként
+    def get_frame_ranges(self):
+        return dict(zip(self.track_ids.tolist(), zip(self.first_frames.tolist(), self.last_frames.tolist())))
\ No newline at end of file
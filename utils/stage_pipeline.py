@@ -0,0 +1,173 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass
+
+# Folyam végét jelző objektum a sorokban
+_END_OF_STREAM = object()
+
+@dataclass
+class StageStats: # Egy lépés mérési adatai
+    name: str
+    items: int = 0  # feldolgozott elemek száma
+    wall_time: float = 0.0  # a lépés teljes futásideje [s]
+    input_wait_time: float = 0.0  # várakozás a bemeneti sorra (éhezés) [s]
+    output_wait_time: float = 0.0  # várakozás a kimeneti sorra (visszanyomás) [s]
+    queue_depth_sum: int = 0  # bemeneti sor mélységeinek összege (átlaghoz)
+    queue_depth_samples: int = 0
+    queue_depth_max: int = 0
+
+    @property
+    def busy_time(self):
+        # Tényleges munkával töltött idő
+        return max(0.0, self.wall_time - self.input_wait_time - self.output_wait_time)
+
+    @property
+    def throughput(self):
+        # Elért áteresztőképesség [elem/s]
+        return self.items / self.wall_time if self.wall_time > 0 else 0.0
+
+    @property
+    def capacity(self):
+        # Elméleti áteresztőképesség, ha a lépés sosem várakozna [elem/s]
+        return self.items / self.busy_time if self.busy_time > 0 else float("inf")
+
+    @property
+    def average_queue_depth(self):
+        return self.queue_depth_sum / self.queue_depth_samples if self.queue_depth_samples else 0.0
+
+    def record_queue_depth(self, depth):
+        self.queue_depth_sum += depth
+        self.queue_depth_samples += 1
+        self.queue_depth_max = max(self.queue_depth_max, depth)
+
+# Lépésekből álló feldolgozó lánc. Minden lépés egy generátor-transzformáció
+# (iterálható bemenet -> iterálható kimenet). Szekvenciális módban a lépések egyszerűen
+# egymásba láncolódnak, párhuzamos módban minden lépés (és a forrás olvasása) külön szálon
+# fut, korlátos sorokkal összekötve, így a gyors lépések nem szaladhatnak el (visszanyomás)
+class StagePipeline:
+    def __init__(self, stages=None, queue_size=8, concurrent=True, source_name="dekódolás"):
+        self.stages = list(stages) if stages else []
+        self.queue_size = max(1, queue_size)
+        self.concurrent = concurrent
+        self.source_name = source_name
+        self.stats = []
+
+    def add_stage(self, name, transform):
+        self.stages.append((name, transform))
+
+    def run(self, source):
+        if not self.concurrent:
+            items = source
+            for _, transform in self.stages:
+                items = transform(items)
+            yield from items
+            return
+
+        names = [self.source_name] + [name for name, _ in self.stages]
+        self.stats = [StageStats(name) for name in names]
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in names]  # queues[i]: az i. lépés kimenete
+        stop_event = threading.Event()
+        errors = []
+
+        # Elem beírása a sorba; teli sor esetén várakozik (visszanyomás)
+        def put(output_queue, item, stats):
+            start = time.perf_counter()
+            while not stop_event.is_set():
+                try:
+                    output_queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            stats.output_wait_time += time.perf_counter() - start
+            return not stop_event.is_set()
+
+        # Bemeneti sor bejárása, a sor mélységének és a várakozási időnek a mérésével
+        def read(input_queue, stats):
+            while True:
+                stats.record_queue_depth(input_queue.qsize())
+                start = time.perf_counter()
+                item = _END_OF_STREAM
+                while not stop_event.is_set():
+                    try:
+                        item = input_queue.get(timeout=0.1)
+                        break
+                    except queue.Empty:
+                        continue
+                stats.input_wait_time += time.perf_counter() - start
+                if item is _END_OF_STREAM:
+                    return
+                yield item
+
+        def worker(index):
+            stats = self.stats[index]
+            if index == 0:
+                items = iter(source)
+            else:
+                items = self.stages[index - 1][1](read(queues[index - 1], stats))
+            start = time.perf_counter()
+            try:
+                for item in items:
+                    stats.items += 1
+                    if not put(queues[index], item, stats):
+                        break
+            except BaseException as error:
+                errors.append(error)
+                stop_event.set()
+            finally:
+                if hasattr(items, "close"):
+                    items.close()
+                stats.wall_time = time.perf_counter() - start
+                put(queues[index], _END_OF_STREAM, stats)
+
+        threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(len(names))]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = _END_OF_STREAM
+                while not stop_event.is_set():
+                    try:
+                        item = queues[-1].get(timeout=0.1)
+                        break
+                    except queue.Empty:
+                        continue
+                if item is _END_OF_STREAM:
+                    break
+                yield item
+        finally:
+            # Korai leállás vagy hiba esetén minden szálat leállítunk
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+    # Lépésenkénti riport: feldolgozott elemek, áteresztőképesség, sormélység, szűk keresztmetszet
+    def get_report(self):
+        if not self.stats:
+            return []
+        bottleneck = max(self.stats, key=lambda s: s.busy_time)
+        return [{
+            "stage": s.name,
+            "items": s.items,
+            "throughput_fps": s.throughput,
+            "capacity_fps": s.capacity,
+            "busy_ratio": s.busy_time / s.wall_time if s.wall_time > 0 else 0.0,
+            "avg_queue_depth": s.average_queue_depth,
+            "max_queue_depth": s.queue_depth_max,
+            "bottleneck": s is bottleneck
+        } for s in self.stats]
+
+    def format_report(self):
+        lines = []
+        for row in self.get_report():
+            marker = " <- szűk keresztmetszet" if row["bottleneck"] else ""
+            lines.append(
+                f"{row['stage']:>14}: {row['items']} elem, {row['throughput_fps']:.1f} elem/s "
+                f"(kapacitás {row['capacity_fps']:.1f} elem/s, kihasználtság {100 * row['busy_ratio']:.0f} %), "
+                f"sor átlag {row['avg_queue_depth']:.1f} / max {row['max_queue_depth']}{marker}"
+            )
+        return "\n".join(lines)
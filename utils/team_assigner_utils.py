@@ -3,6 +3,8 @@ import cv2
 import numpy as np
 
 class TeamAssigner:
+    # A felsőtest kivágások egységes mérete a kötegelt színkinyeréshez
+    crop_size = 16
 
     def get_upper_body_image(self, frame, bbox):
         # A frame adott játékosának felső testét tartalmazó kép kivágása
@@ -76,4 +78,96 @@ class TeamAssigner:
         if dist_to_team1 <= dist_to_team2:
             return 1
         else:
-            return 2
\ No newline at end of file
+            return 2
+
+    # Felsőtest kivágások egységes méretre hozva egy (N, S, S, 3) tömbben; valid: nem üres-e a kivágás
+    def get_upper_body_batch(self, frame, bboxes):
+        size = self.crop_size
+        crops = np.zeros((len(bboxes), size, size, 3), dtype=np.uint8)
+        valid = np.zeros(len(bboxes), dtype=bool)
+        for i, bbox in enumerate(bboxes):
+            upper_body_image = self.get_upper_body_image(frame, bbox)
+            if upper_body_image.shape[0] == 0 or upper_body_image.shape[1] == 0:
+                continue
+            crops[i] = cv2.resize(upper_body_image, (size, size), interpolation=cv2.INTER_AREA)
+            valid[i] = True
+        return crops, valid
+
+    # BGR színek átváltása Lab térbe (perceptuálisan egyenletesebb távolságok)
+    def to_lab(self, colors):
+        colors = np.clip(np.asarray(colors, dtype=np.float32).reshape(-1, 1, 3), 0, 255).astype(np.uint8)
+        return cv2.cvtColor(colors, cv2.COLOR_BGR2LAB).reshape(-1, 3).astype(np.float32)
+
+    # Mezszínek kötegelt meghatározása: minden kivágásra egyszerre futó 2-klaszteres k-means
+    # Lab térben (kezdőpontok: a kép széle és közepe), a háttér klaszter - mint eddig - a
+    # sarkok többségi klasztere; a mezszín a játékos klaszter átlagos BGR színe
+    def get_player_colors(self, crops, iterations=5):
+        count, size = len(crops), self.crop_size
+        if count == 0:
+            return np.empty((0, 3), dtype=np.float32)
+        pixels = crops.reshape(count, size * size, 3).astype(np.float32)
+        lab = cv2.cvtColor(crops.reshape(count * size, size, 3), cv2.COLOR_BGR2LAB).reshape(count, size * size, 3).astype(np.float32)
+
+        border = np.zeros((size, size), dtype=bool)
+        border[[0, -1], :] = True
+        border[:, [0, -1]] = True
+        center = np.zeros((size, size), dtype=bool)
+        center[size // 4:-(size // 4), size // 4:-(size // 4)] = True
+        centroids = np.stack([lab[:, border.ravel()].mean(axis=1), lab[:, center.ravel()].mean(axis=1)], axis=1)
+
+        for _ in range(iterations):
+            distances = ((lab[:, :, None, :] - centroids[:, None, :, :]) ** 2).sum(axis=-1)
+            labels = distances.argmin(axis=-1)
+            for cluster in (0, 1):
+                mask = labels == cluster
+                counts = mask.sum(axis=1, keepdims=True)
+                sums = (lab * mask[..., None]).sum(axis=1)
+                centroids[:, cluster] = np.where(counts > 0, sums / np.maximum(counts, 1), centroids[:, cluster])
+
+        # Háttér klaszter: a négy sarok többségi klasztere (döntetlennél a 0. klaszter)
+        corner_labels = labels[:, [0, size - 1, size * (size - 1), size * size - 1]]
+        player_cluster = 1 - (corner_labels.sum(axis=1) > 2).astype(int)
+        player_mask = labels == player_cluster[:, None]
+        player_counts = player_mask.sum(axis=1, keepdims=True)
+        player_colors = (pixels * player_mask[..., None]).sum(axis=1) / np.maximum(player_counts, 1)
+        return np.where(player_counts > 0, player_colors, pixels.mean(axis=1))
+
+    # Csapat prototípusok (mezszínek) illesztése egyszer, 2-klaszteres k-means-szel Lab térben.
+    # Az első szín csapata lesz az 1-es csapat; visszatérés: (team1_color, team2_color) BGR-ben
+    def fit_team_prototypes(self, colors, iterations=10):
+        colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+        if len(colors) == 0:
+            return None, None
+        if len(colors) == 1:
+            return colors[0].astype(np.float64), colors[0].astype(np.float64)
+        lab = self.to_lab(colors)
+        centroids = np.stack([lab[0], lab[np.argmax(np.linalg.norm(lab - lab[0], axis=1))]])
+
+        for _ in range(iterations):
+            labels = np.linalg.norm(lab[:, None, :] - centroids[None, :, :], axis=-1).argmin(axis=1)
+            for cluster in (0, 1):
+                if np.any(labels == cluster):
+                    centroids[cluster] = lab[labels == cluster].mean(axis=0)
+
+        labels = np.linalg.norm(lab[:, None, :] - centroids[None, :, :], axis=-1).argmin(axis=1)
+        if labels[0] != 0:
+            labels = 1 - labels
+        team1_color = colors[labels == 0].mean(axis=0)
+        team2_color = colors[labels == 1].mean(axis=0) if np.any(labels == 1) else team1_color
+        return team1_color.astype(np.float64), team2_color.astype(np.float64)
+
+    # Vektorizált besorolás a legközelebbi csapat prototípushoz (Lab térben): 1 vagy 2 minden színre
+    def get_players_to_team(self, colors, team1_color, team2_color):
+        if len(colors) == 0:
+            return np.empty(0, dtype=int)
+        prototypes = self.to_lab([team1_color, team2_color])
+        distances = np.linalg.norm(self.to_lab(colors)[:, None, :] - prototypes[None, :, :], axis=-1)
+        return np.where(distances[:, 0] <= distances[:, 1], 1, 2)
+
+    # Több játékos csapatának meghatározása egy frame-en, egyetlen kötegelt színkinyeréssel
+    def get_teams_for_bboxes(self, frame, bboxes, team1_color, team2_color):
+        crops, valid = self.get_upper_body_batch(frame, bboxes)
+        teams = np.ones(len(bboxes), dtype=int)
+        if np.any(valid):
+            teams[valid] = self.get_players_to_team(self.get_player_colors(crops[valid]), team1_color, team2_color)
+        return teams
@@ -1,29 +1,103 @@
 import cv2
 import subprocess
 import os
+import queue
+import threading
+
+# Streamelt képkocka-forrás: a videót nem tölti be egyben a memóriába,
+# hanem egy háttérszál korlátos előolvasó pufferen keresztül adagolja a frame-eket
+class VideoFrameSource:
+    def __init__(self, path, buffer_size=32):
+        self.path = path
+        self.buffer_size = max(1, buffer_size)
+
+        # Metaadatok kiolvasása a videóból
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise FileNotFoundError(f"Nem sikerült megnyitni a videót: {path}")
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+    def __len__(self):
+        return self.frame_count
+
+    # Minden bejárás új dekódolást indít, így a forrás többször is bejárható
+    def __iter__(self):
+        frame_queue = queue.Queue(maxsize=self.buffer_size)
+        stop_event = threading.Event()
+        end_of_stream = object()
+
+        # Háttérszál: frame-ek dekódolása a pufferbe, amíg van hely
+        def reader():
+            cap = cv2.VideoCapture(self.path)
+            try:
+                while not stop_event.is_set():
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    while not stop_event.is_set():
+                        try:
+                            frame_queue.put(frame, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+            finally:
+                cap.release()
+                while not stop_event.is_set():
+                    try:
+                        frame_queue.put(end_of_stream, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+
+        thread = threading.Thread(target=reader, daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                frame = frame_queue.get()
+                if frame is end_of_stream:
+                    break
+                yield frame
+        finally:
+            # Ha a fogyasztó korábban abbahagyja a bejárást, a szálat is leállítjuk
+            stop_event.set()
+            thread.join()
+
+    # Egyetlen frame beolvasása index alapján (pl. első frame, thumbnail)
+    def read_frame(self, index=0):
+        cap = cv2.VideoCapture(self.path)
+        if index > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = cap.read()
+        cap.release()
+        return frame if ret else None
 
 # Input videó beolvasása
 def load_video(path):
-    cap = cv2.VideoCapture(path)
+    source = VideoFrameSource(path)
 
     # Videó beolvasása frame-ekbe
-    frames = []
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frames.append(frame)
-
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    frames = list(source)
 
-    return frames, fps, width, height
+    return frames, source.fps, source.width, source.height
 
-# Output videó generálása
-def generate_output_video(output_video_frames, output_video_path, video_fps, video_width, video_height):
+# Frame-ek kódolása a kimeneti videóba lépésenként (generátor), hogy a kódolás
+# a feldolgozó lánc egy lépése lehessen; a megírt frame-eket továbbadja
+def encode_video_frames(output_video_frames, output_video_path, video_fps, video_width, video_height):
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
     out = cv2.VideoWriter(output_video_path, fourcc, video_fps, (video_width, video_height))
-    for frame in output_video_frames:
-        out.write(frame)
-    out.release()
\ No newline at end of file
+    try:
+        for frame in output_video_frames:
+            out.write(frame)
+            yield frame
+    finally:
+        out.release()
+
+# Output videó generálása (tetszőleges frame-iterálható bemenetből, akár generátorból)
+def generate_output_video(output_video_frames, output_video_path, video_fps, video_width, video_height):
+    for _ in encode_video_frames(output_video_frames, output_video_path, video_fps, video_width, video_height):
+        pass